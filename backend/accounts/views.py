@@ -3,6 +3,7 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import get_user_model
+from django.db import transaction
 from .serializers import (
     UserRegistrationSerializer,
     UserLoginSerializer,
@@ -14,6 +15,7 @@ from .serializers import (
 )
 from .models import PasswordResetToken, EmailVerificationToken
 from utils.email import send_password_reset_email, send_welcome_email
+from orders.cart_store import CART_TOKEN_HEADER, get_cart_store, merge_anonymous_cart
 import uuid
 from datetime import timedelta
 from django.utils import timezone
@@ -39,8 +41,10 @@ class UserRegistrationView(APIView):
     def post(self, request):
         serializer = UserRegistrationSerializer(data=request.data)
         if serializer.is_valid():
-            user = serializer.save()
-            send_welcome_email(user)
+            # The verification and welcome emails are queued with the user
+            with transaction.atomic():
+                user = serializer.save()
+                send_welcome_email(user)
             
             return Response({
                 'message': 'Registration successful. Please check your email to verify your account.',
@@ -61,6 +65,12 @@ class UserLoginView(APIView):
             user = serializer.validated_data['user']
             tokens = get_tokens_for_user(user)
             
+            # Carry over the cart the visitor built before logging in
+            store = get_cart_store()
+            cart_token = request.headers.get(CART_TOKEN_HEADER)
+            if store is not None and cart_token:
+                merge_anonymous_cart(store, cart_token, user)
+            
             return Response({
                 'message': 'Login successful',
                 'tokens': tokens,
@@ -112,16 +122,15 @@ class PasswordResetRequestView(APIView):
             email = serializer.validated_data['email']
             user = User.objects.get(email=email)
             
-            # Create password reset token
+            # Create password reset token and queue the email with it
             token = uuid.uuid4().hex
-            PasswordResetToken.objects.create(
-                user=user,
-                token=token,
-                expires_at=timezone.now() + timedelta(hours=1)
-            )
-            
-            # Send password reset email
-            send_password_reset_email(user, token)
+            with transaction.atomic():
+                PasswordResetToken.objects.create(
+                    user=user,
+                    token=token,
+                    expires_at=timezone.now() + timedelta(hours=1)
+                )
+                send_password_reset_email(user, token)
             
             return Response({
                 'message': 'Password reset link has been sent to your email.'
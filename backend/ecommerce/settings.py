@@ -44,6 +44,7 @@ INSTALLED_APPS = [
     'wishlist',
     'payments',
     'admin_dashboard',
+    'notifications',
 ]
 
 MIDDLEWARE = [
@@ -137,6 +138,14 @@ TIME_ZONE = 'Asia/Kolkata'
 USE_I18N = True
 USE_TZ = True
 
+# Shared cache (point at Redis/Memcached in production so all workers agree)
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default=''),
+    }
+}
+
 # Static files (CSS, JavaScript, Images)
 STATIC_URL = '/static/'
 STATIC_ROOT = BASE_DIR / 'staticfiles'
@@ -146,6 +155,10 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 MEDIA_URL = config('MEDIA_URL', default='/media/')
 MEDIA_ROOT = BASE_DIR / config('MEDIA_ROOT', default='media')
 
+# Responsive image renditions (generated off the request thread)
+IMAGE_RENDITIONS_ASYNC = config('IMAGE_RENDITIONS_ASYNC', default=True, cast=bool)
+IMAGE_RENDITION_WORKERS = config('IMAGE_RENDITION_WORKERS', default=2, cast=int)
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -162,7 +175,7 @@ REST_FRAMEWORK = {
         'rest_framework.filters.SearchFilter',
         'rest_framework.filters.OrderingFilter',
     ),
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_PAGINATION_CLASS': 'utils.pagination.CachedCountPagination',
     'PAGE_SIZE': 20,
     'DATETIME_FORMAT': '%Y-%m-%d %H:%M:%S',
     'DEFAULT_RENDERER_CLASSES': (
@@ -175,6 +188,25 @@ REST_FRAMEWORK = {
     ),
 }
 
+# innodb_ft_min_token_size of the MySQL server; shorter search words skip the FULLTEXT index
+FULLTEXT_MIN_TOKEN_SIZE = config('FULLTEXT_MIN_TOKEN_SIZE', default=3, cast=int)
+
+# Hot cart store (e.g. 'orders.cart_store.CacheCartStore'); empty keeps carts in the database only
+CART_STORE_BACKEND = config('CART_STORE_BACKEND', default='')
+CART_STORE_PATH = BASE_DIR / config('CART_STORE_PATH', default='cart-store')
+CART_STORE_TIMEOUT = config('CART_STORE_TIMEOUT', default=60 * 60 * 24 * 30, cast=int)
+
+# Orders read per query by the streaming order export
+ORDER_EXPORT_BATCH_SIZE = config('ORDER_EXPORT_BATCH_SIZE', default=2000, cast=int)
+
+# Per-process coupon cache used by coupon validation
+COUPON_CACHE_SIZE = config('COUPON_CACHE_SIZE', default=1024, cast=int)
+COUPON_CACHE_TIMEOUT = config('COUPON_CACHE_TIMEOUT', default=300, cast=int)
+
+# Cached page counts for paginated listings
+PAGINATION_COUNT_CACHE_TIMEOUT = config('PAGINATION_COUNT_CACHE_TIMEOUT', default=30, cast=int)
+PAGINATION_COUNT_ESTIMATE_THRESHOLD = config('PAGINATION_COUNT_ESTIMATE_THRESHOLD', default=100000, cast=int)
+
 # JWT Configuration
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=config('JWT_ACCESS_TOKEN_LIFETIME', default=60, cast=int)),
@@ -226,6 +258,12 @@ CORS_ALLOW_HEADERS = [
     'user-agent',
     'x-csrftoken',
     'x-requested-with',
+    'x-cart-token',
+]
+
+# Lets the frontend read the token of a new anonymous cart
+CORS_EXPOSE_HEADERS = [
+    'x-cart-token',
 ]
 
 # Email Configuration
@@ -237,6 +275,15 @@ EMAIL_HOST_USER = config('EMAIL_HOST_USER', default='')
 EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD', default='')
 DEFAULT_FROM_EMAIL = config('DEFAULT_FROM_EMAIL', default=EMAIL_HOST_USER)
 
+# Email outbox (delivered by `manage.py dispatch_emails`)
+EMAIL_OUTBOX_BATCH_SIZE = config('EMAIL_OUTBOX_BATCH_SIZE', default=100, cast=int)
+EMAIL_OUTBOX_MAX_ATTEMPTS = config('EMAIL_OUTBOX_MAX_ATTEMPTS', default=5, cast=int)
+EMAIL_OUTBOX_RETRY_DELAY = config('EMAIL_OUTBOX_RETRY_DELAY', default=60, cast=int)
+
+# Pooled delivery: messages per send_messages() call, and per SMTP session before reconnecting
+EMAIL_DELIVERY_CHUNK_SIZE = config('EMAIL_DELIVERY_CHUNK_SIZE', default=50, cast=int)
+EMAIL_DELIVERY_MAX_PER_CONNECTION = config('EMAIL_DELIVERY_MAX_PER_CONNECTION', default=500, cast=int)
+
 # Payment Gateway Configuration
 RAZORPAY_KEY_ID = config('RAZORPAY_KEY_ID', default='')
 RAZORPAY_KEY_SECRET = config('RAZORPAY_KEY_SECRET', default='')
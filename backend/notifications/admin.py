@@ -0,0 +1,10 @@
+from django.contrib import admin
+from .models import OutboxEmail
+
+
+@admin.register(OutboxEmail)
+class OutboxEmailAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'to', 'template_name', 'status', 'attempts', 'next_attempt_at', 'sent_at')
+    list_filter = ('status', 'template_name', 'created_at')
+    search_fields = ('to', 'subject')
+    readonly_fields = ('created_at', 'sent_at', 'last_error')
@@ -0,0 +1,129 @@
+import logging
+import time
+from dataclasses import asdict, dataclass
+from django.conf import settings
+from django.core.mail import get_connection
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class DeliveryMetrics:
+    """Running totals for one Mailer"""
+    sent: int = 0
+    failed: int = 0
+    chunks: int = 0
+    connections_opened: int = 0
+    seconds: float = 0.0
+
+    @property
+    def messages_per_second(self):
+        return self.sent / self.seconds if self.seconds else 0.0
+
+    def as_dict(self):
+        return dict(asdict(self), messages_per_second=round(self.messages_per_second, 1))
+
+
+class _Progress:
+    """
+    Iterable over a chunk that remembers how far the backend got.
+    Django's backends send messages in iteration order, so when send_messages
+    raises, the last message handed out is the one that failed and every
+    earlier one was delivered.
+    """
+    def __init__(self, messages):
+        self.messages = messages
+        self.position = -1
+
+    def __iter__(self):
+        for self.position, message in enumerate(self.messages):
+            yield message
+
+    def __len__(self):
+        return len(self.messages)
+
+    def __bool__(self):
+        return bool(self.messages)
+
+
+class Mailer:
+    """
+    Sends messages over one long-lived email connection, in chunks of
+    EMAIL_DELIVERY_CHUNK_SIZE through send_messages().
+    The connection is opened lazily, recycled after EMAIL_DELIVERY_MAX_PER_CONNECTION
+    messages (providers cap messages per session) and reopened after any error.
+    Not thread-safe: use one Mailer per dispatcher.
+    """
+    def __init__(self, connection=None, chunk_size=None, max_per_connection=None):
+        self.connection = connection
+        self.chunk_size = chunk_size or getattr(settings, 'EMAIL_DELIVERY_CHUNK_SIZE', 50)
+        self.max_per_connection = (
+            getattr(settings, 'EMAIL_DELIVERY_MAX_PER_CONNECTION', 500)
+            if max_per_connection is None else max_per_connection
+        )
+        self.metrics = DeliveryMetrics()
+        self.is_open = False
+        self.sent_on_connection = 0
+
+    def open(self):
+        if self.connection is None:
+            self.connection = get_connection()
+        if not self.is_open:
+            self.connection.open()
+            self.is_open = True
+            self.metrics.connections_opened += 1
+
+    def close(self):
+        if self.is_open:
+            self.is_open = False
+            self.sent_on_connection = 0
+            try:
+                self.connection.close()
+            except Exception:
+                # The server may already have dropped the session
+                logger.debug('Error closing email connection', exc_info=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def send(self, messages):
+        """
+        Send EmailMessages, returning one entry per message: None if it was
+        delivered, otherwise the exception that failed it.
+        """
+        errors = [None] * len(messages)
+        started = time.perf_counter()
+        index = 0
+        while index < len(messages):
+            if self.max_per_connection and self.sent_on_connection >= self.max_per_connection:
+                self.close()
+            size = self.chunk_size
+            if self.max_per_connection:
+                size = min(size, self.max_per_connection - self.sent_on_connection)
+            chunk = _Progress(messages[index:index + size])
+            self.metrics.chunks += 1
+            try:
+                self.open()
+                self.connection.send_messages(chunk)
+            except Exception as exc:
+                # Everything before the failing message went out; an error before
+                # the first message (connect, auth) fails the whole chunk
+                if chunk.position < 0:
+                    failed = range(len(chunk))
+                else:
+                    failed = range(chunk.position, chunk.position + 1)
+                for offset in failed:
+                    errors[index + offset] = exc
+                self.metrics.failed += len(failed)
+                self.close()
+                index += failed.stop
+            else:
+                self.sent_on_connection += len(chunk)
+                index += len(chunk)
+        self.metrics.sent += sum(error is None for error in errors)
+        self.metrics.seconds += time.perf_counter() - started
+        return errors
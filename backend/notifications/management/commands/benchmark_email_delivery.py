@@ -0,0 +1,103 @@
+import socketserver
+import threading
+import time
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.management.base import BaseCommand
+from notifications.delivery import Mailer
+
+
+class SMTPSinkHandler(socketserver.StreamRequestHandler):
+    """Minimal SMTP server that accepts and discards every message"""
+    def reply(self, line):
+        self.wfile.write(f'{line}\r\n'.encode('ascii'))
+
+    def handle(self):
+        # Stands in for the TCP + TLS handshake of a real relay
+        time.sleep(self.server.handshake_delay)
+        self.reply('220 localhost ESMTP sink')
+        for raw in self.rfile:
+            command = raw.decode('ascii', 'replace').strip().upper()
+            if command.startswith(('EHLO', 'HELO')):
+                self.reply('250 localhost')
+            elif command == 'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                for line in self.rfile:
+                    if line in (b'.\r\n', b'.\n'):
+                        break
+                self.server.received += 1
+                self.reply('250 OK')
+            elif command == 'QUIT':
+                self.reply('221 Bye')
+                break
+            else:
+                self.reply('250 OK')
+
+
+class SMTPSink(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, handshake_delay=0.0):
+        super().__init__(('127.0.0.1', 0), SMTPSinkHandler)
+        self.handshake_delay = handshake_delay
+        self.received = 0
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks per-message SMTP connections against pooled, chunked delivery on a local SMTP sink.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--messages', type=int, default=500, help='Messages per run.')
+        parser.add_argument('--chunk-size', type=int, default=50, help='Messages per send_messages() call.')
+        parser.add_argument(
+            '--handshake-ms', type=float, default=20.0, help='Simulated connection setup cost per SMTP session.'
+        )
+
+    def build_messages(self, count):
+        messages = []
+        for i in range(count):
+            message = EmailMultiAlternatives(
+                subject=f'Order APNI{i:06d} shipped',
+                body='Your order is on its way.',
+                from_email='orders@example.com',
+                to=[f'user{i}@example.com']
+            )
+            message.attach_alternative('<p>Your order is on its way.</p>', 'text/html')
+            messages.append(message)
+        return messages
+
+    def report(self, label, sent, seconds, connections):
+        self.stdout.write(
+            f'{label:>12}: {sent} sent in {seconds:.2f} s, '
+            f'{sent / seconds if seconds else 0:.1f} msg/s, {connections} connections'
+        )
+
+    def handle(self, *args, **options):
+        sink = SMTPSink(options['handshake_ms'] / 1000)
+        threading.Thread(target=sink.serve_forever, daemon=True).start()
+        host, port = sink.server_address
+        backend = {
+            'backend': 'django.core.mail.backends.smtp.EmailBackend',
+            'host': host, 'port': port, 'use_tls': False, 'use_ssl': False, 'username': '', 'password': '',
+        }
+        count = options['messages']
+
+        try:
+            # What send_mail() does: a fresh connection per message
+            started = time.perf_counter()
+            for message in self.build_messages(count):
+                message.connection = get_connection(**backend)
+                message.send()
+            self.report('per-message', count, time.perf_counter() - started, count)
+
+            with Mailer(get_connection(**backend), chunk_size=options['chunk_size'], max_per_connection=0) as mailer:
+                errors = mailer.send(self.build_messages(count))
+            metrics = mailer.metrics
+            self.report('pooled', metrics.sent, metrics.seconds, metrics.connections_opened)
+            if any(errors):
+                self.stdout.write(self.style.WARNING(f'{metrics.failed} pooled sends failed'))
+        finally:
+            sink.shutdown()
+            sink.server_close()
+
+        self.stdout.write(self.style.SUCCESS(f'✓ SMTP sink received {sink.received} messages'))
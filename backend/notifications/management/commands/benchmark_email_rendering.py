@@ -0,0 +1,58 @@
+import time
+from decimal import Decimal
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.template.loader import render_to_string
+from django.utils.html import strip_tags
+from accounts.models import User
+from notifications.rendering import EmailRenderer
+from orders.models import Order
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks the cached email renderer against render_to_string + strip_tags on order confirmations.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipients', type=int, default=2000, help='Messages rendered per run.')
+
+    def build_contexts(self, count):
+        # Unsaved rows: this measures rendering, not queries
+        contexts = []
+        for i in range(count):
+            user = User(first_name=f'Customer {i}', email=f'user{i}@example.com')
+            order = Order(
+                order_number=f'ORD{i:08d}', user=user, subtotal=Decimal('1499.00'),
+                discount_amount=Decimal('100.00'), shipping_charge=Decimal('0'), tax_amount=Decimal('251.82'),
+                total_amount=Decimal('1650.82'), payment_method=Order.PaymentMethod.COD
+            )
+            contexts.append({
+                'order': order,
+                'user': user,
+                'order_url': f'{settings.FRONTEND_URL}/orders/{order.order_number}',
+            })
+        return contexts
+
+    def report(self, label, count, seconds):
+        self.stdout.write(
+            f'{label:>16}: {count} messages in {seconds * 1000:.1f} ms, '
+            f'{seconds / count * 1e6:.1f} µs/message'
+        )
+
+    def handle(self, *args, **options):
+        count = options['recipients']
+        contexts = self.build_contexts(count)
+        base_context = {'site_name': 'Apni Shop'}
+
+        started = time.perf_counter()
+        for context in contexts:
+            html_message = render_to_string('emails/order_confirmation.html', dict(base_context, **context))
+            strip_tags(html_message)
+        self.report('render_to_string', count, time.perf_counter() - started)
+
+        renderer = EmailRenderer()
+        started = time.perf_counter()
+        renderer.render_batch('order_confirmation', contexts, base_context)
+        self.report('cached batch', count, time.perf_counter() - started)
+
+        template = renderer.get('order_confirmation')
+        self.stdout.write(self.style.SUCCESS(f'✓ order_confirmation version {template.version}'))
@@ -0,0 +1,37 @@
+import time
+from django.core.management.base import BaseCommand
+from notifications.delivery import Mailer
+from notifications.outbox import dispatch_batch
+
+
+class Command(BaseCommand):
+    help = 'Sends due emails from the outbox, retrying failures with backoff.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None, help='Messages claimed per batch')
+        parser.add_argument('--loop', action='store_true', help='Keep polling the outbox')
+        parser.add_argument('--interval', type=float, default=5.0, help='Seconds between polls when idle')
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.NOTICE('Dispatching outbox emails...'))
+
+        total_sent = total_failed = 0
+        # One connection for the whole run; it's only closed while idle
+        with Mailer() as mailer:
+            while True:
+                sent, failed = dispatch_batch(options['batch_size'], mailer=mailer)
+                total_sent += sent
+                total_failed += failed
+                if sent or failed:
+                    self.stdout.write(f'  sent {sent}, failed {failed}')
+                    continue
+                if not options['loop']:
+                    break
+                mailer.close()
+                time.sleep(options['interval'])
+
+        metrics = mailer.metrics
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ Sent {total_sent} emails ({total_failed} failed) at {metrics.messages_per_second:.1f} msg/s, '
+            f'{metrics.chunks} chunks over {metrics.connections_opened} connections'
+        ))
@@ -0,0 +1,43 @@
+from django.db import models
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+
+class OutboxEmail(models.Model):
+    """
+    Transactional Email Outbox Model
+    """
+    class Status(models.TextChoices):
+        PENDING = 'PENDING', _('Pending')
+        SENDING = 'SENDING', _('Sending')
+        SENT = 'SENT', _('Sent')
+        DEAD = 'DEAD', _('Dead')
+    
+    to = models.EmailField(_('to'))
+    subject = models.CharField(_('subject'), max_length=255)
+    template_name = models.CharField(_('template name'), max_length=100)
+    html_body = models.TextField(_('HTML body'))
+    text_body = models.TextField(_('text body'))
+    status = models.CharField(
+        _('status'),
+        max_length=10,
+        choices=Status.choices,
+        default=Status.PENDING
+    )
+    attempts = models.PositiveIntegerField(_('attempts'), default=0)
+    next_attempt_at = models.DateTimeField(_('next attempt at'), default=timezone.now)
+    last_error = models.TextField(_('last error'), blank=True)
+    created_at = models.DateTimeField(_('created at'), auto_now_add=True)
+    sent_at = models.DateTimeField(_('sent at'), null=True, blank=True)
+    
+    class Meta:
+        db_table = 'email_outbox'
+        verbose_name = _('outbox email')
+        verbose_name_plural = _('outbox emails')
+        ordering = ['next_attempt_at', 'id']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.subject} -> {self.to} ({self.status})"
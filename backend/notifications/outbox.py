@@ -0,0 +1,108 @@
+import logging
+from datetime import timedelta
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives
+from django.db import connection as db_connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+from .delivery import Mailer
+from .models import OutboxEmail
+
+
+logger = logging.getLogger(__name__)
+
+# How long a claimed message is reserved before another dispatcher may retry it
+CLAIM_LEASE = timedelta(minutes=5)
+
+# Retry delays double per attempt, up to this ceiling
+MAX_RETRY_DELAY = timedelta(hours=6)
+
+
+def enqueue(messages):
+    """
+    Queue rendered messages, given as dicts with to, subject, template_name,
+    html_body and text_body. Rows are written in the caller's transaction, so
+    a rolled-back request never sends anything.
+    """
+    return OutboxEmail.objects.bulk_create([OutboxEmail(**message) for message in messages])
+
+
+def retry_delay(attempts):
+    base = timedelta(seconds=getattr(settings, 'EMAIL_OUTBOX_RETRY_DELAY', 60))
+    return min(base * (2 ** (attempts - 1)), MAX_RETRY_DELAY)
+
+
+def claim_batch(batch_size):
+    """
+    Reserve up to `batch_size` due messages for this dispatcher.
+    Claimed rows move to SENDING with a lease; if the dispatcher dies the
+    lease expires and the rows become due again.
+    """
+    now = timezone.now()
+    due = Q(status__in=[OutboxEmail.Status.PENDING, OutboxEmail.Status.SENDING], next_attempt_at__lte=now)
+    with transaction.atomic():
+        queryset = OutboxEmail.objects.filter(due).order_by('next_attempt_at', 'id')
+        if db_connection.features.has_select_for_update_skip_locked:
+            queryset = queryset.select_for_update(skip_locked=True)
+        ids = list(queryset.values_list('id', flat=True)[:batch_size])
+        OutboxEmail.objects.filter(pk__in=ids).update(
+            status=OutboxEmail.Status.SENDING, next_attempt_at=now + CLAIM_LEASE
+        )
+    return list(OutboxEmail.objects.filter(pk__in=ids).order_by('id'))
+
+
+def build_message(email, connection=None):
+    message = EmailMultiAlternatives(
+        subject=email.subject,
+        body=email.text_body,
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=[email.to],
+        connection=connection
+    )
+    message.attach_alternative(email.html_body, 'text/html')
+    return message
+
+
+def record_failure(email, error):
+    """Schedule a retry with exponential backoff, or dead-letter the message"""
+    email.attempts += 1
+    email.last_error = str(error)[:2000]
+    if email.attempts >= getattr(settings, 'EMAIL_OUTBOX_MAX_ATTEMPTS', 5):
+        email.status = OutboxEmail.Status.DEAD
+        logger.error('Dead-lettered email %s to %s: %s', email.pk, email.to, error)
+    else:
+        email.status = OutboxEmail.Status.PENDING
+        email.next_attempt_at = timezone.now() + retry_delay(email.attempts)
+    email.save(update_fields=['attempts', 'last_error', 'status', 'next_attempt_at'])
+
+
+def dispatch_batch(batch_size=None, connection=None, mailer=None):
+    """
+    Send one batch of due messages. Pass a Mailer to keep its connection open
+    across batches; otherwise one is opened for this batch and closed after.
+    Returns (sent, failed).
+    """
+    batch_size = batch_size or getattr(settings, 'EMAIL_OUTBOX_BATCH_SIZE', 100)
+    emails = claim_batch(batch_size)
+    if not emails:
+        return 0, 0
+
+    owns_mailer = mailer is None
+    mailer = mailer or Mailer(connection)
+    try:
+        errors = mailer.send([build_message(email) for email in emails])
+    finally:
+        if owns_mailer:
+            mailer.close()
+
+    sent = []
+    for email, error in zip(emails, errors):
+        if error is None:
+            sent.append(email.pk)
+        else:
+            record_failure(email, error)
+
+    OutboxEmail.objects.filter(pk__in=sent).update(
+        status=OutboxEmail.Status.SENT, sent_at=timezone.now(), last_error=''
+    )
+    return len(sent), len(emails) - len(sent)
@@ -0,0 +1,116 @@
+import hashlib
+import html
+import os
+import re
+import threading
+from dataclasses import dataclass
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.template import Context, TemplateDoesNotExist
+from django.template.loader import get_template
+from django.utils.html import strip_tags
+
+
+# Runs of blank lines left behind once the markup is stripped
+BLANK_LINES = re.compile(r'\n\s*\n\s*(?:\n\s*)+')
+
+# Table cells would otherwise run into each other
+CELL_END = re.compile(r'</t[dh]>', re.IGNORECASE)
+
+
+@dataclass
+class EmailTemplate:
+    """Compiled HTML and plain-text templates for one version of an email"""
+    name: str
+    version: str
+    html: object
+    text: object
+    path: str = None
+    mtime: float = None
+
+
+def plain_text_source(html_source):
+    """Plain-text template derived from the HTML template's source: markup stripped, template tags kept"""
+    text = html.unescape(strip_tags(CELL_END.sub(' ', html_source)))
+    lines = [line.strip() for line in text.splitlines()]
+    return BLANK_LINES.sub('\n\n', '\n'.join(lines)).strip()
+
+
+def _source_mtime(template):
+    path = getattr(template.origin, 'name', None)
+    if not path or not os.path.isfile(path):
+        return None, None
+    return path, os.stat(path).st_mtime
+
+
+def compile_email_template(name):
+    """
+    Load `emails/<name>.html` and its plain-text alternative: `emails/<name>.txt`
+    when it exists, otherwise a text template compiled once from the stripped
+    HTML source, so recipients never go through the HTML stripper.
+    """
+    html_template = get_template(f'emails/{name}.html').template
+    try:
+        text_template = get_template(f'emails/{name}.txt').template
+    except TemplateDoesNotExist:
+        text_template = html_template.engine.from_string(plain_text_source(html_template.source))
+    source = html_template.source + '\0' + text_template.source
+    version = hashlib.md5(source.encode('utf-8')).hexdigest()[:12]
+    path, mtime = _source_mtime(html_template)
+    return EmailTemplate(name, version, html_template, text_template, path, mtime)
+
+
+class EmailRenderer:
+    """
+    Process-wide cache of compiled email templates.
+    Templates are compiled on first use and kept for the life of the process;
+    with DEBUG on, a template whose file changed is recompiled.
+    """
+    def __init__(self):
+        self.templates = {}
+        self.lock = threading.Lock()
+
+    def clear(self):
+        with self.lock:
+            self.templates.clear()
+
+    def _is_stale(self, template):
+        return settings.DEBUG and template.path is not None and _source_mtime(template.html) != (
+            template.path, template.mtime
+        )
+
+    def get(self, name):
+        template = self.templates.get(name)
+        if template is None or self._is_stale(template):
+            template = compile_email_template(name)
+            with self.lock:
+                self.templates[name] = template
+        return template
+
+    def render(self, name, context):
+        """Return (html, text) for one context"""
+        return self.render_batch(name, [context])[0]
+
+    def render_batch(self, name, contexts, base_context=None):
+        """
+        Return [(html, text)] for many recipients. Values shared by every
+        message go in `base_context`; each context is pushed on top of it.
+        """
+        template = self.get(name)
+        html_context = Context(base_context or {})
+        text_context = Context(base_context or {}, autoescape=False)
+        rendered = []
+        for context in contexts:
+            with html_context.push(context), text_context.push(context):
+                rendered.append((template.html.render(html_context), template.text.render(text_context)))
+        return rendered
+
+
+renderer = EmailRenderer()
+
+
+@receiver(setting_changed, dispatch_uid='notifications.rendering.reset_email_templates')
+def reset_email_templates(setting, **kwargs):
+    if setting in ('TEMPLATES', 'DEBUG'):
+        renderer.clear()
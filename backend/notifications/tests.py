@@ -0,0 +1,326 @@
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from smtplib import SMTPException, SMTPRecipientsRefused
+from django.conf import settings
+from django.core import mail
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.mail.backends.locmem import EmailBackend as LocMemBackend
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from notifications.delivery import Mailer
+from notifications.models import OutboxEmail
+from notifications.outbox import dispatch_batch, enqueue
+from notifications.rendering import renderer
+from utils.email import send_bulk_email, send_email
+
+
+EMAIL_TEMPLATES = [{
+    'BACKEND': 'django.template.backends.django.DjangoTemplates',
+    'OPTIONS': {
+        'loaders': [('django.template.loaders.locmem.Loader', {
+            'emails/welcome.html': '<p>Welcome, <b>{{ user }}</b>!</p>',
+            'emails/order_confirmation.html': '<p>Order {{ order.order_number }} confirmed</p>',
+        })],
+    },
+}]
+
+
+class FailingBackend(BaseEmailBackend):
+    """Email backend whose every send fails."""
+    def send_messages(self, email_messages):
+        raise SMTPException('Connection unexpectedly closed')
+
+
+class CountingBackend(LocMemBackend):
+    """Locmem backend that counts opens and rejects recipients at `bad.example.com`."""
+    opened = 0
+    
+    def open(self):
+        CountingBackend.opened += 1
+    
+    def send_messages(self, messages):
+        sent = 0
+        for message in messages:
+            if message.to[0].endswith('@bad.example.com'):
+                raise SMTPRecipientsRefused({message.to[0]: (550, b'No such user')})
+            mail.outbox.append(message)
+            sent += 1
+        return sent
+
+
+def queue(count=1, **kwargs):
+    """Queue `count` rendered messages."""
+    return enqueue([
+        dict({
+            'to': f'user{i}@example.com',
+            'subject': 'Hello',
+            'template_name': 'welcome',
+            'html_body': '<p>Hello</p>',
+            'text_body': 'Hello',
+        }, **kwargs)
+        for i in range(count)
+    ])
+
+
+@override_settings(TEMPLATES=EMAIL_TEMPLATES, EMAIL_OUTBOX_MAX_ATTEMPTS=3, EMAIL_OUTBOX_RETRY_DELAY=60)
+class EmailOutboxTest(TestCase):
+    """
+    Test suite for the transactional email outbox and its dispatcher.
+    """
+    
+    def test_send_email_queues_instead_of_sending(self):
+        """Test that send_email renders into the outbox without touching SMTP."""
+        self.assertTrue(send_email('Welcome', 'welcome', {'user': 'Asha'}, ['a@example.com', 'b@example.com']))
+        
+        self.assertEqual(len(mail.outbox), 0)
+        email = OutboxEmail.objects.get(to='a@example.com')
+        self.assertEqual(email.status, OutboxEmail.Status.PENDING)
+        self.assertIn('<b>Asha</b>', email.html_body)
+        self.assertEqual(email.text_body, 'Welcome, Asha!')
+        self.assertEqual(OutboxEmail.objects.count(), 2)
+    
+    def test_dispatch_sends_due_messages(self):
+        """Test that the dispatcher sends due messages and marks them sent."""
+        queue(3)
+        later = queue(1, to='later@example.com')[0]
+        OutboxEmail.objects.filter(pk=later.pk).update(next_attempt_at=timezone.now() + timedelta(hours=1))
+        
+        sent, failed = dispatch_batch()
+        
+        self.assertEqual((sent, failed), (3, 0))
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertEqual(mail.outbox[0].alternatives[0][1], 'text/html')
+        self.assertEqual(OutboxEmail.objects.filter(status=OutboxEmail.Status.SENT).count(), 3)
+        self.assertEqual(OutboxEmail.objects.get(pk=later.pk).status, OutboxEmail.Status.PENDING)
+    
+    def test_failures_back_off_then_dead_letter(self):
+        """Test that failed sends are retried with growing delays and then dead-lettered."""
+        email = queue()[0]
+        delays = []
+        for _ in range(3):
+            OutboxEmail.objects.filter(pk=email.pk).update(next_attempt_at=timezone.now())
+            before = timezone.now()
+            self.assertEqual(dispatch_batch(connection=FailingBackend()), (0, 1))
+            email.refresh_from_db()
+            delays.append(email.next_attempt_at - before)
+        
+        self.assertEqual(email.status, OutboxEmail.Status.DEAD)
+        self.assertEqual(email.attempts, 3)
+        self.assertIn('unexpectedly closed', email.last_error)
+        self.assertGreaterEqual(delays[1], timedelta(seconds=120))
+        self.assertEqual(dispatch_batch(), (0, 0))
+    
+    def test_expired_claim_is_retried(self):
+        """Test that a message left SENDING by a dead dispatcher is picked up again."""
+        email = queue()[0]
+        OutboxEmail.objects.filter(pk=email.pk).update(
+            status=OutboxEmail.Status.SENDING, next_attempt_at=timezone.now() - timedelta(seconds=1)
+        )
+        
+        self.assertEqual(dispatch_batch(), (1, 0))
+    
+    def checkout(self, stock):
+        """Check out a two-unit cart against `stock` units and return the response."""
+        from orders.tests import create_user, create_address, create_product
+        from orders.models import Cart, CartItem, Order
+        from rest_framework.test import APIClient
+        
+        user = create_user()
+        address = create_address(user)
+        CartItem.objects.create(cart=Cart.objects.create(user=user), product=create_product(stock=stock), quantity=2)
+        client = APIClient()
+        client.force_authenticate(user)
+        return client.post('/api/orders/orders/', {
+            'shipping_address_id': address.id, 'payment_method': Order.PaymentMethod.COD
+        }, format='json')
+    
+    def test_checkout_queues_confirmation(self):
+        """Test that placing an order queues its confirmation in the same transaction."""
+        response = self.checkout(stock=5)
+        
+        self.assertEqual(response.status_code, 201)
+        email = OutboxEmail.objects.get()
+        self.assertEqual(email.template_name, 'order_confirmation')
+        self.assertIn(response.data['order_number'], email.text_body)
+        self.assertEqual(len(mail.outbox), 0)
+    
+    def test_rolled_back_transaction_sends_nothing(self):
+        """Test that a failed checkout queues no email."""
+        response = self.checkout(stock=1)
+        
+        self.assertEqual(response.status_code, 409)
+        self.assertFalse(OutboxEmail.objects.exists())
+    
+    def test_dispatch_command(self):
+        """Test that the management command drains the outbox."""
+        queue(5)
+        out = StringIO()
+        
+        call_command('dispatch_emails', '--batch-size', '2', stdout=out)
+        
+        self.assertIn('Sent 5 emails', out.getvalue())
+        self.assertEqual(len(mail.outbox), 5)
+
+
+@override_settings(TEMPLATES=EMAIL_TEMPLATES, EMAIL_OUTBOX_MAX_ATTEMPTS=3)
+class PooledDeliveryTest(TestCase):
+    """
+    Test suite for chunked delivery over a reused connection.
+    """
+    
+    def setUp(self):
+        """Set up test fixtures."""
+        CountingBackend.opened = 0
+    
+    def test_batches_reuse_one_connection(self):
+        """Test that a Mailer sends every batch in chunks over one connection."""
+        queue(25)
+        mailer = Mailer(CountingBackend(), chunk_size=10)
+        
+        self.assertEqual(dispatch_batch(10, mailer=mailer), (10, 0))
+        self.assertEqual(dispatch_batch(20, mailer=mailer), (15, 0))
+        
+        self.assertEqual(len(mail.outbox), 25)
+        self.assertEqual(CountingBackend.opened, 1)
+        self.assertEqual(mailer.metrics.chunks, 3)
+        self.assertEqual(mailer.metrics.as_dict()['sent'], 25)
+    
+    def test_failure_is_attributed_to_its_message(self):
+        """Test that a rejected recipient fails only its own message and the chunk carries on."""
+        queue(2)
+        bad = queue(1, to='nobody@bad.example.com')[0]
+        queue(2, subject='After')
+        mailer = Mailer(CountingBackend(), chunk_size=10)
+        
+        self.assertEqual(dispatch_batch(mailer=mailer), (4, 1))
+        
+        self.assertEqual(len(mail.outbox), 4)
+        self.assertEqual(len({message.to[0] for message in mail.outbox}), 2)
+        bad.refresh_from_db()
+        self.assertEqual(bad.status, OutboxEmail.Status.PENDING)
+        self.assertIn('No such user', bad.last_error)
+        # The session is reopened after an error
+        self.assertEqual(CountingBackend.opened, 2)
+        self.assertEqual(mailer.metrics.failed, 1)
+    
+    def test_connection_recycled_after_limit(self):
+        """Test that the connection is reopened once it has carried the per-session maximum."""
+        queue(7)
+        mailer = Mailer(CountingBackend(), chunk_size=5, max_per_connection=3)
+        
+        self.assertEqual(dispatch_batch(mailer=mailer), (7, 0))
+        
+        self.assertEqual(CountingBackend.opened, 3)
+        self.assertEqual(mailer.metrics.chunks, 3)
+    
+    def test_benchmark_against_smtp_sink(self):
+        """Test that the benchmark delivers through a real SMTP session on the local sink."""
+        out = StringIO()
+        
+        call_command('benchmark_email_delivery', '--messages', '6', '--chunk-size', '4', '--handshake-ms', '0', stdout=out)
+        
+        self.assertIn('pooled: 6 sent', out.getvalue())
+        self.assertIn('1 connections', out.getvalue())
+        self.assertIn('received 12 messages', out.getvalue())
+
+
+RENDERING_TEMPLATES = [{
+    'BACKEND': 'django.template.backends.django.DjangoTemplates',
+    'OPTIONS': {
+        'loaders': [('django.template.loaders.locmem.Loader', {
+            'emails/welcome.html': '<html>\n<body>\n  <h2>Hi {{ user }},</h2>\n\n\n  <p>Welcome to <b>{{ site_name }}</b>.</p>\n</body>\n</html>',
+            'emails/receipt.html': '<p>Total: {{ total }}</p>',
+            'emails/receipt.txt': 'TOTAL {{ total }}',
+        })],
+    },
+}]
+
+
+class EmailRenderingTest(TestCase):
+    """
+    Test suite for the cached email renderer.
+    """
+    
+    def setUp(self):
+        """Set up test fixtures."""
+        renderer.clear()
+        self.project_templates = settings.TEMPLATES
+        self.enterContext(self.settings(TEMPLATES=RENDERING_TEMPLATES))
+    
+    def test_plain_text_is_compiled_once_per_template(self):
+        """Test that the plain-text alternative is a cached template, not a per-message strip."""
+        template = renderer.get('welcome')
+        
+        self.assertIs(renderer.get('welcome'), template)
+        self.assertEqual(template.text.source, 'Hi {{ user }},\n\nWelcome to {{ site_name }}.')
+        self.assertEqual(len(template.version), 12)
+    
+    def test_text_is_not_html_escaped(self):
+        """Test that values are escaped in the HTML part only."""
+        html_message, plain_message = renderer.render('welcome', {'user': 'Tom & Jerry', 'site_name': 'Apni Shop'})
+        
+        self.assertIn('Hi Tom &amp; Jerry,', html_message)
+        self.assertEqual(plain_message, 'Hi Tom & Jerry,\n\nWelcome to Apni Shop.')
+    
+    def test_text_template_takes_precedence(self):
+        """Test that an `emails/<name>.txt` template is used when present."""
+        self.assertEqual(renderer.render('receipt', {'total': 10}), ('<p>Total: 10</p>', 'TOTAL 10'))
+    
+    def test_batch_matches_single_renders(self):
+        """Test that batch rendering gives the same output as rendering one by one."""
+        contexts = [{'user': f'User {i}'} for i in range(5)]
+        base_context = {'site_name': 'Apni Shop'}
+        
+        batch = renderer.render_batch('welcome', contexts, base_context)
+        
+        self.assertEqual(batch, [renderer.render('welcome', dict(base_context, **context)) for context in contexts])
+        self.assertIn('User 4', batch[4][1])
+    
+    def test_send_bulk_email_queues_one_row_per_message(self):
+        """Test that send_bulk_email renders per recipient and queues all messages at once."""
+        messages = [
+            {'to': f'user{i}@example.com', 'subject': f'Hello {i}', 'context': {'user': f'User {i}'}}
+            for i in range(3)
+        ]
+        
+        with self.assertNumQueries(1):
+            self.assertTrue(send_bulk_email('welcome', messages, {'site_name': 'Apni Shop'}))
+        
+        email = OutboxEmail.objects.get(to='user2@example.com')
+        self.assertEqual(email.subject, 'Hello 2')
+        self.assertIn('Hi User 2,', email.text_body)
+    
+    def test_rendering_failure_is_logged(self):
+        """Test that a template that can't be rendered is logged and nothing is queued."""
+        messages = [{'to': 'user@example.com', 'subject': 'Hello', 'context': {}}]
+        
+        with self.assertLogs('utils.email', 'ERROR') as logs:
+            self.assertFalse(send_bulk_email('missing', messages))
+            self.assertFalse(send_email('Hello', 'missing', {}, ['user@example.com']))
+        
+        self.assertIn('Rendering email template missing', logs.output[0])
+        self.assertEqual(len(logs.records), 2)
+        self.assertFalse(OutboxEmail.objects.exists())
+    
+    def test_shipped_templates_render(self):
+        """Test that the templates under templates/emails render with the project settings."""
+        from accounts.models import User
+        from orders.models import Order
+        
+        with self.settings(TEMPLATES=self.project_templates):
+            user = User(first_name='Asha', email='asha@example.com')
+            order = Order(
+                order_number='ORD00000001', user=user, subtotal=Decimal('100.00'), discount_amount=Decimal('0'),
+                shipping_charge=Decimal('50.00'), tax_amount=Decimal('18.00'), total_amount=Decimal('168.00'),
+                payment_method=Order.PaymentMethod.COD
+            )
+            html_message, plain_message = renderer.render('order_confirmation', {
+                'order': order, 'user': user, 'site_name': 'Apni Shop', 'order_url': 'https://shop.test/orders/1'
+            })
+        
+        self.assertIn('<h2>', html_message)
+        self.assertIn('ORD00000001', plain_message)
+        self.assertIn('Total ₹168.00', plain_message)
+        self.assertNotIn('<', plain_message)
@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class OrdersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'orders'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from utils.pagination import track_page_counts
+        # Models behind paginated listings
+        track_page_counts(*(self.get_model(name) for name in ('Cart', 'Address', 'Coupon', 'Order')))
@@ -0,0 +1,348 @@
+import json
+import os
+import tempfile
+import threading
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.utils.module_loading import import_string
+
+
+# Request header carrying the token of an anonymous cart
+CART_TOKEN_HEADER = 'X-Cart-Token'
+
+
+@dataclass
+class CartLine:
+    """A hot-cart line joined with its product, for serialization"""
+    product: object
+    quantity: int
+
+    @property
+    def unit_price(self):
+        return self.product.discounted_price
+
+    @property
+    def total_price(self):
+        return self.unit_price * self.quantity
+
+
+def apply_cart_operations(lines, operations):
+    """
+    Apply add/set/remove operations in order to a {product_id: quantity} map.
+    `set` to zero removes the line. Returns the new map.
+    """
+    lines = dict(lines)
+    for operation in operations:
+        product_id, quantity = operation['product_id'], operation.get('quantity', 1)
+        if operation['op'] == 'add':
+            lines[product_id] = lines.get(product_id, 0) + quantity
+        elif operation['op'] == 'set' and quantity:
+            lines[product_id] = quantity
+        else:
+            lines.pop(product_id, None)
+    return {product_id: quantity for product_id, quantity in lines.items() if quantity > 0}
+
+
+def merge_reorder_lines(lines, order_lines, products):
+    """
+    Add past order lines to a cart, capped at current stock.
+    `order_lines` is [(product_id, quantity)], `products` maps id -> {'name', 'stock', 'status'}.
+    Returns (new lines, [lines that were skipped or capped]).
+    """
+    from products.models import Product
+    lines = dict(lines)
+    not_added = []
+    for product_id, quantity in order_lines:
+        product = products.get(product_id)
+        in_cart = lines.get(product_id, 0)
+        if product is None or product['status'] == Product.Status.INACTIVE:
+            added, reason = 0, 'unavailable'
+        else:
+            added = max(0, min(quantity, product['stock'] - in_cart))
+            reason = 'out_of_stock' if added == 0 else 'limited_stock'
+        if added:
+            lines[product_id] = in_cart + added
+        if added < quantity:
+            not_added.append({
+                'product_id': product_id,
+                'product_name': product['name'] if product else None,
+                'requested': quantity,
+                'added': added,
+                'reason': reason,
+            })
+    return lines, not_added
+
+
+def user_cart_key(user):
+    return f'user:{user.pk}'
+
+
+def anonymous_cart_key(token):
+    return f'anon:{token}'
+
+
+def new_cart_token():
+    return uuid.uuid4().hex
+
+
+class BaseCartStore:
+    """
+    Key-value storage for hot carts. A cart is a {product_id: quantity} map.
+    Writes mark the cart dirty until it has been written through to Cart/CartItem.
+    """
+    def get(self, key):
+        """Return the cart's lines, or None if the store doesn't hold it"""
+        raise NotImplementedError
+
+    def set(self, key, lines, dirty=True):
+        raise NotImplementedError
+
+    def delete(self, key):
+        raise NotImplementedError
+
+    def dirty_keys(self):
+        raise NotImplementedError
+
+    def clear_dirty(self, key):
+        raise NotImplementedError
+
+    @staticmethod
+    def _load(data):
+        return {int(product_id): quantity for product_id, quantity in data.items()}
+
+    @staticmethod
+    def _dump(lines):
+        return {str(product_id): quantity for product_id, quantity in lines.items()}
+
+
+class CacheCartStore(BaseCartStore):
+    """
+    Cart store on the Django cache: Redis or Memcached in production (set
+    CACHES), process memory with the default LocMemCache.
+    A dirty cart has its own flag key. The first write that sets the flag
+    also appends the cart key to a log of numbered entries, each numbered by
+    an atomic incr(), so workers never overwrite each other's marks and no
+    single value grows with the number of carts. Flags and entries expire
+    with the cart. A mark lost in a race only delays the flush until
+    checkout, which always writes the cart through.
+    """
+    prefix = 'cart-store'
+    # Log entries read per get_many() when collecting dirty keys
+    scan_batch_size = 1000
+
+    def __init__(self):
+        self.timeout = getattr(settings, 'CART_STORE_TIMEOUT', 60 * 60 * 24 * 30)
+
+    def _key(self, key):
+        return f'{self.prefix}:{key}'
+
+    def _flag(self, key):
+        return f'{self.prefix}:dirty:{key}'
+
+    def _entry(self, number):
+        return f'{self.prefix}:dirty-log:{number}'
+
+    def _counter(self, name):
+        """Current value of a log counter, created at zero if missing"""
+        key = f'{self.prefix}:dirty-log-{name}'
+        cache.add(key, 0, None)
+        return key, cache.get(key, 0)
+
+    def get(self, key):
+        data = cache.get(self._key(key))
+        return None if data is None else self._load(data)
+
+    def set(self, key, lines, dirty=True):
+        cache.set(self._key(key), self._dump(lines), self.timeout)
+        if dirty and cache.add(self._flag(key), True, self.timeout):
+            last, _ = self._counter('last')
+            cache.set(self._entry(cache.incr(last)), key, self.timeout)
+
+    def delete(self, key):
+        cache.delete(self._key(key))
+        self.clear_dirty(key)
+
+    def dirty_keys(self):
+        """
+        Keys of carts marked dirty since the previous call and still flagged.
+        Reading consumes the log, so a flush job calls this once per run.
+        """
+        _, last = self._counter('last')
+        read, first = self._counter('read')
+        keys = set()
+        for start in range(first + 1, last + 1, self.scan_batch_size):
+            entries = [self._entry(number) for number in range(start, min(start + self.scan_batch_size, last + 1))]
+            keys.update(cache.get_many(entries).values())
+            cache.delete_many(entries)
+        cache.set(read, last, None)
+        flagged = cache.get_many([self._flag(key) for key in keys])
+        return sorted(key for key in keys if self._flag(key) in flagged)
+
+    def clear_dirty(self, key):
+        cache.delete(self._flag(key))
+
+
+class FileCartStore(BaseCartStore):
+    """
+    Cart store on the local filesystem (CART_STORE_PATH), for development and
+    tests. One JSON file per cart, replaced atomically; dirty carts have a
+    marker file.
+    """
+    def __init__(self, path=None):
+        self.path = Path(path or getattr(settings, 'CART_STORE_PATH', Path(tempfile.gettempdir()) / 'cart-store'))
+        (self.path / 'dirty').mkdir(parents=True, exist_ok=True)
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def _filename(key):
+        return key.replace(':', '-')
+
+    def _cart_path(self, key):
+        return self.path / f'{self._filename(key)}.json'
+
+    def _dirty_path(self, key):
+        return self.path / 'dirty' / self._filename(key)
+
+    def get(self, key):
+        try:
+            with open(self._cart_path(key), encoding='utf-8') as handle:
+                return self._load(json.load(handle))
+        except FileNotFoundError:
+            return None
+
+    def set(self, key, lines, dirty=True):
+        with self.lock:
+            descriptor, temporary = tempfile.mkstemp(dir=self.path, suffix='.tmp')
+            with os.fdopen(descriptor, 'w', encoding='utf-8') as handle:
+                json.dump(self._dump(lines), handle)
+            os.replace(temporary, self._cart_path(key))
+            if dirty:
+                self._dirty_path(key).write_text(key, encoding='utf-8')
+
+    def delete(self, key):
+        with self.lock:
+            self._cart_path(key).unlink(missing_ok=True)
+            self._dirty_path(key).unlink(missing_ok=True)
+
+    def dirty_keys(self):
+        return sorted(marker.read_text(encoding='utf-8') for marker in (self.path / 'dirty').iterdir())
+
+    def clear_dirty(self, key):
+        self._dirty_path(key).unlink(missing_ok=True)
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_cart_store():
+    """Return the configured cart store (CART_STORE_BACKEND), or None when carts live only in the database"""
+    backend = getattr(settings, 'CART_STORE_BACKEND', '')
+    if not backend:
+        return None
+    with _stores_lock:
+        if backend not in _stores:
+            _stores[backend] = import_string(backend)()
+        return _stores[backend]
+
+
+def load_user_cart(store, user):
+    """The user's hot cart, seeded from their Cart/CartItem rows on first use"""
+    from .models import CartItem
+    key = user_cart_key(user)
+    lines = store.get(key)
+    if lines is None:
+        lines = dict(CartItem.objects.filter(cart__user=user).values_list('product_id', 'quantity'))
+        store.set(key, lines, dirty=False)
+    return lines
+
+
+def add_to_user_cart(user, product_id, quantity=1):
+    """
+    Add to the user's cart wherever it lives: the hot cart when a store is
+    configured, Cart/CartItem otherwise. Code outside the cart API adds
+    through here, because checkout replaces the CartItem rows with the hot cart.
+    """
+    from .models import Cart, CartItem
+    store = get_cart_store()
+    if store is not None:
+        lines = load_user_cart(store, user)
+        lines[product_id] = lines.get(product_id, 0) + quantity
+        store.set(user_cart_key(user), lines)
+        return
+
+    cart, _ = Cart.objects.get_or_create(user=user)
+    cart_item, created = CartItem.objects.get_or_create(
+        cart=cart,
+        product_id=product_id,
+        defaults={'quantity': quantity}
+    )
+    if not created:
+        cart_item.quantity += quantity
+        cart_item.save()
+
+
+def save_cart_lines(user, lines):
+    """
+    Make the user's CartItem rows match {product_id: quantity} with one
+    DELETE for dropped lines and one upserting bulk INSERT for the rest.
+    """
+    from .models import Cart, CartItem
+    with transaction.atomic():
+        cart, _ = Cart.objects.get_or_create(user=user)
+        CartItem.objects.filter(cart=cart).exclude(product_id__in=list(lines)).delete()
+        if lines:
+            upsert = {'update_conflicts': True, 'update_fields': ['quantity', 'updated_at']}
+            if connection.features.supports_update_conflicts_with_target:
+                upsert['unique_fields'] = ['cart', 'product']
+            CartItem.objects.bulk_create([
+                CartItem(cart=cart, product_id=product_id, quantity=quantity)
+                for product_id, quantity in lines.items()
+            ], **upsert)
+    return cart
+
+
+def write_through(store, user):
+    """Persist the user's hot cart to Cart/CartItem and clear its dirty mark"""
+    key = user_cart_key(user)
+    # Cleared before reading, so a write racing the flush marks the cart dirty again
+    store.clear_dirty(key)
+    lines = store.get(key)
+    if lines is None:
+        return None
+
+    from products.models import Product
+    # Products deleted since they were added can't be written as CartItem rows
+    live = set(Product.objects.filter(pk__in=list(lines)).values_list('pk', flat=True))
+    lines = {product_id: quantity for product_id, quantity in lines.items() if product_id in live}
+
+    return save_cart_lines(user, lines)
+
+
+def flush_dirty_carts(store):
+    """Write every dirty user cart through; anonymous carts stay in the store. Returns the count."""
+    from accounts.models import User
+    user_ids = [int(key.split(':', 1)[1]) for key in store.dirty_keys() if key.startswith('user:')]
+    flushed = 0
+    for user in User.objects.filter(pk__in=user_ids):
+        if write_through(store, user) is not None:
+            flushed += 1
+    return flushed
+
+
+def merge_anonymous_cart(store, token, user):
+    """Fold an anonymous cart into the user's cart (quantities add up) and drop it"""
+    anonymous_key = anonymous_cart_key(token)
+    anonymous = store.get(anonymous_key)
+    if not anonymous:
+        return None
+    lines = load_user_cart(store, user)
+    for product_id, quantity in anonymous.items():
+        lines[product_id] = lines.get(product_id, 0) + quantity
+    store.set(user_cart_key(user), lines)
+    store.delete(anonymous_key)
+    return lines
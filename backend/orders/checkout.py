@@ -0,0 +1,209 @@
+from decimal import Decimal
+from django.db import models, transaction
+from django.db.models import Case, F, Q, Value, When
+from django.utils import timezone
+from products.facets import FACET_CACHE_NAMESPACE
+from products.models import Product
+from utils.cache import bump_cache_version
+from utils.email import send_order_confirmation_email
+from utils.pagination import count_namespace
+from .coupons import COUPON_CACHE_NAMESPACE, normalize_code
+from .models import Coupon, Order, OrderItem
+
+
+class CheckoutError(Exception):
+    """Checkout can't proceed; `message` is safe to return to the client"""
+    def __init__(self, message):
+        super().__init__(message)
+        self.message = message
+
+
+class InsufficientStock(CheckoutError):
+    """One or more cart lines can't be fulfilled; `shortages` lists them"""
+    def __init__(self, shortages):
+        super().__init__('Insufficient stock')
+        self.shortages = shortages
+
+
+class CouponUnavailable(CheckoutError):
+    """The coupon can't be applied to this order"""
+
+
+def _shortage(product_id, requested, product=None):
+    return {
+        'product_id': product_id,
+        'product_name': product.name if product else None,
+        'requested': requested,
+        'available': product.stock if product and product.status != Product.Status.INACTIVE else 0,
+    }
+
+
+def invalidate_stock_caches():
+    """Queryset updates skip model signals, so drop stock-dependent caches explicitly"""
+    bump_cache_version(FACET_CACHE_NAMESPACE)
+    bump_cache_version(count_namespace(Product))
+
+
+def reserve_stock(quantities):
+    """
+    Atomically take stock for {product_id: quantity}; must run inside a transaction.
+
+    Product rows are locked in one pass in primary-key order, so concurrent
+    checkouts touching the same products can't deadlock. Every line is then
+    decremented by a single UPDATE whose WHERE clause only matches rows that
+    still hold enough stock, which is what actually guarantees stock never
+    goes negative (SQLite ignores SELECT ... FOR UPDATE). Raises
+    InsufficientStock listing every short line.
+    Returns {product_id: Product} as read under the lock.
+    """
+    product_ids = sorted(quantities)
+    products = {
+        product.pk: product
+        for product in Product.objects.select_for_update().filter(pk__in=product_ids).order_by('pk')
+    }
+
+    shortages = [
+        _shortage(product_id, quantities[product_id], products.get(product_id))
+        for product_id in product_ids
+        if product_id not in products
+        or products[product_id].status == Product.Status.INACTIVE
+        or products[product_id].stock < quantities[product_id]
+    ]
+    if shortages:
+        raise InsufficientStock(shortages)
+
+    # One UPDATE for every line; each row is only matched while it still has enough stock
+    still_available = Q()
+    for product_id in product_ids:
+        still_available |= Q(pk=product_id, stock__gte=quantities[product_id])
+    # status is assigned before stock: MySQL evaluates SET clauses left to right
+    updated = Product.objects.filter(still_available).update(
+        status=Case(
+            *[
+                When(pk=product_id, stock=quantity, then=Value(Product.Status.OUT_OF_STOCK))
+                for product_id, quantity in quantities.items()
+            ],
+            default=F('status')
+        ),
+        stock=Case(
+            *[When(pk=product_id, then=F('stock') - quantity) for product_id, quantity in quantities.items()],
+            default=F('stock'),
+            output_field=models.PositiveIntegerField()
+        ),
+        updated_at=timezone.now()
+    )
+    if updated != len(product_ids):
+        # Lost a race that the row locks didn't prevent; the transaction rolls back
+        current = Product.objects.in_bulk(product_ids)
+        raise InsufficientStock([
+            _shortage(product_id, quantities[product_id], current.get(product_id))
+            for product_id in product_ids
+            if product_id not in current or current[product_id].stock < quantities[product_id]
+        ])
+
+    transaction.on_commit(invalidate_stock_caches)
+    return products
+
+
+def redeemable_coupons():
+    """Coupons that are live and still have uses left, evaluated by the database"""
+    now = timezone.now()
+    return Coupon.objects.filter(is_active=True, valid_from__lte=now, valid_to__gte=now).filter(
+        Q(usage_limit__isnull=True) | Q(used_count__lt=F('usage_limit'))
+    )
+
+
+def redeem_coupon(coupon):
+    """
+    Take one use of a coupon; must run inside the checkout transaction.
+    A single conditional UPDATE increments used_count only while it is below
+    usage_limit, so concurrent checkouts can't push it past the limit, and
+    the rest of the coupon row is never rewritten.
+    Raises CouponUnavailable if the last use was taken first.
+    """
+    if not redeemable_coupons().filter(pk=coupon.pk).update(used_count=F('used_count') + 1):
+        raise CouponUnavailable('Coupon is no longer available')
+    coupon.used_count += 1
+    if coupon.usage_limit is not None and coupon.used_count >= coupon.usage_limit:
+        # The update skips signals; cached copies shouldn't keep offering a used-up coupon
+        transaction.on_commit(lambda: bump_cache_version(COUPON_CACHE_NAMESPACE))
+
+
+def place_order(user, cart, address, payment_method, coupon_code=None, customer_notes=''):
+    """
+    Turn a cart into an order: reserve stock, snapshot prices from the locked
+    product rows, apply and redeem the coupon, empty the cart and queue the
+    confirmation email, all in one transaction.
+    Raises CheckoutError (or InsufficientStock) without leaving partial writes.
+    """
+    with transaction.atomic():
+        cart_items = list(cart.items.all())
+        if not cart_items:
+            raise CheckoutError('Cart is empty')
+
+        quantities = {}
+        for cart_item in cart_items:
+            quantities[cart_item.product_id] = quantities.get(cart_item.product_id, 0) + cart_item.quantity
+        products = reserve_stock(quantities)
+
+        lines = []
+        subtotal = Decimal('0')
+        for cart_item in cart_items:
+            product = products[cart_item.product_id]
+            unit_price = product.discounted_price
+            total_price = unit_price * cart_item.quantity
+            subtotal += total_price
+            lines.append((product, unit_price, cart_item.quantity, total_price))
+
+        # Calculate totals
+        discount_amount = Decimal('0')
+        coupon = None
+        if coupon_code:
+            coupon = Coupon.objects.filter(code__iexact=normalize_code(coupon_code)).first()
+            if coupon is None or not coupon.is_valid:
+                raise CouponUnavailable('Coupon is not valid')
+            if subtotal < coupon.min_order_value:
+                raise CouponUnavailable(f'Coupon requires a minimum order of {coupon.min_order_value}')
+            discount_amount = coupon.calculate_discount(subtotal)
+
+        shipping_charge = Decimal('0') if subtotal > Decimal('500') else Decimal('50')
+        tax_amount = (subtotal - discount_amount) * Decimal('0.18')  # 18% tax
+        total_amount = subtotal - discount_amount + shipping_charge + tax_amount
+
+        order = Order.objects.create(
+            user=user,
+            subtotal=subtotal,
+            discount_amount=discount_amount,
+            shipping_charge=shipping_charge,
+            tax_amount=tax_amount,
+            total_amount=total_amount,
+            shipping_address=address,
+            coupon=coupon,
+            payment_method=payment_method,
+            customer_notes=customer_notes or ''
+        )
+
+        # Snapshots are filled in here, so OrderItem.save() has nothing to add
+        OrderItem.objects.bulk_create([
+            OrderItem(
+                order=order,
+                product=product,
+                product_name=product.name,
+                product_price=unit_price,
+                quantity=quantity,
+                total_price=total_price
+            )
+            for product, unit_price, quantity, total_price in lines
+        ])
+
+        # Clear cart
+        cart.items.all().delete()
+
+        # Queued in the outbox, so it's only sent if the order commits
+        send_order_confirmation_email(order)
+
+        # Last, so the lock on a popular coupon's row is held as briefly as possible
+        if coupon:
+            redeem_coupon(coupon)
+
+    return order
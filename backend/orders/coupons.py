@@ -0,0 +1,78 @@
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+from utils.cache import get_cache_version
+
+
+# Cache namespace bumped on every coupon write
+COUPON_CACHE_NAMESPACE = 'coupon-rules'
+
+# Most coupons each process keeps, least recently used evicted first
+COUPON_CACHE_SIZE = getattr(settings, 'COUPON_CACHE_SIZE', 1024)
+
+# Longest a coupon is reused before it's reloaded, in seconds
+COUPON_CACHE_TIMEOUT = getattr(settings, 'COUPON_CACHE_TIMEOUT', 300)
+
+# Unknown codes (mostly half-typed ones) are remembered for less time
+COUPON_MISS_TIMEOUT = 30
+
+
+def normalize_code(code):
+    return (code or '').strip().upper()
+
+
+class CouponCache:
+    """
+    Per-process LRU of coupons by normalized code, for validate_coupon.
+    An entry expires after COUPON_CACHE_TIMEOUT, or earlier when the coupon
+    starts or stops being valid, and every entry is dropped when the shared
+    namespace version changes (any coupon write, in any process).
+    Cached usage counts can lag; checkout re-validates against the database.
+    """
+    def __init__(self, max_size=COUPON_CACHE_SIZE, timeout=COUPON_CACHE_TIMEOUT):
+        self.max_size = max_size
+        self.timeout = timeout
+        self.entries = OrderedDict()
+        self.version = None
+        self.lock = threading.Lock()
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def _expires(self, coupon, now):
+        if coupon is None:
+            return now + COUPON_MISS_TIMEOUT
+        expires = now + self.timeout
+        for boundary in (coupon.valid_from.timestamp(), coupon.valid_to.timestamp()):
+            if boundary > now:
+                expires = min(expires, boundary)
+        return expires
+
+    def get(self, code):
+        """The coupon for `code`, or None if there isn't one"""
+        from .models import Coupon
+        code = normalize_code(code)
+        version = get_cache_version(COUPON_CACHE_NAMESPACE)
+        now = time.time()
+        with self.lock:
+            if version != self.version:
+                self.entries.clear()
+                self.version = version
+            entry = self.entries.get(code)
+            if entry is not None and entry[1] > now:
+                self.entries.move_to_end(code)
+                return entry[0]
+
+        coupon = Coupon.objects.filter(code__iexact=code).first() if code else None
+        with self.lock:
+            if version == self.version:
+                self.entries[code] = (coupon, self._expires(coupon, now))
+                self.entries.move_to_end(code)
+                while len(self.entries) > self.max_size:
+                    self.entries.popitem(last=False)
+        return coupon
+
+
+coupon_cache = CouponCache()
@@ -0,0 +1,82 @@
+import csv
+import json
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from .models import Order
+
+
+# Orders read per query; memory use depends on this, not on the export size
+EXPORT_BATCH_SIZE = getattr(settings, 'ORDER_EXPORT_BATCH_SIZE', 2000)
+
+# (column name, lookup from Order); one row per order item, order columns repeated
+EXPORT_COLUMNS = (
+    ('order_number', 'order_number'),
+    ('created_at', 'created_at'),
+    ('status', 'status'),
+    ('payment_status', 'payment_status'),
+    ('payment_method', 'payment_method'),
+    ('customer_email', 'user__email'),
+    ('subtotal', 'subtotal'),
+    ('discount_amount', 'discount_amount'),
+    ('shipping_charge', 'shipping_charge'),
+    ('tax_amount', 'tax_amount'),
+    ('total_amount', 'total_amount'),
+    ('product_name', 'items__product_name'),
+    ('product_price', 'items__product_price'),
+    ('quantity', 'items__quantity'),
+    ('item_total', 'items__total_price'),
+)
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+def export_rows(queryset, batch_size=None):
+    """
+    Yield one tuple per order item (orders without items give one row of
+    order columns) for every order in `queryset`, in primary-key order.
+
+    Orders are walked in keyset batches of `batch_size` ids, and each batch's
+    rows are read with values_list().iterator(), so no model instances are
+    built and memory stays flat however many orders match. Batching by order
+    id, rather than only streaming one cursor, also keeps memory flat on
+    MySQL, whose driver buffers a whole result set client-side.
+    """
+    batch_size = batch_size or EXPORT_BATCH_SIZE
+    lookups = [lookup for _, lookup in EXPORT_COLUMNS]
+    order_ids = queryset.order_by('pk').values_list('pk', flat=True)
+    last_id = 0
+    while True:
+        batch = list(order_ids.filter(pk__gt=last_id)[:batch_size])
+        if not batch:
+            return
+        rows = Order.objects.filter(pk__in=batch).order_by('pk', 'items__id').values_list(*lookups)
+        yield from rows.iterator(chunk_size=batch_size)
+        last_id = batch[-1]
+
+
+class _Echo:
+    """File-like object whose write() returns the line instead of storing it"""
+    def write(self, value):
+        return value
+
+
+def stream_csv(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow([name for name, _ in EXPORT_COLUMNS])
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def stream_ndjson(rows):
+    names = [name for name, _ in EXPORT_COLUMNS]
+    for row in rows:
+        yield json.dumps(dict(zip(names, row)), cls=DjangoJSONEncoder) + '\n'
+
+
+def stream_export(queryset, export_format, batch_size=None):
+    """Encoded chunks of the export in `export_format` (csv or ndjson)"""
+    rows = export_rows(queryset, batch_size)
+    return stream_csv(rows) if export_format == 'csv' else stream_ndjson(rows)
@@ -0,0 +1,41 @@
+import django_filters
+from .models import Order
+
+
+def prefix_upper_bound(prefix):
+    """Smallest string greater than every string starting with `prefix`, or None"""
+    while prefix:
+        last = ord(prefix[-1])
+        if last < 0x10FFFF:
+            return prefix[:-1] + chr(last + 1)
+        prefix = prefix[:-1]
+    return None
+
+
+class OrderFilter(django_filters.FilterSet):
+    """
+    Order list filters. Each one is written to use an index on orders:
+    status and payment filters lead composite (field, created_at) indexes that
+    also serve the newest-first ordering, customer email goes through the
+    unique users.email index into (user, created_at), and the order-number
+    prefix is a range on the order_number index rather than a LIKE.
+    """
+    status = django_filters.ChoiceFilter(choices=Order.OrderStatus.choices)
+    payment_status = django_filters.ChoiceFilter(choices=Order.PaymentStatus.choices)
+    payment_method = django_filters.ChoiceFilter(choices=Order.PaymentMethod.choices)
+    # created_at_after / created_at_before, inclusive whole days
+    created_at = django_filters.DateFromToRangeFilter()
+    customer_email = django_filters.CharFilter(field_name='user__email')
+    order_number = django_filters.CharFilter(method='filter_order_number_prefix')
+
+    class Meta:
+        model = Order
+        fields = ['status', 'payment_status', 'payment_method', 'created_at', 'customer_email', 'order_number']
+
+    def filter_order_number_prefix(self, queryset, name, value):
+        prefix = value.strip().upper()
+        if not prefix:
+            return queryset
+        queryset = queryset.filter(order_number__gte=prefix)
+        upper = prefix_upper_bound(prefix)
+        return queryset.filter(order_number__lt=upper) if upper else queryset
@@ -0,0 +1,109 @@
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from utils.cache import bump_cache_version
+from utils.email import send_bulk_email
+from utils.pagination import count_namespace
+from .models import Order
+
+
+Status = Order.OrderStatus
+
+# Statuses an order may move to from each status
+ALLOWED_TRANSITIONS = {
+    Status.PENDING: {Status.CONFIRMED, Status.PROCESSING, Status.CANCELLED},
+    Status.CONFIRMED: {Status.PROCESSING, Status.SHIPPED, Status.CANCELLED},
+    Status.PROCESSING: {Status.SHIPPED, Status.CANCELLED},
+    Status.SHIPPED: {Status.DELIVERED, Status.RETURNED},
+    Status.DELIVERED: {Status.RETURNED},
+    Status.CANCELLED: set(),
+    Status.RETURNED: set(),
+}
+
+# Timestamp stamped when an order enters the status
+STATUS_TIMESTAMPS = {
+    Status.CONFIRMED: 'confirmed_at',
+    Status.SHIPPED: 'shipped_at',
+    Status.DELIVERED: 'delivered_at',
+}
+
+# Emails queued when an order enters the status
+NOTIFICATION_TEMPLATES = {
+    Status.SHIPPED: 'order_shipped',
+    Status.DELIVERED: 'order_delivered',
+}
+
+# Most orders a single bulk transition may touch
+BULK_STATUS_LIMIT = 1000
+
+
+def allowed_sources(new_status):
+    """Statuses from which an order may move to `new_status`"""
+    return sorted(source for source, targets in ALLOWED_TRANSITIONS.items() if new_status in targets)
+
+
+def notification_message(order):
+    """Outbox message for a shipped or delivered order, matching utils.email"""
+    context = {'order': order, 'user': order.user}
+    if order.status == Status.SHIPPED:
+        subject = f'Your Order Has Been Shipped - {order.order_number}'
+        context['tracking_url'] = f'{settings.FRONTEND_URL}/orders/{order.order_number}/track'
+    else:
+        subject = f'Your Order Has Been Delivered - {order.order_number}'
+    return {'to': order.user.email, 'subject': subject, 'context': context}
+
+
+def invalidate_order_caches():
+    """Queryset updates skip model signals, so drop cached order counts explicitly"""
+    bump_cache_version(count_namespace(Order))
+
+
+def transition_orders(order_ids, new_status):
+    """
+    Move many orders to `new_status` in one transaction: a locking read, one
+    UPDATE that stamps the status timestamp, one read of the changed orders
+    and one INSERT of their notifications.
+    Orders that don't exist or can't make the transition are left alone and
+    returned as rejections. Returns (updated ids, rejections).
+    """
+    order_ids = list(dict.fromkeys(order_ids))
+    sources = allowed_sources(new_status)
+    timestamp_field = STATUS_TIMESTAMPS.get(new_status)
+    now = timezone.now()
+
+    with transaction.atomic():
+        current = dict(
+            Order.objects.select_for_update().filter(pk__in=order_ids).order_by('pk').values_list('pk', 'status')
+        )
+        eligible = [order_id for order_id in current if current[order_id] in sources]
+
+        changes = {'status': new_status, 'updated_at': now}
+        if timestamp_field:
+            changes[timestamp_field] = now
+        # The status condition keeps the UPDATE safe even where row locks aren't taken
+        Order.objects.filter(pk__in=eligible, status__in=sources).update(**changes)
+
+        # Exactly the rows this UPDATE changed
+        orders = list(Order.objects.filter(pk__in=eligible, status=new_status, updated_at=now).select_related('user'))
+        updated_ids = sorted(order.pk for order in orders)
+
+        if new_status in NOTIFICATION_TEMPLATES and orders:
+            send_bulk_email(
+                NOTIFICATION_TEMPLATES[new_status],
+                [notification_message(order) for order in orders],
+                {'site_name': 'Apni Shop'}
+            )
+        transaction.on_commit(invalidate_order_caches)
+
+    updated = set(updated_ids)
+    rejected = []
+    for order_id in order_ids:
+        if order_id not in current:
+            rejected.append({'order_id': order_id, 'status': None, 'reason': 'not_found'})
+        elif order_id not in updated:
+            rejected.append({
+                'order_id': order_id,
+                'status': current[order_id],
+                'reason': 'invalid_transition',
+            })
+    return updated_ids, rejected
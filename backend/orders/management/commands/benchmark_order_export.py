@@ -0,0 +1,125 @@
+import os
+import resource
+import time
+from decimal import Decimal
+from django.core.management.base import BaseCommand
+from django.http import QueryDict
+from accounts.models import User
+from orders.export import EXPORT_BATCH_SIZE, stream_export
+from orders.filters import OrderFilter
+from orders.models import Address, Order, OrderItem
+from products.models import Category, Product
+
+
+# Order-number prefix of synthetic orders; the export is filtered on it
+SYNTHETIC_PREFIX = 'BENCH-'
+
+
+def current_rss_mb():
+    """Resident set size now (Linux), or the peak so far elsewhere"""
+    try:
+        with open('/proc/self/statm') as handle:
+            return int(handle.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks the streaming order export, sampling RSS as rows are written.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=0, help='Synthetic orders to create first.')
+        parser.add_argument('--items', type=int, default=2, help='Items per synthetic order.')
+        parser.add_argument('--format', dest='export_format', choices=['csv', 'ndjson'], default='csv')
+        parser.add_argument('--batch-size', type=int, default=EXPORT_BATCH_SIZE, help='Orders per query.')
+        parser.add_argument('--samples', type=int, default=10, help='RSS samples to report.')
+        parser.add_argument('--cleanup', action='store_true', help='Delete the synthetic orders afterwards.')
+
+    def seed(self, count, items_per_order):
+        user, _ = User.objects.get_or_create(
+            email='export-benchmark@example.com',
+            defaults={'username': 'export-benchmark', 'first_name': 'Export', 'last_name': 'Benchmark'}
+        )
+        address = Address.objects.filter(user=user).first() or Address.objects.create(
+            user=user, full_name='Export Benchmark', phone='9999999999', address_line1='1 Benchmark Road',
+            city='Mumbai', state='Maharashtra', pincode='400001'
+        )
+        category, _ = Category.objects.get_or_create(name='Export Benchmark')
+        product = Product.objects.filter(category=category).first() or Product.objects.create(
+            name='Export Benchmark Product', description='Synthetic', category=category, price=Decimal('499.00')
+        )
+
+        subtotal = product.price * 2 * items_per_order
+        start = Order.objects.filter(order_number__startswith=SYNTHETIC_PREFIX).count()
+        started = time.perf_counter()
+        for offset in range(start, start + count, 5000):
+            numbers = [f'{SYNTHETIC_PREFIX}{i:09d}' for i in range(offset, min(offset + 5000, start + count))]
+            Order.objects.bulk_create([
+                Order(
+                    order_number=number, user=user, shipping_address=address, payment_method=Order.PaymentMethod.COD,
+                    subtotal=subtotal, total_amount=subtotal
+                )
+                for number in numbers
+            ])
+            # bulk_create doesn't return primary keys on MySQL
+            order_ids = Order.objects.filter(order_number__in=numbers).values_list('pk', flat=True)
+            OrderItem.objects.bulk_create([
+                OrderItem(
+                    order_id=order_id, product=product, product_name=product.name, product_price=product.price,
+                    quantity=2, total_price=product.price * 2
+                )
+                for order_id in order_ids
+                for _ in range(items_per_order)
+            ])
+        self.stdout.write(f'Seeded {count} orders in {time.perf_counter() - started:.1f} s')
+
+    def cleanup(self):
+        synthetic = Order.objects.filter(order_number__startswith=SYNTHETIC_PREFIX)
+        deleted = 0
+        while True:
+            batch = list(synthetic.values_list('pk', flat=True)[:5000])
+            if not batch:
+                break
+            OrderItem.objects.filter(order_id__in=batch).delete()
+            deleted += Order.objects.filter(pk__in=batch).delete()[1].get('orders.Order', 0)
+        self.stdout.write(f'Deleted {deleted} synthetic orders')
+
+    def handle(self, *args, **options):
+        if options['seed']:
+            self.stdout.write(self.style.NOTICE(f"Seeding {options['seed']} synthetic orders..."))
+            self.seed(options['seed'], options['items'])
+
+        # The same filter path as the API, narrowed to the synthetic orders
+        queryset = OrderFilter(
+            QueryDict(f'order_number={SYNTHETIC_PREFIX}'), queryset=Order.objects.all()
+        ).qs
+        total_orders = queryset.count()
+        if not total_orders:
+            self.stdout.write(self.style.WARNING('No synthetic orders to export; pass --seed N.'))
+            return
+        expected_rows = total_orders * max(options['items'], 1)
+        sample_every = max(expected_rows // options['samples'], 1)
+
+        self.stdout.write(self.style.NOTICE(
+            f"Exporting {total_orders} orders as {options['export_format']} in batches of {options['batch_size']}..."
+        ))
+        baseline = current_rss_mb()
+        samples = []
+        written = lines = 0
+        started = time.perf_counter()
+        for chunk in stream_export(queryset, options['export_format'], options['batch_size']):
+            written += len(chunk)
+            lines += 1
+            if lines % sample_every == 0:
+                samples.append(current_rss_mb())
+                self.stdout.write(f'  {lines:>10} lines  {written / 2 ** 20:8.1f} MB out  RSS {samples[-1]:7.1f} MB')
+        elapsed = time.perf_counter() - started
+
+        peak = max(samples or [current_rss_mb()])
+        self.stdout.write(
+            f'{lines} lines, {written / 2 ** 20:.1f} MB in {elapsed:.1f} s ({lines / elapsed:.0f} lines/s); '
+            f'RSS {baseline:.1f} MB before, {peak:.1f} MB peak'
+        )
+        if options['cleanup']:
+            self.cleanup()
+        self.stdout.write(self.style.SUCCESS(f'✓ RSS grew {peak - baseline:.1f} MB over the export'))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand, CommandError
+from orders.cart_store import get_cart_store, flush_dirty_carts
+
+
+class Command(BaseCommand):
+    help = 'Writes dirty hot carts from the cart store through to the database.'
+
+    def handle(self, *args, **options):
+        store = get_cart_store()
+        if store is None:
+            raise CommandError('No cart store configured (set CART_STORE_BACKEND).')
+
+        self.stdout.write(self.style.NOTICE('Flushing dirty carts...'))
+        flushed = flush_dirty_carts(store)
+        self.stdout.write(self.style.SUCCESS(f'✓ Flushed {flushed} carts'))
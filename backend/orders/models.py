@@ -1,4 +1,6 @@
+from decimal import Decimal
 from django.db import models
+from django.db.models import ExpressionWrapper, F, Prefetch, Sum, Value
 from django.utils.translation import gettext_lazy as _
 from django.core.validators import MinValueValidator
 from accounts.models import User
@@ -6,6 +8,49 @@ from products.models import Product
 import uuid
 
 
+# Exact enough for price * (percentage / 100) on DECIMAL(10, 2) columns
+PRICE_EXPRESSION_FIELD = models.DecimalField(max_digits=20, decimal_places=6)
+
+
+def discounted_price_expression(product='product__'):
+    """Database-side equivalent of Product.discounted_price"""
+    price = F(f'{product}price')
+    return ExpressionWrapper(
+        price - price * F(f'{product}discount_percentage') / Value(Decimal('100')),
+        output_field=PRICE_EXPRESSION_FIELD
+    )
+
+
+class CartItemQuerySet(models.QuerySet):
+    def with_prices(self):
+        """Annotate unit and line prices so reading them never touches the product"""
+        return self.annotate(
+            annotated_unit_price=discounted_price_expression(),
+        ).annotate(
+            annotated_total_price=ExpressionWrapper(
+                F('annotated_unit_price') * F('quantity'), output_field=PRICE_EXPRESSION_FIELD
+            )
+        )
+
+
+class CartQuerySet(models.QuerySet):
+    def with_totals(self):
+        """
+        Annotate item count and subtotal in the cart query itself, and prefetch
+        priced items with the product columns the cart serializer reads.
+        """
+        items = CartItem.objects.with_prices().select_related('product__category', 'product__subcategory')
+        return self.annotate(
+            annotated_total_items=Sum('items__quantity'),
+            annotated_subtotal=Sum(
+                ExpressionWrapper(
+                    discounted_price_expression('items__product__') * F('items__quantity'),
+                    output_field=PRICE_EXPRESSION_FIELD
+                )
+            ),
+        ).prefetch_related(Prefetch('items', queryset=items))
+
+
 class Cart(models.Model):
     """
     Shopping Cart Model
@@ -19,6 +64,8 @@ class Cart(models.Model):
     created_at = models.DateTimeField(_('created at'), auto_now_add=True)
     updated_at = models.DateTimeField(_('updated at'), auto_now=True)
     
+    objects = CartQuerySet.as_manager()
+    
     class Meta:
         db_table = 'carts'
         verbose_name = _('cart')
@@ -29,10 +76,14 @@ class Cart(models.Model):
     
     @property
     def total_items(self):
+        if hasattr(self, 'annotated_total_items'):
+            return self.annotated_total_items or 0
         return sum(item.quantity for item in self.items.all())
     
     @property
     def subtotal(self):
+        if hasattr(self, 'annotated_subtotal'):
+            return self.annotated_subtotal or Decimal('0')
         return sum(item.total_price for item in self.items.all())
 
 
@@ -60,6 +111,8 @@ class CartItem(models.Model):
     added_at = models.DateTimeField(_('added at'), auto_now_add=True)
     updated_at = models.DateTimeField(_('updated at'), auto_now=True)
     
+    objects = CartItemQuerySet.as_manager()
+    
     class Meta:
         db_table = 'cart_items'
         verbose_name = _('cart item')
@@ -74,10 +127,14 @@ class CartItem(models.Model):
     
     @property
     def unit_price(self):
+        if hasattr(self, 'annotated_unit_price'):
+            return self.annotated_unit_price
         return self.product.discounted_price
     
     @property
     def total_price(self):
+        if hasattr(self, 'annotated_total_price'):
+            return self.annotated_total_price
         return self.unit_price * self.quantity
 
 
@@ -355,8 +412,11 @@ class Order(models.Model):
         indexes = [
             models.Index(fields=['order_number']),
             models.Index(fields=['user', 'status']),
+            models.Index(fields=['user', 'created_at']),
             models.Index(fields=['status', 'created_at']),
-            models.Index(fields=['payment_status']),
+            models.Index(fields=['payment_status', 'created_at']),
+            models.Index(fields=['payment_method', 'created_at']),
+            models.Index(fields=['created_at']),
         ]
     
     def save(self, *args, **kwargs):
@@ -1,6 +1,7 @@
 from rest_framework import serializers
 from .models import Cart, CartItem, Address, Coupon, Order, OrderItem
 from products.serializers import ProductListSerializer
+from .fulfillment import BULK_STATUS_LIMIT
 
 
 class CartItemSerializer(serializers.ModelSerializer):
@@ -25,6 +26,26 @@ class CartSerializer(serializers.ModelSerializer):
         read_only_fields = ('user', 'created_at', 'updated_at')
 
 
+class CartLineSerializer(serializers.Serializer):
+    """A line of a hot cart held in the cart store; its id is the product id"""
+    id = serializers.IntegerField(source='product.id', read_only=True)
+    product = serializers.IntegerField(source='product.id', read_only=True)
+    quantity = serializers.IntegerField(read_only=True)
+    unit_price = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
+    total_price = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
+    product_details = ProductListSerializer(source='product', read_only=True)
+
+
+class CartOperationSerializer(serializers.Serializer):
+    op = serializers.ChoiceField(choices=['add', 'set', 'remove'])
+    product_id = serializers.IntegerField()
+    quantity = serializers.IntegerField(required=False, default=1, min_value=0)
+
+
+class CartBatchSerializer(serializers.Serializer):
+    operations = CartOperationSerializer(many=True, allow_empty=False, max_length=100)
+
+
 class AddressSerializer(serializers.ModelSerializer):
     full_address = serializers.CharField(read_only=True)
     
@@ -50,6 +71,30 @@ class OrderItemSerializer(serializers.ModelSerializer):
         read_only_fields = ('order',)
 
 
+class OrderItemSummarySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = OrderItem
+        fields = ('id', 'product_name', 'quantity', 'total_price')
+
+
+class OrderListSerializer(serializers.ModelSerializer):
+    """Order history rows: the fields the order lists show, without address or price breakdown"""
+    items = OrderItemSummarySerializer(many=True, read_only=True)
+    item_count = serializers.SerializerMethodField()
+    user_email = serializers.CharField(source='user.email', read_only=True)
+    
+    class Meta:
+        model = Order
+        fields = (
+            'id', 'order_number', 'status', 'payment_status', 'payment_method', 'total_amount',
+            'created_at', 'user_email', 'item_count', 'items'
+        )
+    
+    def get_item_count(self, obj):
+        # Counted from the prefetched items, not with a query per order
+        return len(obj.items.all())
+
+
 class OrderSerializer(serializers.ModelSerializer):
     items = OrderItemSerializer(many=True, read_only=True)
     shipping_address_details = AddressSerializer(source='shipping_address', read_only=True)
@@ -66,3 +111,10 @@ class OrderCreateSerializer(serializers.Serializer):
     payment_method = serializers.ChoiceField(choices=Order.PaymentMethod.choices)
     coupon_code = serializers.CharField(required=False, allow_blank=True)
     customer_notes = serializers.CharField(required=False, allow_blank=True)
+
+
+class OrderBulkStatusSerializer(serializers.Serializer):
+    order_ids = serializers.ListField(
+        child=serializers.IntegerField(), allow_empty=False, max_length=BULK_STATUS_LIMIT
+    )
+    status = serializers.ChoiceField(choices=Order.OrderStatus.choices)
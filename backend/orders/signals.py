@@ -0,0 +1,12 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .coupons import COUPON_CACHE_NAMESPACE, coupon_cache
+from .models import Coupon
+from utils.cache import bump_cache_version
+
+
+@receiver([post_save, post_delete], sender=Coupon)
+def invalidate_coupon_cache(sender, **kwargs):
+    """Coupon writes invalidate every process's coupon cache"""
+    bump_cache_version(COUPON_CACHE_NAMESPACE)
+    coupon_cache.clear()
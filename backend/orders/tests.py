@@ -1,3 +1,1239 @@
-from django.test import TestCase
+import csv
+import json
+import random
+import shutil
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.http import QueryDict
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from accounts.models import User
+from products.models import Category, Product
+from orders.cart_store import CacheCartStore, FileCartStore, get_cart_store, user_cart_key
+from orders.coupons import CouponCache, coupon_cache
+from orders.export import stream_export
+from orders.filters import OrderFilter
+from orders.checkout import place_order, redeem_coupon, reserve_stock, CheckoutError, CouponUnavailable
+from orders.models import Address, Cart, CartItem, Coupon, Order, OrderItem
+from wishlist.models import Wishlist, WishlistItem
 
-# Create your tests here.
+
+def create_user(email='user@example.com', role=User.Role.USER):
+    """Create a user with a fixed password."""
+    return User.objects.create_user(
+        email=email,
+        username=email.split('@')[0],
+        password='Test@12345',
+        first_name='Test',
+        last_name='User',
+        role=role
+    )
+
+
+def create_address(user):
+    """Create a shipping address for a user."""
+    return Address.objects.create(
+        user=user,
+        full_name='Test User',
+        phone='9999999999',
+        address_line1='1 Test Street',
+        city='Mumbai',
+        state='Maharashtra',
+        pincode='400001'
+    )
+
+
+def create_product(name='Test Product', price='100.00', stock=10, discount_percentage=0, category=None):
+    """Create a product, and its category if none is given."""
+    category = category or Category.objects.get_or_create(name='Electronics')[0]
+    return Product.objects.create(
+        name=name,
+        description=name,
+        category=category,
+        price=Decimal(price),
+        discount_percentage=discount_percentage,
+        stock=stock
+    )
+
+
+def create_coupon(code='SAVE10', usage_limit=None, **kwargs):
+    """Create a live 10% coupon."""
+    now = timezone.now()
+    return Coupon.objects.create(
+        code=code,
+        discount_value=Decimal('10'),
+        usage_limit=usage_limit,
+        valid_from=now - timedelta(days=1),
+        valid_to=now + timedelta(days=1),
+        **kwargs
+    )
+
+
+def create_order(user, address, total='100.00', **kwargs):
+    """Create an order without items."""
+    return Order.objects.create(
+        user=user,
+        subtotal=Decimal(total),
+        total_amount=Decimal(total),
+        shipping_address=address,
+        payment_method=Order.PaymentMethod.COD,
+        **kwargs
+    )
+
+
+class OrderKeysetPaginationTest(TestCase):
+    """
+    Test suite for keyset (cursor) pagination of the order history.
+    """
+    
+    def setUp(self):
+        """Set up test fixtures."""
+        self.user = create_user()
+        self.address = create_address(self.user)
+        for _ in range(25):
+            create_order(self.user, self.address)
+        other = create_user('other@example.com')
+        create_order(other, create_address(other))
+        
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+    
+    def test_cursor_walks_own_orders(self):
+        """Test that cursor pages return each of the user's orders once, newest first."""
+        ids = []
+        url = '/api/orders/orders/?cursor='
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids.extend(item['id'] for item in response.data['results'])
+            url = response.data['next']
+        
+        expected = list(Order.objects.filter(user=self.user).order_by('-created_at', '-id').values_list('id', flat=True))
+        self.assertEqual(ids, expected)
+
+
+class OrderHistoryQueryTest(TestCase):
+    """
+    Test suite for the queries behind the order list and detail endpoints.
+    """
+    
+    def setUp(self):
+        """Set up test fixtures."""
+        cache.clear()
+        self.user = create_user()
+        self.address = create_address(self.user)
+        self.products = [create_product(f'Product {i}') for i in range(3)]
+        self.admin = create_user('admin@example.com', role=User.Role.ADMIN)
+        self.client = APIClient()
+    
+    def add_orders(self, count, user=None):
+        """Create `count` orders with three items each."""
+        user = user or self.user
+        orders = []
+        for _ in range(count):
+            order = create_order(user, self.address)
+            for product in self.products:
+                OrderItem.objects.create(order=order, product=product, quantity=2)
+            orders.append(order)
+        return orders
+    
+    def list_queries(self, user):
+        """List orders as `user` and return (response, queries run)."""
+        cache.clear()
+        self.client.force_authenticate(user)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get('/api/orders/orders/')
+        self.assertEqual(response.status_code, 200)
+        return response, len(context.captured_queries)
+    
+    def test_list_query_count_is_constant(self):
+        """Test that listing 12 orders takes as many queries as listing 2."""
+        self.add_orders(2)
+        _, small = self.list_queries(self.user)
+        self.add_orders(10)
+        response, large = self.list_queries(self.user)
+        
+        self.assertEqual(small, large)
+        # COUNT, orders joined with users, items
+        self.assertEqual(large, 3)
+        self.assertEqual(len(response.data['results']), 12)
+    
+    def test_admin_list_query_count_is_constant(self):
+        """Test that the admin listing of every customer's orders doesn't query per order or per user."""
+        self.add_orders(2)
+        _, small = self.list_queries(self.admin)
+        for i in range(5):
+            self.add_orders(2, user=create_user(f'customer{i}@example.com'))
+        response, large = self.list_queries(self.admin)
+        
+        self.assertEqual(small, large)
+        self.assertEqual(len({row['user_email'] for row in response.data['results']}), 6)
+    
+    def test_list_rows_are_slim(self):
+        """Test that list rows carry the summary fields only."""
+        self.add_orders(1)
+        response, _ = self.list_queries(self.user)
+        
+        row = response.data['results'][0]
+        self.assertEqual(row['item_count'], 3)
+        self.assertEqual(set(row['items'][0]), {'id', 'product_name', 'quantity', 'total_price'})
+        self.assertNotIn('shipping_address_details', row)
+    
+    def test_detail_has_full_payload_in_fixed_queries(self):
+        """Test that an order's detail includes address and items in two queries."""
+        order = self.add_orders(1)[0]
+        self.client.force_authenticate(self.user)
+        
+        with self.assertNumQueries(2):
+            response = self.client.get(f'/api/orders/orders/{order.id}/')
+        
+        self.assertEqual(response.data['shipping_address_details']['city'], 'Mumbai')
+        self.assertEqual(len(response.data['items']), 3)
+        self.assertEqual(response.data['user_email'], self.user.email)
+
+
+def index_name(model, *fields):
+    """Name of the model's declared index on exactly `fields`."""
+    return next(index.name for index in model._meta.indexes if tuple(index.fields) == fields)
+
+
+class OrderFilterTest(TestCase):
+    """
+    Test suite for server-side order filtering and the indexes behind it.
+    """
+    
+    def setUp(self):
+        """Set up test fixtures."""
+        cache.clear()
+        self.user = create_user()
+        self.other = create_user('other@example.com')
+        address = create_address(self.user)
+        self.shipped = create_order(self.user, address, status=Order.OrderStatus.SHIPPED)
+        self.paid = create_order(self.other, create_address(self.other), payment_status=Order.PaymentStatus.COMPLETED)
+        Order.objects.filter(pk=self.paid.pk).update(payment_method=Order.PaymentMethod.UPI)
+        self.old = create_order(self.user, address)
+        Order.objects.filter(pk=self.old.pk).update(created_at=timezone.now() - timedelta(days=40))
+        
+        self.client = APIClient()
+        self.client.force_authenticate(create_user('admin@example.com', role=User.Role.ADMIN))
+    
+    def ids(self, query):
+        """Order ids the admin list returns for a query string."""
+        response = self.client.get(f'/api/orders/orders/?{query}')
+        self.assertEqual(response.status_code, 200)
+        return {row['id'] for row in response.data['results']}
+    
+    def test_filters(self):
+        """Test that each filter narrows the admin order list."""
+        since = (timezone.now() - timedelta(days=7)).date().isoformat()
+        
+        self.assertEqual(self.ids('status=SHIPPED'), {self.shipped.id})
+        self.assertEqual(self.ids('payment_status=COMPLETED'), {self.paid.id})
+        self.assertEqual(self.ids('payment_method=UPI'), {self.paid.id})
+        self.assertEqual(self.ids(f'created_at_after={since}'), {self.shipped.id, self.paid.id})
+        self.assertEqual(self.ids('customer_email=other@example.com'), {self.paid.id})
+        self.assertEqual(self.ids(f'status=PENDING&created_at_after={since}'), {self.paid.id})
+    
+    def test_order_number_prefix(self):
+        """Test that order numbers match by prefix, case-insensitively."""
+        self.assertEqual(self.ids(f'order_number={self.paid.order_number[:-2].lower()}'), {self.paid.id})
+        self.assertEqual(self.ids('order_number=ORD-'), {self.shipped.id, self.paid.id, self.old.id})
+        self.assertEqual(self.ids('order_number=XYZ'), set())
+    
+    def test_ordering(self):
+        """Test that ?ordering= sorts the order list by the allowed fields only."""
+        Order.objects.filter(pk=self.shipped.pk).update(total_amount=Decimal('300.00'))
+        Order.objects.filter(pk=self.old.pk).update(total_amount=Decimal('50.00'))
+        
+        def ids(ordering):
+            response = self.client.get('/api/orders/orders/', {'ordering': ordering})
+            return [row['id'] for row in response.data['results']]
+        
+        self.assertEqual(ids('-total_amount'), [self.shipped.id, self.paid.id, self.old.id])
+        self.assertEqual(ids('created_at'), [self.old.id, self.shipped.id, self.paid.id])
+        self.assertEqual(ids('order_number'), [self.paid.id, self.shipped.id, self.old.id])
+    
+    def test_invalid_choice_is_rejected(self):
+        """Test that an unknown status is a validation error, not an empty list."""
+        response = self.client.get('/api/orders/orders/?status=LOST')
+        
+        self.assertEqual(response.status_code, 400)
+    
+    def test_customers_filter_only_their_orders(self):
+        """Test that filters apply within a customer's own orders."""
+        self.client.force_authenticate(self.user)
+        
+        self.assertEqual(self.ids('payment_method=UPI'), set())
+        self.assertEqual(self.ids('status=SHIPPED'), {self.shipped.id})
+    
+    def plan(self, ordered=True, **params):
+        """EXPLAIN output for the order list query with `params` applied."""
+        query = QueryDict(mutable=True)
+        query.update(params)
+        queryset = Order.objects.order_by('-created_at') if ordered else Order.objects.order_by()
+        return OrderFilter(query, queryset=queryset).qs.explain()
+    
+    def test_filters_use_indexes(self):
+        """Test that every filter is answered from an index on orders."""
+        expected = [
+            ({'status': 'SHIPPED'}, ('status', 'created_at')),
+            ({'status': 'SHIPPED', 'created_at_after': '2026-01-01'}, ('status', 'created_at')),
+            ({'payment_method': 'UPI'}, ('payment_method', 'created_at')),
+            ({'created_at_after': '2026-01-01', 'created_at_before': '2026-02-01'}, ('created_at',)),
+            ({'customer_email': 'other@example.com'}, ('user', 'created_at')),
+            ({'order_number': 'ORD-2026'}, ('order_number',)),
+        ]
+        for params, fields in expected:
+            with self.subTest(**params):
+                self.assertIn(index_name(Order, *fields), self.plan(**params))
+    
+    def test_payment_status_filter_can_use_its_index(self):
+        """Test that the payment status filter has a composite index to seek on."""
+        # Without table statistics SQLite walks created_at for the ORDER BY on a
+        # tiny table, so the seek is checked on the unordered filter
+        plan = self.plan(ordered=False, payment_status='COMPLETED')
+        
+        self.assertIn(index_name(Order, 'payment_status', 'created_at'), plan)
+
+
+class OrderExportTest(TestCase):
+    """
+    Test suite for the streaming order export.
+    """
+    
+    def setUp(self):
+        """Set up test fixtures."""
+        self.user = create_user()
+        address = create_address(self.user)
+        product = create_product(price='250.00')
+        self.orders = []
+        for quantities in ([1, 2], [3], []):
+            order = create_order(self.user, address)
+            for quantity in quantities:
+                OrderItem.objects.create(
+                    order=order,
+                    product=product,
+                    product_name=product.name,
+                    product_price=product.price,
+                    quantity=quantity,
+                    total_price=product.price * quantity
+                )
+            self.orders.append(order)
+        Order.objects.filter(pk=self.orders[1].pk).update(status=Order.OrderStatus.SHIPPED)
+        
+        self.client = APIClient()
+        self.client.force_authenticate(create_user('admin@example.com', role=User.Role.ADMIN))
+    
+    def export(self, query=''):
+        """Status code and decoded body of an export request."""
+        response = self.client.get(f'/api/orders/orders/export/?{query}')
+        if response.status_code != 200:
+            return response.status_code, None
+        return response.status_code, b''.join(response.streaming_content).decode()
+    
+    def test_csv_has_one_row_per_item(self):
+        """Test that the CSV export has a header and a row per order item."""
+        status, body = self.export('export_format=csv')
+        rows = list(csv.DictReader(StringIO(body)))
+        
+        self.assertEqual(status, 200)
+        self.assertEqual([row['order_number'] for row in rows], [
+            self.orders[0].order_number, self.orders[0].order_number,
+            self.orders[1].order_number, self.orders[2].order_number,
+        ])
+        self.assertEqual([row['quantity'] for row in rows], ['1', '2', '3', ''])
+        self.assertEqual(rows[1]['item_total'], '500.00')
+        self.assertEqual(rows[0]['customer_email'], 'user@example.com')
+    
+    def test_ndjson(self):
+        """Test that the NDJSON export is one JSON object per line."""
+        status, body = self.export('export_format=ndjson')
+        rows = [json.loads(line) for line in body.splitlines()]
+        
+        self.assertEqual(status, 200)
+        self.assertEqual(len(rows), 4)
+        self.assertEqual(rows[2]['status'], Order.OrderStatus.SHIPPED)
+        self.assertEqual(rows[2]['total_amount'], '100.00')
+    
+    def test_response_headers(self):
+        """Test that the export is streamed as a file attachment."""
+        response = self.client.get('/api/orders/orders/export/?export_format=csv')
+        
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertRegex(response['Content-Disposition'], r'^attachment; filename="orders-\d{8}-\d{6}\.csv"$')
+    
+    def test_filters_apply(self):
+        """Test that the list filters narrow the export."""
+        _, body = self.export('export_format=csv&status=SHIPPED')
+        rows = list(csv.DictReader(StringIO(body)))
+        
+        self.assertEqual([row['order_number'] for row in rows], [self.orders[1].order_number])
+    
+    def test_batches_keep_orders_whole(self):
+        """Test that small batches export every item of every order once."""
+        expected = ''.join(stream_export(Order.objects.all(), 'csv'))
+        
+        with CaptureQueriesContext(connection) as queries:
+            body = ''.join(stream_export(Order.objects.all(), 'csv', batch_size=1))
+        
+        self.assertEqual(body, expected)
+        # Per batch one id query and one row query, plus the final empty id query
+        self.assertEqual(len(queries), 2 * len(self.orders) + 1)
+    
+    def test_unknown_format_is_rejected(self):
+        """Test that an unsupported export format is a bad request."""
+        status, _ = self.export('export_format=xlsx')
+        
+        self.assertEqual(status, 400)
+    
+    def test_customers_cannot_export(self):
+        """Test that only admins can export orders."""
+        self.client.force_authenticate(self.user)
+        
+        status, _ = self.export('export_format=csv')
+        
+        self.assertEqual(status, 403)
+    
+    def test_benchmark_command(self):
+        """Test that the export benchmark seeds, exports and cleans up."""
+        out = StringIO()
+        
+        call_command('benchmark_order_export', seed=5, batch_size=2, cleanup=True, stdout=out)
+        
+        self.assertIn('11 lines', out.getvalue())
+        self.assertFalse(Order.objects.filter(order_number__startswith='BENCH-').exists())
+
+
+class CheckoutStockTest(TestCase):
+    """
+    Test suite for stock reservation during checkout.
+    """
+    
+    def setUp(self):
+        """Set up test fixtures."""
+        self.user = create_user()
+        self.address = create_address(self.user)
+        self.phone = create_product('Phone', price='300.00', stock=5)
+        self.case = create_product('Case', price='20.00', stock=2)
+        self.cart = Cart.objects.create(user=self.user)
+        
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+    
+    def checkout(self):
+        """Place an order from the user's cart through the API."""
+        return self.client.post('/api/orders/orders/', {
+            'shipping_address_id': self.address.id,
+            'payment_method': Order.PaymentMethod.COD
+        }, format='json')
+    
+    def test_checkout_decrements_stock(self):
+        """Test that a successful checkout takes stock and empties the cart."""
+        CartItem.objects.create(cart=self.cart, product=self.phone, quantity=3)
+        CartItem.objects.create(cart=self.cart, product=self.case, quantity=2)
+        
+        response = self.checkout()
+        
+        self.assertEqual(response.status_code, 201)
+        self.phone.refresh_from_db()
+        self.case.refresh_from_db()
+        self.assertEqual(self.phone.stock, 2)
+        self.assertEqual(self.case.stock, 0)
+        self.assertEqual(self.case.status, Product.Status.OUT_OF_STOCK)
+        self.assertEqual(self.phone.status, Product.Status.ACTIVE)
+        self.assertFalse(self.cart.items.exists())
+        self.assertEqual(Decimal(response.data['subtotal']), Decimal('940.00'))
+    
+    def test_status_is_assigned_before_stock(self):
+        """Test that the stock UPDATE sets status before stock, as MySQL needs."""
+        # MySQL evaluates SET clauses left to right, so a status CASE placed
+        # after stock would compare against the decremented stock and never
+        # mark the product out of stock; SQLite can't show that, so check the SQL
+        with transaction.atomic(), CaptureQueriesContext(connection) as context:
+            reserve_stock({self.case.id: 2})
+        update = next(query['sql'] for query in context.captured_queries if query['sql'].startswith('UPDATE'))
+        
+        self.assertLess(update.index('"status" ='), update.index('"stock" ='))
+    
+    def test_shortage_reports_every_line(self):
+        """Test that short lines are all reported and nothing is written."""
+        CartItem.objects.create(cart=self.cart, product=self.phone, quantity=6)
+        CartItem.objects.create(cart=self.cart, product=self.case, quantity=3)
+        
+        response = self.checkout()
+        
+        self.assertEqual(response.status_code, 409)
+        shortages = {line['product_id']: line for line in response.data['shortages']}
+        self.assertEqual(shortages[self.phone.id]['requested'], 6)
+        self.assertEqual(shortages[self.phone.id]['available'], 5)
+        self.assertEqual(shortages[self.case.id]['available'], 2)
+        self.assertFalse(Order.objects.exists())
+        self.assertEqual(self.cart.items.count(), 2)
+        self.phone.refresh_from_db()
+        self.assertEqual(self.phone.stock, 5)
+    
+    def test_partial_shortage_rolls_back(self):
+        """Test that one short line leaves the other lines' stock untouched."""
+        CartItem.objects.create(cart=self.cart, product=self.phone, quantity=1)
+        CartItem.objects.create(cart=self.cart, product=self.case, quantity=3)
+        
+        response = self.checkout()
+        
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual([line['product_id'] for line in response.data['shortages']], [self.case.id])
+        self.phone.refresh_from_db()
+        self.assertEqual(self.phone.stock, 5)
+    
+    def test_inactive_product_is_unavailable(self):
+        """Test that inactive products can't be checked out."""
+        self.phone.status = Product.Status.INACTIVE
+        self.phone.save()
+        CartItem.objects.create(cart=self.cart, product=self.phone, quantity=1)
+        
+        response = self.checkout()
+        
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['shortages'][0]['available'], 0)
+    
+    def test_empty_cart(self):
+        """Test that checking out an empty cart is rejected."""
+        response = self.checkout()
+        self.assertEqual(response.status_code, 400)
+
+
+class CouponRedemptionTest(TestCase):
+    """
+    Test suite for redeeming coupons at checkout.
+    """
+    
+    def setUp(self):
+        """Set up test fixtures."""
+        self.user = create_user()
+        self.address = create_address(self.user)
+        self.product = create_product('Phone', price='1000.00', stock=5)
+        self.cart = Cart.objects.create(user=self.user)
+        CartItem.objects.create(cart=self.cart, product=self.product, quantity=1)
+        
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+    
+    def checkout(self, code):
+        """Check out the cart with a coupon code through the API."""
+        return self.client.post('/api/orders/orders/', {
+            'shipping_address_id': self.address.id,
+            'payment_method': Order.PaymentMethod.COD,
+            'coupon_code': code
+        }, format='json')
+    
+    def test_coupon_is_applied_and_counted(self):
+        """Test that a valid coupon discounts the order and uses one redemption."""
+        coupon = create_coupon(usage_limit=5)
+        
+        response = self.checkout(coupon.code)
+        
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Decimal(response.data['discount_amount']), Decimal('100.00'))
+        coupon.refresh_from_db()
+        self.assertEqual(coupon.used_count, 1)
+    
+    def test_exhausted_coupon_rolls_back_checkout(self):
+        """Test that a used-up coupon fails checkout without writing anything."""
+        coupon = create_coupon(usage_limit=2, used_count=2)
+        
+        response = self.checkout(coupon.code)
+        
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Order.objects.exists())
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 5)
+        self.assertTrue(self.cart.items.exists())
+    
+    def test_coupon_lost_to_a_concurrent_redemption(self):
+        """Test that the conditional update refuses a coupon whose last use went since it was read."""
+        coupon = create_coupon(usage_limit=1)
+        # Another checkout takes the last use after this one has read the coupon
+        Coupon.objects.filter(pk=coupon.pk).update(used_count=1)
+        
+        with self.assertRaises(CouponUnavailable):
+            redeem_coupon(coupon)
+    
+    def test_minimum_order_value_is_enforced(self):
+        """Test that a coupon below its minimum order value is refused and not redeemed."""
+        coupon = create_coupon(min_order_value=Decimal('5000'))
+        
+        response = self.checkout(coupon.code)
+        
+        self.assertEqual(response.status_code, 400)
+        coupon.refresh_from_db()
+        self.assertEqual(coupon.used_count, 0)
+    
+    def test_unknown_coupon_is_refused(self):
+        """Test that an unknown code is a validation error."""
+        self.assertEqual(self.checkout('NOPE').status_code, 400)
+
+
+class CouponCacheTest(TestCase):
+    """
+    Test suite for the per-process coupon cache behind validate_coupon.
+    """
+    
+    def setUp(self):
+        """Set up test fixtures."""
+        cache.clear()
+        coupon_cache.clear()
+        self.coupon = create_coupon(usage_limit=1)
+        self.client = APIClient()
+        self.client.force_authenticate(create_user())
+    
+    def validate(self, code, order_amount='1000'):
+        """Validate a coupon code through the API."""
+        return self.client.post('/api/orders/coupons/validate_coupon/', {
+            'code': code, 'order_amount': order_amount
+        }, format='json')
+    
+    def test_repeat_validation_skips_the_database(self):
+        """Test that a cached coupon validates without a coupon query, whatever the code's case."""
+        self.assertEqual(self.validate('SAVE10').status_code, 200)
+        
+        with CaptureQueriesContext(connection) as context:
+            response = self.validate(' save10 ')
+        
+        self.assertEqual(response.data['discount'], Decimal('100'))
+        self.assertFalse([query for query in context.captured_queries if 'coupons' in query['sql']])
+    
+    def test_unknown_codes_are_cached(self):
+        """Test that half-typed codes don't query the database on every keystroke."""
+        self.assertEqual(self.validate('SAV').status_code, 404)
+        
+        with self.assertNumQueries(0):
+            self.assertIsNone(coupon_cache.get('sav'))
+    
+    def test_admin_write_invalidates(self):
+        """Test that saving a coupon is seen by the next validation."""
+        self.validate('SAVE10')
+        self.coupon.discount_value = Decimal('20')
+        self.coupon.save()
+        
+        self.assertEqual(self.validate('SAVE10').data['discount'], Decimal('200'))
+    
+    def test_entry_expires_with_the_coupon(self):
+        """Test that an entry never outlives the coupon's valid_to."""
+        self.coupon.valid_to = timezone.now() + timedelta(seconds=5)
+        self.coupon.save()
+        
+        coupon_cache.get('SAVE10')
+        
+        self.assertLessEqual(coupon_cache.entries['SAVE10'][1], self.coupon.valid_to.timestamp())
+    
+    def test_least_recently_used_is_evicted(self):
+        """Test that the cache is bounded."""
+        bounded = CouponCache(max_size=2)
+        for code in ('A', 'B', 'A', 'C'):
+            bounded.get(code)
+        
+        self.assertEqual(list(bounded.entries), ['A', 'C'])
+    
+    def test_last_redemption_invalidates(self):
+        """Test that using up a coupon at checkout stops it validating."""
+        self.assertEqual(self.validate('SAVE10').status_code, 200)
+        user = create_user('buyer@example.com')
+        cart = Cart.objects.create(user=user)
+        CartItem.objects.create(cart=cart, product=create_product(), quantity=1)
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            place_order(user, cart, create_address(user), Order.PaymentMethod.COD, coupon_code='save10')
+        
+        self.assertEqual(self.validate('SAVE10').status_code, 400)
+
+
+class CheckoutQueryBudgetTest(TestCase):
+    """
+    Test suite for the number of queries order placement issues.
+    """
+    
+    def setUp(self):
+        """Set up test fixtures."""
+        self.user = create_user()
+        self.address = create_address(self.user)
+        self.cart = Cart.objects.create(user=self.user)
+        self.products = [create_product(f'Product {i}', stock=10) for i in range(25)]
+    
+    def place(self, lines):
+        """Fill the cart with `lines` products and return the queries checkout ran."""
+        for product in self.products[:lines]:
+            CartItem.objects.create(cart=self.cart, product=product, quantity=2)
+        with CaptureQueriesContext(connection) as context:
+            order = place_order(self.user, self.cart, self.address, Order.PaymentMethod.COD)
+        self.assertEqual(order.items.count(), lines)
+        return len(context.captured_queries)
+    
+    def test_query_count_is_constant_in_cart_size(self):
+        """Test that a 25-line cart checks out in as many queries as a 1-line cart."""
+        small = self.place(1)
+        large = self.place(25)
+        
+        self.assertEqual(small, large)
+        # Includes the INSERT that queues the confirmation email
+        self.assertLessEqual(large, 10)
+    
+    def test_bulk_stock_update(self):
+        """Test that the batched update decrements every line."""
+        self.place(3)
+        
+        stocks = Product.objects.filter(pk__in=[product.pk for product in self.products[:3]])
+        self.assertEqual(set(stocks.values_list('stock', flat=True)), {8})
+        self.assertEqual(self.products[3].stock, 10)
+
+
+class CartTotalsTest(TestCase):
+    """
+    Test suite for database-computed cart prices and totals.
+    """
+    
+    def setUp(self):
+        """Set up test fixtures."""
+        self.user = create_user()
+        self.cart = Cart.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+    
+    def add_lines(self, count):
+        """Add `count` discounted products to the cart."""
+        for i in range(count):
+            product = create_product(f'Line {self.cart.items.count()}', price='99.99', discount_percentage='12.50')
+            CartItem.objects.create(cart=self.cart, product=product, quantity=i + 1)
+    
+    def get_cart(self):
+        """Fetch the cart list endpoint and return the response and query count."""
+        # Start from a cold page-count cache so both requests run the same queries
+        cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get('/api/orders/cart/')
+        self.assertEqual(response.status_code, 200)
+        return response, len(context.captured_queries)
+    
+    def test_annotated_totals_match_python(self):
+        """Test that database totals equal the per-item Python computation."""
+        self.add_lines(3)
+        cart = Cart.objects.with_totals().get(pk=self.cart.pk)
+        plain = Cart.objects.get(pk=self.cart.pk)
+        
+        self.assertEqual(cart.total_items, plain.total_items)
+        self.assertEqual(cart.subtotal.quantize(Decimal('0.01')), plain.subtotal.quantize(Decimal('0.01')))
+        for item in cart.items.all():
+            self.assertEqual(item.unit_price, item.product.discounted_price)
+    
+    def test_cart_query_count_is_constant(self):
+        """Test that GET /api/orders/cart/ doesn't query per item."""
+        self.add_lines(1)
+        small, small_queries = self.get_cart()
+        self.add_lines(9)
+        large, large_queries = self.get_cart()
+        
+        self.assertEqual(small_queries, large_queries)
+        cart = large.data['results'][0]
+        self.assertEqual(len(cart['items']), 10)
+        self.assertEqual(cart['total_items'], 1 + sum(range(1, 10)))
+    
+    def test_empty_cart_totals(self):
+        """Test that an empty cart reports zero totals."""
+        cart = Cart.objects.with_totals().get(pk=self.cart.pk)
+        
+        self.assertEqual(cart.total_items, 0)
+        self.assertEqual(cart.subtotal, Decimal('0'))
+
+
+class CartBatchTest(TestCase):
+    """
+    Test suite for the batch cart mutation endpoint.
+    """
+    
+    def setUp(self):
+        """Set up test fixtures."""
+        self.user = create_user()
+        self.cart = Cart.objects.create(user=self.user)
+        self.products = [create_product(f'Product {i}') for i in range(30)]
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+    
+    def batch(self, operations):
+        """Post operations to the batch endpoint and return the response and query count."""
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post('/api/orders/cart/batch/', {'operations': operations}, format='json')
+        return response, len(context.captured_queries)
+    
+    def test_operations_apply_in_order(self):
+        """Test that add, set and remove operations compose in order."""
+        CartItem.objects.create(cart=self.cart, product=self.products[0], quantity=1)
+        CartItem.objects.create(cart=self.cart, product=self.products[1], quantity=4)
+        
+        response, _ = self.batch([
+            {'op': 'add', 'product_id': self.products[0].id, 'quantity': 2},
+            {'op': 'set', 'product_id': self.products[1].id, 'quantity': 1},
+            {'op': 'add', 'product_id': self.products[2].id},
+            {'op': 'remove', 'product_id': self.products[2].id},
+            {'op': 'add', 'product_id': self.products[3].id, 'quantity': 5},
+        ])
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['total_items'], 9)
+        self.assertEqual(
+            dict(self.cart.items.values_list('product_id', 'quantity')),
+            {self.products[0].id: 3, self.products[1].id: 1, self.products[3].id: 5}
+        )
+    
+    def test_large_batch_query_count(self):
+        """Test that 30 additions take as many queries as one."""
+        _, single = self.batch([{'op': 'add', 'product_id': self.products[0].id}])
+        response, many = self.batch([{'op': 'add', 'product_id': product.id} for product in self.products])
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['items']), 30)
+        self.assertEqual(single, many)
+    
+    def test_unknown_product_rejects_batch(self):
+        """Test that one bad product id rejects the whole batch."""
+        response, _ = self.batch([
+            {'op': 'add', 'product_id': self.products[0].id},
+            {'op': 'add', 'product_id': 999999},
+        ])
+        
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['product_ids'], [999999])
+        self.assertFalse(self.cart.items.exists())
+    
+    @override_settings(CART_STORE_BACKEND='orders.cart_store.CacheCartStore')
+    def test_batch_on_anonymous_store_cart(self):
+        """Test that the batch endpoint works on anonymous hot carts."""
+        cache.clear()
+        self.client.force_authenticate(None)
+        response, _ = self.batch([{'op': 'add', 'product_id': product.id} for product in self.products[:3]])
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['total_items'], 3)
+        self.assertTrue(response['X-Cart-Token'])
+
+
+class ReorderTest(TestCase):
+    """
+    Test suite for rebuilding a cart from a past order.
+    """
+    
+    def setUp(self):
+        """Set up test fixtures."""
+        self.user = create_user()
+        self.address = create_address(self.user)
+        self.phone = create_product('Phone', price='300.00', stock=10)
+        self.case = create_product('Case', price='20.00', stock=1)
+        self.cable = create_product('Cable', price='10.00', stock=0)
+        self.order = create_order(self.user, self.address)
+        for product, quantity in ((self.phone, 2), (self.case, 3), (self.cable, 1)):
+            OrderItem.objects.create(order=self.order, product=product, quantity=quantity)
+        
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+    
+    def test_reorder_copies_and_caps_lines(self):
+        """Test that lines are copied, capped at stock and the rest reported."""
+        response = self.client.post(f'/api/orders/orders/{self.order.id}/reorder/')
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            dict(CartItem.objects.filter(cart__user=self.user).values_list('product_id', 'quantity')),
+            {self.phone.id: 2, self.case.id: 1}
+        )
+        not_added = {line['product_id']: line for line in response.data['not_added']}
+        self.assertEqual(not_added[self.case.id]['added'], 1)
+        self.assertEqual(not_added[self.case.id]['reason'], 'limited_stock')
+        self.assertEqual(not_added[self.cable.id]['reason'], 'out_of_stock')
+        self.assertNotIn(self.phone.id, not_added)
+        self.assertEqual(response.data['cart']['total_items'], 3)
+    
+    def test_reorder_respects_existing_cart(self):
+        """Test that quantities already in the cart count against stock."""
+        cart = Cart.objects.create(user=self.user)
+        CartItem.objects.create(cart=cart, product=self.case, quantity=1)
+        
+        response = self.client.post(f'/api/orders/orders/{self.order.id}/reorder/')
+        
+        self.assertEqual(cart.items.get(product=self.case).quantity, 1)
+        self.assertEqual({line['product_id']: line['added'] for line in response.data['not_added']}[self.case.id], 0)
+    
+    def reorder_queries(self, order):
+        """Reorder into an empty cart and return the number of queries it took."""
+        cart, _ = Cart.objects.get_or_create(user=self.user)
+        cart.items.all().delete()
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post(f'/api/orders/orders/{order.id}/reorder/')
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries)
+    
+    def test_reorder_query_count(self):
+        """Test that reordering 13 lines takes as many queries as 1 line."""
+        small = create_order(self.user, self.address)
+        OrderItem.objects.create(order=small, product=self.phone, quantity=1)
+        for i in range(10):
+            OrderItem.objects.create(order=self.order, product=create_product(f'Extra {i}'), quantity=1)
+        
+        self.assertEqual(self.reorder_queries(small), self.reorder_queries(self.order))
+    
+    def test_cannot_reorder_others_orders(self):
+        """Test that another user's order can't be reordered."""
+        other = create_user('other@example.com')
+        self.client.force_authenticate(other)
+        
+        response = self.client.post(f'/api/orders/orders/{self.order.id}/reorder/')
+        
+        self.assertEqual(response.status_code, 404)
+
+
+class BulkStatusTest(TestCase):
+    """
+    Test suite for bulk order status transitions.
+    """
+    
+    def setUp(self):
+        """Set up test fixtures."""
+        self.user = create_user()
+        self.address = create_address(self.user)
+        self.admin = create_user('admin@example.com', role=User.Role.ADMIN)
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+    
+    def transition(self, order_ids, new_status):
+        """Post a bulk transition and return the response."""
+        return self.client.post('/api/orders/orders/bulk_update_status/', {
+            'order_ids': order_ids, 'status': new_status
+        }, format='json')
+    
+    def test_ships_orders_and_stamps_shipped_at(self):
+        """Test that eligible orders move, get shipped_at and queue one email each."""
+        from notifications.models import OutboxEmail
+        orders = [create_order(self.user, self.address, status=Order.OrderStatus.CONFIRMED) for _ in range(3)]
+        
+        response = self.transition([order.id for order in orders], Order.OrderStatus.SHIPPED)
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['updated'], sorted(order.id for order in orders))
+        self.assertEqual(response.data['rejected'], [])
+        for order in orders:
+            order.refresh_from_db()
+            self.assertEqual(order.status, Order.OrderStatus.SHIPPED)
+            self.assertIsNotNone(order.shipped_at)
+        emails = OutboxEmail.objects.filter(template_name='order_shipped')
+        self.assertEqual(emails.count(), 3)
+        self.assertIn(orders[0].order_number, emails.get(subject__endswith=orders[0].order_number).text_body)
+    
+    def test_invalid_transitions_are_rejected(self):
+        """Test that orders which can't make the transition, or don't exist, are reported and left alone."""
+        pending = create_order(self.user, self.address)
+        shipped = create_order(self.user, self.address, status=Order.OrderStatus.SHIPPED)
+        cancelled = create_order(self.user, self.address, status=Order.OrderStatus.CANCELLED)
+        
+        response = self.transition([shipped.id, pending.id, cancelled.id, 999999], Order.OrderStatus.DELIVERED)
+        
+        self.assertEqual(response.data['updated'], [shipped.id])
+        self.assertEqual(
+            [(line['order_id'], line['reason']) for line in response.data['rejected']],
+            [(pending.id, 'invalid_transition'), (cancelled.id, 'invalid_transition'), (999999, 'not_found')]
+        )
+        pending.refresh_from_db()
+        self.assertEqual(pending.status, Order.OrderStatus.PENDING)
+        shipped.refresh_from_db()
+        self.assertIsNotNone(shipped.delivered_at)
+    
+    def test_query_count_is_constant(self):
+        """Test that shipping 40 orders takes as many queries as shipping 2."""
+        def ship(count):
+            orders = [create_order(self.user, self.address, status=Order.OrderStatus.PROCESSING) for _ in range(count)]
+            with CaptureQueriesContext(connection) as context:
+                response = self.transition([order.id for order in orders], Order.OrderStatus.SHIPPED)
+            self.assertEqual(len(response.data['updated']), count)
+            return len(context.captured_queries)
+        
+        self.assertEqual(ship(2), ship(40))
+    
+    def test_requires_admin(self):
+        """Test that customers can't bulk-transition orders."""
+        order = create_order(self.user, self.address)
+        self.client.force_authenticate(self.user)
+        
+        response = self.transition([order.id], Order.OrderStatus.CANCELLED)
+        
+        self.assertEqual(response.status_code, 403)
+    
+    def test_rejects_bad_payload(self):
+        """Test that an unknown status or an empty list is a validation error."""
+        self.assertEqual(self.transition([1], 'LOST').status_code, 400)
+        self.assertEqual(self.transition([], Order.OrderStatus.SHIPPED).status_code, 400)
+
+
+@override_settings(CART_STORE_BACKEND='orders.cart_store.CacheCartStore')
+class CartStoreTest(TestCase):
+    """
+    Test suite for hot carts held in the cart store.
+    """
+    
+    def setUp(self):
+        """Set up test fixtures."""
+        cache.clear()
+        self.user = create_user()
+        self.address = create_address(self.user)
+        self.phone = create_product('Phone', price='300.00', stock=5)
+        self.case = create_product('Case', price='20.00', stock=5)
+        self.client = APIClient()
+    
+    def test_anonymous_cart(self):
+        """Test that anonymous visitors get a token-addressed cart."""
+        response = self.client.post('/api/orders/cart/add_item/', {'product_id': self.phone.id, 'quantity': 2})
+        token = response['X-Cart-Token']
+        self.client.post('/api/orders/cart/add_item/', {'product_id': self.case.id}, HTTP_X_CART_TOKEN=token)
+        
+        response = self.client.get('/api/orders/cart/', HTTP_X_CART_TOKEN=token)
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['cart_token'], token)
+        self.assertEqual(response.data['total_items'], 3)
+        self.assertEqual(response.data['subtotal'], '620.00')
+        self.assertFalse(CartItem.objects.exists())
+    
+    def test_cart_token_allowed_cross_origin(self):
+        """Test that the frontend origin may send and read the X-Cart-Token header."""
+        origin = settings.CORS_ALLOWED_ORIGINS[0]
+        response = self.client.options(
+            '/api/orders/cart/add_item/',
+            HTTP_ORIGIN=origin,
+            HTTP_ACCESS_CONTROL_REQUEST_METHOD='POST',
+            HTTP_ACCESS_CONTROL_REQUEST_HEADERS='content-type, x-cart-token'
+        )
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('x-cart-token', response['Access-Control-Allow-Headers'])
+        
+        response = self.client.post('/api/orders/cart/add_item/', {'product_id': self.phone.id}, HTTP_ORIGIN=origin)
+        
+        self.assertIn('x-cart-token', response['Access-Control-Expose-Headers'])
+    
+    def test_login_merges_anonymous_cart(self):
+        """Test that logging in adds the anonymous cart to the user's cart."""
+        cart = Cart.objects.create(user=self.user)
+        CartItem.objects.create(cart=cart, product=self.phone, quantity=1)
+        response = self.client.post('/api/orders/cart/add_item/', {'product_id': self.phone.id, 'quantity': 2})
+        token = response['X-Cart-Token']
+        
+        self.client.post('/api/accounts/login/', {
+            'email': self.user.email, 'password': 'Test@12345'
+        }, HTTP_X_CART_TOKEN=token)
+        
+        store = get_cart_store()
+        self.assertEqual(store.get(user_cart_key(self.user)), {self.phone.id: 3})
+        self.assertIsNone(store.get(f'anon:{token}'))
+    
+    def test_flush_writes_through(self):
+        """Test that flush_carts persists dirty carts to the database."""
+        self.client.force_authenticate(self.user)
+        self.client.post('/api/orders/cart/add_item/', {'product_id': self.phone.id, 'quantity': 2})
+        self.client.post('/api/orders/cart/add_item/', {'product_id': self.case.id})
+        self.client.post('/api/orders/cart/remove_item/', {'product_id': self.case.id})
+        self.assertFalse(CartItem.objects.exists())
+        
+        call_command('flush_carts', stdout=StringIO())
+        
+        self.assertEqual(
+            list(CartItem.objects.filter(cart__user=self.user).values_list('product_id', 'quantity')),
+            [(self.phone.id, 2)]
+        )
+        self.assertEqual(get_cart_store().dirty_keys(), [])
+    
+    def test_checkout_uses_hot_cart(self):
+        """Test that checkout writes the hot cart through and empties it."""
+        self.client.force_authenticate(self.user)
+        self.client.post('/api/orders/cart/add_item/', {'product_id': self.phone.id, 'quantity': 2})
+        
+        response = self.client.post('/api/orders/orders/', {
+            'shipping_address_id': self.address.id,
+            'payment_method': Order.PaymentMethod.COD
+        }, format='json')
+        
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['items'][0]['quantity'], 2)
+        self.phone.refresh_from_db()
+        self.assertEqual(self.phone.stock, 3)
+        self.assertEqual(self.client.get('/api/orders/cart/').data['total_items'], 0)
+    
+    def test_lines_addressed_by_item_id(self):
+        """Test that the item ids the cart returns work for updates and removal, as in database mode."""
+        self.client.force_authenticate(self.user)
+        self.client.post('/api/orders/cart/add_item/', {'product_id': self.phone.id})
+        self.client.post('/api/orders/cart/add_item/', {'product_id': self.case.id})
+        phone_line, case_line = self.client.get('/api/orders/cart/').data['items']
+        
+        self.client.post('/api/orders/cart/update_item/', {'item_id': phone_line['id'], 'quantity': 3})
+        response = self.client.post('/api/orders/cart/remove_item/', {'item_id': case_line['id']})
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([(line['product'], line['quantity']) for line in response.data['items']], [(self.phone.id, 3)])
+        self.assertEqual(response.data['subtotal'], '900.00')
+    
+    def test_wishlist_move_reaches_checkout(self):
+        """Test that an item moved from the wishlist is in the hot cart and the order."""
+        wishlist = Wishlist.objects.create(user=self.user)
+        wishlist_item = WishlistItem.objects.create(wishlist=wishlist, product=self.case)
+        self.client.force_authenticate(self.user)
+        self.client.post('/api/orders/cart/add_item/', {'product_id': self.phone.id})
+        
+        response = self.client.post('/api/wishlist/move_to_cart/', {'item_id': wishlist_item.id})
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.get('/api/orders/cart/').data['total_items'], 2)
+        response = self.client.post('/api/orders/orders/', {
+            'shipping_address_id': self.address.id,
+            'payment_method': Order.PaymentMethod.COD
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(
+            sorted(item['product_name'] for item in response.data['items']), ['Case', 'Phone']
+        )
+    
+    def test_cache_store_dirty_marks_from_many_workers(self):
+        """Test that concurrent writers, each with their own store, keep every dirty mark."""
+        def write(number):
+            CacheCartStore().set(f'user:{number}', {self.phone.id: 1})
+        
+        run_threads(write, [(number,) for number in range(50)])
+        store = CacheCartStore()
+        store.clear_dirty('user:7')
+        
+        self.assertEqual(store.dirty_keys(), sorted(f'user:{number}' for number in range(50) if number != 7))
+        self.assertEqual(store.dirty_keys(), [])
+        # A cart that is still flagged isn't logged again; a flushed one is
+        store.set('user:1', {self.phone.id: 2})
+        store.clear_dirty('user:2')
+        store.set('user:2', {self.phone.id: 2})
+        self.assertEqual(store.dirty_keys(), ['user:2'])
+    
+    def test_file_store(self):
+        """Test that the file store round-trips carts and tracks dirty ones."""
+        path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, path, ignore_errors=True)
+        store = FileCartStore(path)
+        
+        store.set('user:1', {self.phone.id: 2})
+        store.set('anon:abc', {self.case.id: 1}, dirty=False)
+        
+        self.assertEqual(FileCartStore(path).get('user:1'), {self.phone.id: 2})
+        self.assertEqual(store.dirty_keys(), ['user:1'])
+        store.clear_dirty('user:1')
+        store.delete('anon:abc')
+        self.assertEqual(store.dirty_keys(), [])
+        self.assertIsNone(store.get('anon:abc'))
+
+
+def place_order_retrying(user, cart, address, **kwargs):
+    """Place an order from a worker thread; returns it, or None if checkout refused."""
+    try:
+        for attempt in range(500):
+            try:
+                return place_order(user, cart, address, Order.PaymentMethod.COD, **kwargs)
+            except CheckoutError:
+                return None
+            except Exception as exc:
+                # SQLite serializes writers; retry when the database is locked
+                if 'locked' not in str(exc):
+                    raise
+                time.sleep(random.uniform(0, min(0.002 * 2 ** attempt, 0.2)))
+        raise AssertionError('Checkout kept hitting a locked database')
+    finally:
+        connection.close()
+
+
+def run_threads(target, args_list):
+    """Run `target` once per argument tuple, all in parallel, and wait for them."""
+    threads = [threading.Thread(target=target, args=args) for args in args_list]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+class CheckoutConcurrencyTest(TransactionTestCase):
+    """
+    Test suite for concurrent checkouts competing for the same stock.
+    """
+    
+    def setUp(self):
+        """Set up test fixtures."""
+        self.product = create_product('Limited Edition', price='100.00', stock=5)
+        self.buyers = []
+        for i in range(12):
+            user = create_user(f'buyer{i}@example.com')
+            cart = Cart.objects.create(user=user)
+            CartItem.objects.create(cart=cart, product=self.product, quantity=1)
+            self.buyers.append((user, cart, create_address(user)))
+    
+    def test_concurrent_checkouts_never_oversell(self):
+        """Test that parallel checkouts sell exactly the available stock."""
+        barrier = threading.Barrier(len(self.buyers))
+        results = []
+        
+        def buy(user, cart, address):
+            barrier.wait()
+            results.append('short' if place_order_retrying(user, cart, address) is None else 'ok')
+        
+        run_threads(buy, self.buyers)
+        
+        self.product.refresh_from_db()
+        self.assertEqual(results.count('ok'), 5)
+        self.assertEqual(results.count('short'), len(self.buyers) - 5)
+        self.assertEqual(self.product.stock, 0)
+        self.assertEqual(self.product.status, Product.Status.OUT_OF_STOCK)
+        self.assertEqual(Order.objects.count(), 5)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class CouponConcurrencyTest(TransactionTestCase):
+    """
+    Test suite for concurrent checkouts redeeming the same limited coupon.
+    """
+    
+    def setUp(self):
+        """Set up test fixtures."""
+        self.coupon = create_coupon(usage_limit=10)
+        product = create_product('Plentiful', price='1000.00', stock=1000)
+        self.buyers = []
+        for i in range(50):
+            user = create_user(f'shopper{i}@example.com')
+            cart = Cart.objects.create(user=user)
+            CartItem.objects.create(cart=cart, product=product, quantity=1)
+            self.buyers.append((user, cart, create_address(user)))
+    
+    def test_usage_limit_holds_under_parallel_checkouts(self):
+        """Test that 50 parallel checkouts redeem a 10-use coupon exactly 10 times."""
+        barrier = threading.Barrier(len(self.buyers))
+        orders = []
+        
+        def buy(user, cart, address):
+            barrier.wait()
+            orders.append(place_order_retrying(user, cart, address, coupon_code=self.coupon.code))
+        
+        run_threads(buy, self.buyers)
+        
+        # Every checkout finished, one way or the other
+        self.assertEqual(len(orders), len(self.buyers))
+        placed = [order for order in orders if order is not None]
+        self.coupon.refresh_from_db()
+        self.assertEqual(self.coupon.used_count, 10)
+        self.assertEqual(len(placed), 10)
+        self.assertEqual(Order.objects.filter(coupon=self.coupon).count(), 10)
+        self.assertEqual(Order.objects.count(), 10)
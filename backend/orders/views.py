@@ -1,30 +1,167 @@
 from decimal import Decimal
-from rest_framework import viewsets, permissions, status
+from rest_framework import viewsets, filters, permissions, serializers, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from django_filters.rest_framework import DjangoFilterBackend
 from django.db import transaction
+from django.db.models import Prefetch
+from django.http import StreamingHttpResponse
+from django.utils import timezone
 from .models import Cart, CartItem, Address, Coupon, Order, OrderItem
 from .serializers import (
-    CartSerializer, CartItemSerializer, AddressSerializer,
-    CouponSerializer, OrderSerializer, OrderCreateSerializer
+    CartSerializer, CartItemSerializer, CartLineSerializer, CartBatchSerializer, AddressSerializer,
+    CouponSerializer, OrderSerializer, OrderListSerializer, OrderCreateSerializer, OrderBulkStatusSerializer
 )
+from .cart_store import (
+    CART_TOKEN_HEADER, CartLine, get_cart_store, load_user_cart, write_through, save_cart_lines,
+    apply_cart_operations, merge_reorder_lines, user_cart_key, anonymous_cart_key, new_cart_token
+)
+from .coupons import coupon_cache
+from .export import EXPORT_FORMATS, stream_export
+from .filters import OrderFilter
+from .checkout import place_order, CheckoutError, InsufficientStock
+from .fulfillment import STATUS_TIMESTAMPS, transition_orders
+from products.models import Product
 from accounts.permissions import IsAdmin
-from utils.email import send_order_confirmation_email
+from utils.pagination import CursorOrPageNumberPagination
+
+
+# Formats hot-cart subtotals the way CartSerializer does for database carts
+CART_SUBTOTAL_FIELD = serializers.DecimalField(max_digits=10, decimal_places=2)
+
+
+def store_cart_data(lines, context, token=None):
+    """Serialize a hot cart, loading its products in one query"""
+    products = Product.objects.select_related('category', 'subcategory').in_bulk(list(lines))
+    items = [CartLine(products[product_id], quantity) for product_id, quantity in lines.items() if product_id in products]
+    return {
+        'cart_token': token,
+        'items': CartLineSerializer(items, many=True, context=context).data,
+        'total_items': sum(item.quantity for item in items),
+        'subtotal': CART_SUBTOTAL_FIELD.to_representation(sum((item.total_price for item in items), Decimal('0'))),
+    }
 
 
 class CartViewSet(viewsets.ModelViewSet):
+    """
+    The current cart. With a cart store configured (CART_STORE_BACKEND) carts
+    are served from the store, anonymous visitors get a cart identified by
+    the X-Cart-Token header, and lines are addressed by product_id (a hot
+    cart line's id is its product id, so item_id works too).
+    """
     serializer_class = CartSerializer
     permission_classes = [permissions.IsAuthenticated]
+    store_actions = ['list', 'retrieve', 'add_item', 'update_item', 'remove_item', 'clear', 'batch']
+    
+    def initial(self, request, *args, **kwargs):
+        self.store = get_cart_store()
+        super().initial(request, *args, **kwargs)
+    
+    def get_permissions(self):
+        if get_cart_store() is not None and self.action in self.store_actions:
+            return [permissions.AllowAny()]
+        return super().get_permissions()
     
     def get_queryset(self):
-        return Cart.objects.filter(user=self.request.user)
+        return Cart.objects.filter(user=self.request.user).with_totals()
     
     def get_object(self):
-        cart, created = Cart.objects.get_or_create(user=self.request.user)
-        return cart
+        try:
+            return self.get_queryset().get()
+        except Cart.DoesNotExist:
+            return Cart.objects.get_or_create(user=self.request.user)[0]
+    
+    # ---- cart store ----
+    
+    def store_cart(self, create=False):
+        """Return (key, lines, token) of the request's hot cart; key is None if there is none"""
+        if self.request.user.is_authenticated:
+            return user_cart_key(self.request.user), load_user_cart(self.store, self.request.user), None
+        token = self.request.headers.get(CART_TOKEN_HEADER)
+        if not token:
+            if not create:
+                return None, {}, None
+            token = new_cart_token()
+        return anonymous_cart_key(token), self.store.get(anonymous_cart_key(token)) or {}, token
+    
+    def store_response(self, lines, token=None, status_code=status.HTTP_200_OK):
+        response = Response(store_cart_data(lines, self.get_serializer_context(), token), status=status_code)
+        if token:
+            response[CART_TOKEN_HEADER] = token
+        return response
+    
+    @staticmethod
+    def store_product_id(request):
+        """The line's product id, from product_id or item_id; raises TypeError/ValueError"""
+        return int(request.data.get('product_id', request.data.get('item_id')))
+    
+    def store_line_params(self, request, allow_zero=False):
+        """Validate product_id/quantity; returns (product_id, quantity, error response)"""
+        try:
+            product_id = self.store_product_id(request)
+            quantity = int(request.data.get('quantity', 1))
+        except (TypeError, ValueError):
+            return None, None, Response(
+                {'error': 'product_id and quantity must be integers'}, status=status.HTTP_400_BAD_REQUEST
+            )
+        if quantity < (0 if allow_zero else 1):
+            return None, None, Response({'error': 'Invalid quantity'}, status=status.HTTP_400_BAD_REQUEST)
+        return product_id, quantity, None
+    
+    def list(self, request, *args, **kwargs):
+        if self.store is None:
+            return super().list(request, *args, **kwargs)
+        _, lines, token = self.store_cart()
+        return self.store_response(lines, token)
+    
+    def retrieve(self, request, *args, **kwargs):
+        if self.store is None:
+            return super().retrieve(request, *args, **kwargs)
+        _, lines, token = self.store_cart()
+        return self.store_response(lines, token)
+    
+    def store_add_item(self, request):
+        product_id, quantity, error = self.store_line_params(request)
+        if error:
+            return error
+        if not Product.objects.filter(pk=product_id).exclude(status=Product.Status.INACTIVE).exists():
+            return Response({'error': 'Product not found'}, status=status.HTTP_404_NOT_FOUND)
+        key, lines, token = self.store_cart(create=True)
+        lines[product_id] = lines.get(product_id, 0) + quantity
+        self.store.set(key, lines)
+        return self.store_response(lines, token)
+    
+    def store_update_item(self, request):
+        product_id, quantity, error = self.store_line_params(request, allow_zero=True)
+        if error:
+            return error
+        key, lines, token = self.store_cart()
+        if product_id not in lines:
+            return Response({'error': 'Item not found'}, status=status.HTTP_404_NOT_FOUND)
+        if quantity:
+            lines[product_id] = quantity
+        else:
+            del lines[product_id]
+        self.store.set(key, lines)
+        return self.store_response(lines, token)
+    
+    def store_remove_item(self, request):
+        key, lines, token = self.store_cart()
+        try:
+            product_id = self.store_product_id(request)
+        except (TypeError, ValueError):
+            return Response({'error': 'product_id must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        if lines.pop(product_id, None) is None:
+            return Response({'error': 'Item not found'}, status=status.HTTP_404_NOT_FOUND)
+        self.store.set(key, lines)
+        return self.store_response(lines, token)
+    
+    # ---- actions ----
     
     @action(detail=False, methods=['post'])
     def add_item(self, request):
+        if self.store is not None:
+            return self.store_add_item(request)
         cart, _ = Cart.objects.get_or_create(user=request.user)
         product_id = request.data.get('product_id')
         quantity = request.data.get('quantity', 1)
@@ -43,6 +180,8 @@ class CartViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['post'])
     def update_item(self, request):
+        if self.store is not None:
+            return self.store_update_item(request)
         cart = Cart.objects.get(user=request.user)
         item_id = request.data.get('item_id')
         quantity = request.data.get('quantity')
@@ -57,6 +196,8 @@ class CartViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['post'])
     def remove_item(self, request):
+        if self.store is not None:
+            return self.store_remove_item(request)
         cart = Cart.objects.get(user=request.user)
         item_id = request.data.get('item_id')
         
@@ -69,11 +210,48 @@ class CartViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['post'])
     def clear(self, request):
+        if self.store is not None:
+            key, _, _ = self.store_cart()
+            if key:
+                self.store.set(key, {})
+            return Response({'message': 'Cart cleared'}, status=status.HTTP_200_OK)
         cart = Cart.objects.get(user=request.user)
         cart.items.all().delete()
         return Response({'message': 'Cart cleared'}, status=status.HTTP_200_OK)
 
 
+    @action(detail=False, methods=['post'])
+    def batch(self, request):
+        """Apply a list of add/set/remove operations atomically and return the cart"""
+        serializer = CartBatchSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        operations = serializer.validated_data['operations']
+        
+        added = {operation['product_id'] for operation in operations if operation['op'] != 'remove'}
+        available = set(
+            Product.objects.filter(pk__in=added).exclude(status=Product.Status.INACTIVE).values_list('pk', flat=True)
+        )
+        if added - available:
+            return Response(
+                {'error': 'Products not found', 'product_ids': sorted(added - available)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        if self.store is not None:
+            key, lines, token = self.store_cart(create=True)
+            lines = apply_cart_operations(lines, operations)
+            self.store.set(key, lines)
+            return self.store_response(lines, token)
+        
+        with transaction.atomic():
+            lines = dict(
+                CartItem.objects.select_for_update().filter(cart__user=request.user).values_list('product_id', 'quantity')
+            )
+            save_cart_lines(request.user, apply_cart_operations(lines, operations))
+        return Response(self.get_serializer(self.get_object()).data)
+
+
 class AddressViewSet(viewsets.ModelViewSet):
     serializer_class = AddressSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -99,111 +277,129 @@ class CouponViewSet(viewsets.ModelViewSet):
         code = request.data.get('code')
         order_amount = request.data.get('order_amount', 0)
         
-        try:
-            coupon = Coupon.objects.get(code=code)
-            if not coupon.is_valid:
-                return Response({'error': 'Coupon is not valid'}, status=status.HTTP_400_BAD_REQUEST)
-            
-            discount = coupon.calculate_discount(Decimal(str(order_amount)))
-            return Response({
-                'valid': True,
-                'discount': discount,
-                'coupon': CouponSerializer(coupon).data
-            })
-        except Coupon.DoesNotExist:
+        # Served from the per-process cache; checkout re-validates against the database
+        coupon = coupon_cache.get(code)
+        if coupon is None:
             return Response({'error': 'Invalid coupon code'}, status=status.HTTP_404_NOT_FOUND)
+        if not coupon.is_valid:
+            return Response({'error': 'Coupon is not valid'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        discount = coupon.calculate_discount(Decimal(str(order_amount)))
+        return Response({
+            'valid': True,
+            'discount': discount,
+            'coupon': CouponSerializer(coupon).data
+        })
 
 
 class OrderViewSet(viewsets.ModelViewSet):
     serializer_class = OrderSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = CursorOrPageNumberPagination
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
+    filterset_class = OrderFilter
+    ordering_fields = ['created_at', 'total_amount']
+    ordering = ['-created_at']
     
     def get_queryset(self):
-        if self.request.user.is_admin:
-            return Order.objects.all().order_by('-created_at')
-        return Order.objects.filter(user=self.request.user).order_by('-created_at')
+        queryset = Order.objects.all() if self.request.user.is_admin else Order.objects.filter(user=self.request.user)
+        if self.action == 'export':
+            # Rows are read with values_list, so nothing is joined or prefetched here
+            return queryset
+        if self.action == 'list':
+            queryset = queryset.select_related('user').prefetch_related(
+                Prefetch('items', queryset=OrderItem.objects.only('id', 'order_id', 'product_name', 'quantity', 'total_price'))
+            )
+        else:
+            queryset = queryset.select_related('user', 'shipping_address').prefetch_related('items')
+        return queryset.order_by('-created_at')
+    
+    def get_serializer_class(self):
+        if self.action == 'list':
+            return OrderListSerializer
+        return OrderSerializer
     
-    @transaction.atomic
     def create(self, request):
         serializer = OrderCreateSerializer(data=request.data)
         if not serializer.is_valid():
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         
+        # Hot carts are written through before the database cart is checked out
+        store = get_cart_store()
+        if store is not None:
+            write_through(store, request.user)
+        
         # Get cart
         try:
             cart = Cart.objects.get(user=request.user)
         except Cart.DoesNotExist:
             return Response({'error': 'Cart is empty'}, status=status.HTTP_400_BAD_REQUEST)
         
-        if not cart.items.exists():
-            return Response({'error': 'Cart is empty'}, status=status.HTTP_400_BAD_REQUEST)
-        
         # Get address
         try:
             address = Address.objects.get(id=serializer.validated_data['shipping_address_id'], user=request.user)
         except Address.DoesNotExist:
             return Response({'error': 'Invalid address'}, status=status.HTTP_400_BAD_REQUEST)
         
-        # Calculate totals
-        subtotal = cart.subtotal
-        discount_amount = Decimal('0')
-        coupon = None
-        
-        # Apply coupon if provided
-        coupon_code = serializer.validated_data.get('coupon_code')
-        if coupon_code:
-            try:
-                coupon = Coupon.objects.get(code=coupon_code)
-                if coupon.is_valid:
-                    discount_amount = coupon.calculate_discount(subtotal)
-            except Coupon.DoesNotExist:
-                pass
-        
-        shipping_charge = Decimal('0') if subtotal > Decimal('500') else Decimal('50')
-        tax_amount = (subtotal - discount_amount) * Decimal('0.18')  # 18% tax
-        total_amount = subtotal - discount_amount + shipping_charge + tax_amount
-        
-        # Create order
-        order = Order.objects.create(
-            user=request.user,
-            subtotal=subtotal,
-            discount_amount=discount_amount,
-            shipping_charge=shipping_charge,
-            tax_amount=tax_amount,
-            total_amount=total_amount,
-            shipping_address=address,
-            coupon=coupon,
-            payment_method=serializer.validated_data['payment_method'],
-            customer_notes=serializer.validated_data.get('customer_notes', '')
-        )
-        
-        # Create order items
-        for cart_item in cart.items.all():
-            OrderItem.objects.create(
-                order=order,
-                product=cart_item.product,
-                product_name=cart_item.product.name,
-                product_price=cart_item.product.discounted_price,
-                quantity=cart_item.quantity,
-                total_price=cart_item.total_price
+        try:
+            order = place_order(
+                user=request.user,
+                cart=cart,
+                address=address,
+                payment_method=serializer.validated_data['payment_method'],
+                coupon_code=serializer.validated_data.get('coupon_code'),
+                customer_notes=serializer.validated_data.get('customer_notes', '')
             )
-            
-            # Update product stock
-            cart_item.product.stock -= cart_item.quantity
-            cart_item.product.save()
+        except InsufficientStock as exc:
+            return Response(
+                {'error': exc.message, 'shortages': exc.shortages},
+                status=status.HTTP_409_CONFLICT
+            )
+        except CheckoutError as exc:
+            return Response({'error': exc.message}, status=status.HTTP_400_BAD_REQUEST)
         
-        # Update coupon usage
-        if coupon:
-            coupon.used_count += 1
-            coupon.save()
+        if store is not None:
+            store.delete(user_cart_key(request.user))
         
-        # Clear cart
-        cart.items.all().delete()
+        return Response(OrderSerializer(order).data, status=status.HTTP_201_CREATED)
+    
+    @action(detail=True, methods=['post'])
+    def reorder(self, request, pk=None):
+        """Copy a past order's lines into the cart, skipping or capping what's out of stock"""
+        try:
+            order = Order.objects.get(pk=pk, user=request.user)
+        except Order.DoesNotExist:
+            return Response({'error': 'Order not found'}, status=status.HTTP_404_NOT_FOUND)
         
-        # Send confirmation email
-        send_order_confirmation_email(order)
+        order_lines = list(order.items.values_list('product_id', 'quantity'))
+        products = {
+            product['id']: product
+            for product in Product.objects.filter(
+                pk__in=[product_id for product_id, _ in order_lines]
+            ).values('id', 'name', 'stock', 'status')
+        }
         
-        return Response(OrderSerializer(order).data, status=status.HTTP_201_CREATED)
+        store = get_cart_store()
+        if store is not None:
+            lines, not_added = merge_reorder_lines(load_user_cart(store, request.user), order_lines, products)
+            store.set(user_cart_key(request.user), lines)
+            return Response({
+                'cart': store_cart_data(lines, self.get_serializer_context()),
+                'not_added': not_added
+            })
+        
+        with transaction.atomic():
+            lines = dict(
+                CartItem.objects.select_for_update().filter(cart__user=request.user).values_list('product_id', 'quantity')
+            )
+            lines, not_added = merge_reorder_lines(lines, order_lines, products)
+            save_cart_lines(request.user, lines)
+        
+        cart = Cart.objects.filter(user=request.user).with_totals().get()
+        return Response({
+            'cart': CartSerializer(cart, context=self.get_serializer_context()).data,
+            'not_added': not_added
+        })
     
     @action(detail=True, methods=['post'], permission_classes=[IsAdmin])
     def update_status(self, request, pk=None):
@@ -211,16 +407,52 @@ class OrderViewSet(viewsets.ModelViewSet):
         new_status = request.data.get('status')
         
         if new_status in dict(Order.OrderStatus.choices):
-            order.status = new_status
-            order.save()
-            
-            # Send email notifications based on status
-            if new_status == Order.OrderStatus.SHIPPED:
-                from utils.email import send_order_shipped_email
-                send_order_shipped_email(order)
-            elif new_status == Order.OrderStatus.DELIVERED:
-                from utils.email import send_order_delivered_email
-                send_order_delivered_email(order)
+            with transaction.atomic():
+                order.status = new_status
+                if new_status in STATUS_TIMESTAMPS:
+                    setattr(order, STATUS_TIMESTAMPS[new_status], timezone.now())
+                order.save()
+                
+                # Queue email notifications based on status
+                if new_status == Order.OrderStatus.SHIPPED:
+                    from utils.email import send_order_shipped_email
+                    send_order_shipped_email(order)
+                elif new_status == Order.OrderStatus.DELIVERED:
+                    from utils.email import send_order_delivered_email
+                    send_order_delivered_email(order)
             
             return Response(OrderSerializer(order).data)
         return Response({'error': 'Invalid status'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    @action(detail=False, methods=['get'], permission_classes=[IsAdmin])
+    def export(self, request):
+        """Stream the filtered orders, one row per item, as CSV or NDJSON (`?export_format=`)"""
+        export_format = request.query_params.get('export_format', 'csv')
+        if export_format not in EXPORT_FORMATS:
+            return Response(
+                {'error': f"export_format must be one of: {', '.join(EXPORT_FORMATS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        queryset = self.filter_queryset(self.get_queryset())
+        response = StreamingHttpResponse(
+            stream_export(queryset, export_format), content_type=EXPORT_FORMATS[export_format]
+        )
+        filename = f"orders-{timezone.now():%Y%m%d-%H%M%S}.{export_format}"
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+    
+    @action(detail=False, methods=['post'], permission_classes=[IsAdmin])
+    def bulk_update_status(self, request):
+        """Move many orders to one status; orders that can't make the transition are reported, not changed"""
+        serializer = OrderBulkStatusSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        
+        new_status = serializer.validated_data['status']
+        updated, rejected = transition_orders(serializer.validated_data['order_ids'], new_status)
+        return Response({
+            'status': new_status,
+            'updated': updated,
+            'rejected': rejected
+        })
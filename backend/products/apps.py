@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class ProductsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'products'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from utils.pagination import track_page_counts
+        # Models behind paginated listings
+        track_page_counts(*(self.get_model(name) for name in ('Category', 'SubCategory', 'Product', 'ProductImage', 'Review')))
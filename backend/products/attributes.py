@@ -0,0 +1,114 @@
+import re
+from django.db.models import Count
+
+
+# Query parameter prefix for specification filters, e.g. ?spec.ram=8GB
+SPEC_PARAM_PREFIX = 'spec.'
+
+# Most common values kept per specification key in facet counts
+MAX_SPEC_FACET_VALUES = 20
+
+KEY_RE = re.compile(r'[^\w]+', re.UNICODE)
+
+
+def normalize_key(key):
+    """'RAM Size' -> 'ram_size', 'Display.Screen Size' -> 'display.screen_size'"""
+    segments = (KEY_RE.sub('_', segment.strip().lower()).strip('_') for segment in str(key).split('.'))
+    return '.'.join(segment for segment in segments if segment)[:100]
+
+
+def normalize_value(value):
+    """The form spec filters compare values in: '8GB' and '8gb' both -> '8gb'"""
+    return str(value).strip().lower()[:255]
+
+
+def extract_attributes(specifications):
+    """
+    Flatten a specifications dict into (key, value) pairs.
+    Lists become one pair per item and nested dicts use dotted keys, so
+    keys read back from facets work as spec.<key> filters.
+    """
+    pairs = set()
+
+    def visit(prefix, value):
+        if isinstance(value, dict):
+            for child_key, child_value in value.items():
+                visit('.'.join(part for part in (prefix, normalize_key(child_key)) if part), child_value)
+        elif isinstance(value, (list, tuple)):
+            for item in value:
+                visit(prefix, item)
+        elif value is not None and prefix:
+            text = str(value).strip()
+            if isinstance(value, bool):
+                text = text.lower()
+            if text:
+                pairs.add((prefix[:100], text[:255]))
+
+    if isinstance(specifications, dict):
+        visit('', specifications)
+    return pairs
+
+
+def build_attributes(product):
+    """
+    Unsaved ProductAttribute rows for a product's specifications, one per
+    key and normalized value ('Red' and 'red' are the same filter value).
+    """
+    from .models import ProductAttribute
+    attributes = {}
+    for key, value in sorted(extract_attributes(product.specifications)):
+        normalized = normalize_value(value)
+        if (key, normalized) not in attributes:
+            attributes[key, normalized] = ProductAttribute(
+                product_id=product.pk, subcategory_id=product.subcategory_id,
+                key=key, value=value, normalized_value=normalized
+            )
+    return list(attributes.values())
+
+
+def sync_product_attributes(product):
+    """Replace a product's indexed attributes with its current specifications"""
+    from .models import ProductAttribute
+    ProductAttribute.objects.filter(product=product).delete()
+    ProductAttribute.objects.bulk_create(build_attributes(product))
+
+
+def get_spec_filters(query_params):
+    """{key: [values]} for every spec.<key> query parameter"""
+    filters = {}
+    for param, values in query_params.lists():
+        if param.startswith(SPEC_PARAM_PREFIX):
+            key = normalize_key(param[len(SPEC_PARAM_PREFIX):])
+            values = [normalize_value(value) for value in values if value.strip()]
+            if key and values:
+                filters.setdefault(key, []).extend(values)
+    return filters
+
+
+def filter_by_specs(queryset, query_params):
+    """
+    Filter products by spec.<key>=<value> parameters through the attribute index.
+    Repeated values for one key are OR-ed, different keys are AND-ed, and
+    values match case-insensitively.
+    """
+    from .models import ProductAttribute
+    for key, values in get_spec_filters(query_params).items():
+        queryset = queryset.filter(
+            pk__in=ProductAttribute.objects.filter(key=key, normalized_value__in=values).values('product_id')
+        )
+    return queryset
+
+
+def compute_spec_facets(queryset):
+    """{key: [{'value', 'count'}]} for the attributes of a filtered queryset"""
+    from .models import ProductAttribute
+    rows = ProductAttribute.objects.filter(
+        product__in=queryset.order_by().values('pk')
+    ).values('key', 'value').annotate(count=Count('product_id')).order_by('key', '-count', 'value')
+
+    facets = {}
+    for row in rows:
+        values = facets.setdefault(row['key'], [])
+        if len(values) < MAX_SPEC_FACET_VALUES:
+            values.append({'value': row['value'], 'count': row['count']})
+    return facets
@@ -0,0 +1,81 @@
+import hashlib
+import json
+import threading
+import time
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from utils.cache import get_cache_version, versioned_key
+from .images import build_srcset
+
+
+# Cache namespace bumped on every category/subcategory write
+CATALOG_CACHE_NAMESPACE = 'catalog-tree'
+CATALOG_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Seconds clients may reuse the tree before revalidating with If-None-Match
+CATALOG_MAX_AGE = 60
+
+_local = {'version': None, 'tree': None, 'expires': 0}
+_local_lock = threading.Lock()
+
+
+def build_catalog_tree():
+    """
+    Active categories with their active subcategories nested, in two queries.
+    Returns {'etag': ..., 'categories': [...]}; the ETag is a hash of the content.
+    """
+    from .models import Category, SubCategory
+
+    categories = []
+    by_id = {}
+    for category in Category.objects.filter(is_active=True).order_by('name'):
+        node = {
+            'id': category.id,
+            'name': category.name,
+            'slug': category.slug,
+            'description': category.description,
+            'image': category.image.url if category.image else None,
+            'image_srcset': build_srcset(category.image_renditions, default_storage) if category.image else {},
+            'subcategories': [],
+        }
+        categories.append(node)
+        by_id[category.id] = node
+
+    subcategories = SubCategory.objects.filter(
+        is_active=True, category_id__in=by_id
+    ).order_by('name').values('id', 'category_id', 'name', 'slug', 'description')
+    for subcategory in subcategories:
+        by_id[subcategory.pop('category_id')]['subcategories'].append(subcategory)
+
+    content = json.dumps(categories, sort_keys=True, separators=(',', ':'))
+    return {
+        'etag': '"%s"' % hashlib.md5(content.encode('utf-8')).hexdigest(),
+        'categories': categories,
+    }
+
+
+def get_catalog_tree():
+    """
+    Read-through lookup: process-local copy, then the shared cache, then the database.
+    The local copy is reused only while the shared namespace version is unchanged,
+    and for at most CATALOG_MAX_AGE seconds in case the shared cache was flushed.
+    """
+    version = get_cache_version(CATALOG_CACHE_NAMESPACE)
+    with _local_lock:
+        if _local['version'] == version and _local['expires'] > time.monotonic():
+            return _local['tree']
+
+    key = versioned_key(CATALOG_CACHE_NAMESPACE)
+    tree = cache.get(key)
+    if tree is None:
+        tree = build_catalog_tree()
+        cache.set(key, tree, CATALOG_CACHE_TIMEOUT)
+
+    with _local_lock:
+        _local.update(version=version, tree=tree, expires=time.monotonic() + CATALOG_MAX_AGE)
+    return tree
+
+
+def clear_local_catalog_tree():
+    with _local_lock:
+        _local.update(version=None, tree=None, expires=0)
@@ -0,0 +1,111 @@
+from collections import defaultdict
+from django.core.cache import cache
+from django.db.models import BooleanField, Case, Count, IntegerField, Value, When
+from utils.cache import versioned_key, filter_signature
+from .attributes import compute_spec_facets
+
+
+# Cache namespace bumped on every catalog write
+FACET_CACHE_NAMESPACE = 'product-facets'
+FACET_CACHE_TIMEOUT = 300
+
+# Half-open [low, high) price ranges; None means unbounded
+PRICE_BUCKETS = (
+    (0, 500),
+    (500, 1000),
+    (1000, 5000),
+    (5000, 10000),
+    (10000, 50000),
+    (50000, None),
+)
+
+# "N & up" rating thresholds, matching the min_rating filter
+RATING_THRESHOLDS = (4, 3, 2, 1)
+
+# Query parameters that don't change which products match
+NON_FILTER_PARAMS = ('page', 'page_size', 'ordering', 'cursor', 'facets')
+
+
+def _price_bucket():
+    whens = []
+    for index, (low, high) in enumerate(PRICE_BUCKETS):
+        condition = {'price__gte': low}
+        if high is not None:
+            condition['price__lt'] = high
+        whens.append(When(then=Value(index), **condition))
+    return Case(*whens, output_field=IntegerField())
+
+
+def _rating_bucket():
+    # Floor of the average rating, 0-5
+    return Case(
+        *[When(average_rating__gte=floor, then=Value(floor)) for floor in (5, 4, 3, 2, 1)],
+        default=Value(0),
+        output_field=IntegerField()
+    )
+
+
+def compute_facets(queryset):
+    """
+    Count products per category, subcategory, brand, price bucket, rating bucket
+    and stock availability in one GROUP BY over the filtered queryset.
+    Specification values are counted by a second GROUP BY over the attribute index.
+    """
+    rows = queryset.order_by().annotate(
+        price_bucket=_price_bucket(),
+        rating_bucket=_rating_bucket(),
+        in_stock=Case(When(stock__gt=0, then=Value(True)), default=Value(False), output_field=BooleanField()),
+    ).values(
+        'category', 'category__name', 'subcategory', 'subcategory__name',
+        'brand', 'price_bucket', 'rating_bucket', 'in_stock'
+    ).annotate(count=Count('id'))
+
+    categories = {}
+    subcategories = {}
+    brands = defaultdict(int)
+    prices = defaultdict(int)
+    ratings = defaultdict(int)
+    stock = {'in_stock': 0, 'out_of_stock': 0}
+
+    for row in rows:
+        count = row['count']
+        category = categories.setdefault(row['category'], {'id': row['category'], 'name': row['category__name'], 'count': 0})
+        category['count'] += count
+        if row['subcategory']:
+            subcategory = subcategories.setdefault(
+                row['subcategory'], {'id': row['subcategory'], 'name': row['subcategory__name'], 'count': 0}
+            )
+            subcategory['count'] += count
+        if row['brand']:
+            brands[row['brand']] += count
+        if row['price_bucket'] is not None:
+            prices[row['price_bucket']] += count
+        ratings[row['rating_bucket']] += count
+        stock['in_stock' if row['in_stock'] else 'out_of_stock'] += count
+
+    by_count = lambda item: (-item['count'], item['name'])
+    return {
+        'category': sorted(categories.values(), key=by_count),
+        'subcategory': sorted(subcategories.values(), key=by_count),
+        'brand': sorted(({'name': name, 'count': count} for name, count in brands.items()), key=by_count),
+        'price': [
+            {'min': low, 'max': high, 'count': prices[index]}
+            for index, (low, high) in enumerate(PRICE_BUCKETS)
+        ],
+        'rating': [
+            {'min_rating': threshold, 'count': sum(n for floor, n in ratings.items() if floor >= threshold)}
+            for threshold in RATING_THRESHOLDS
+        ],
+        'availability': stock,
+        'specifications': compute_spec_facets(queryset),
+    }
+
+
+def get_facets(queryset, query_params):
+    """Facet counts for a filtered queryset, cached per filter signature"""
+    key = versioned_key(FACET_CACHE_NAMESPACE, filter_signature(query_params, ignore=NON_FILTER_PARAMS))
+    facets = cache.get(key)
+    if facets is None:
+        facets = compute_facets(queryset)
+        cache.set(key, facets, FACET_CACHE_TIMEOUT)
+    return facets
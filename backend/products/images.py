@@ -0,0 +1,164 @@
+import posixpath
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from PIL import Image, ImageOps
+
+
+# Fixed widths (in px) of the responsive renditions generated for every upload
+RENDITION_WIDTHS = (320, 640, 1024)
+
+# Output formats, mapped to (Pillow format, file extension, save options)
+RENDITION_FORMATS = {
+    'webp': ('WEBP', 'webp', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', 'jpg', {'quality': 85, 'optimize': True, 'progressive': True}),
+}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+# Jobs queued or running on the worker pool, as (task, args, source name)
+_in_flight = set()
+_in_flight_lock = threading.Lock()
+
+
+def rendition_name(name, width, fmt):
+    """Storage name of a rendition, stored next to the original upload"""
+    root, _ = posixpath.splitext(name)
+    directory, filename = posixpath.split(root)
+    extension = RENDITION_FORMATS[fmt][1]
+    return posixpath.join(directory, 'renditions', f'{filename}_{width}w.{extension}')
+
+
+def renditions_match(name, renditions):
+    """Check whether a renditions map was generated from the given source"""
+    if not name or not renditions:
+        return False
+    width = str(RENDITION_WIDTHS[0])
+    return renditions.get(width, {}).get('jpeg') == rendition_name(name, width, 'jpeg')
+
+
+def generate_renditions(name, storage=None):
+    """
+    Generate fixed-width WebP/JPEG renditions for a stored image.
+    Returns a {width: {format: storage name}} map, empty if the source can't be read.
+    """
+    storage = storage or default_storage
+    try:
+        with storage.open(name) as source:
+            image = Image.open(source)
+            image.load()
+    except (OSError, ValueError):
+        return {}
+
+    image = ImageOps.exif_transpose(image).convert('RGB')
+    renditions = {}
+    for width in RENDITION_WIDTHS:
+        # Never upscale: small originals are re-encoded at their own size
+        if image.width > width:
+            height = max(1, round(image.height * width / image.width))
+            resized = image.resize((width, height), Image.LANCZOS)
+        else:
+            resized = image
+
+        renditions[str(width)] = {}
+        for fmt, (pillow_format, _, options) in RENDITION_FORMATS.items():
+            buffer = BytesIO()
+            resized.save(buffer, format=pillow_format, **options)
+            target = rendition_name(name, width, fmt)
+            if storage.exists(target):
+                storage.delete(target)
+            renditions[str(width)][fmt] = storage.save(target, ContentFile(buffer.getvalue()))
+    return renditions
+
+
+def build_srcset(renditions, storage, request=None):
+    """Turn a renditions map into {format: 'url 320w, url 640w, ...'}"""
+    srcset = {}
+    for width in sorted(renditions, key=int):
+        for fmt, name in renditions[width].items():
+            url = storage.url(name)
+            if request:
+                url = request.build_absolute_uri(url)
+            srcset.setdefault(fmt, []).append(f'{url} {width}w')
+    return {fmt: ', '.join(candidates) for fmt, candidates in srcset.items()}
+
+
+def render_product_image(image_id):
+    """Generate renditions for a ProductImage and propagate them to its product"""
+    from .models import Product, ProductImage
+    try:
+        image = ProductImage.objects.get(pk=image_id)
+    except ProductImage.DoesNotExist:
+        return
+
+    renditions = generate_renditions(image.image.name, image.image.storage)
+    # Only write back if the image wasn't replaced while we were rendering
+    ProductImage.objects.filter(pk=image.pk, image=image.image.name).update(renditions=renditions)
+    Product.objects.filter(
+        pk=image.product_id, primary_image=image.image.name
+    ).update(primary_image_thumbnails=renditions)
+
+
+def render_category_image(category_id):
+    """Generate renditions for a Category image"""
+    from utils.cache import bump_cache_version
+    from .catalog import CATALOG_CACHE_NAMESPACE
+    from .models import Category
+    try:
+        category = Category.objects.get(pk=category_id)
+    except Category.DoesNotExist:
+        return
+    if not category.image:
+        return
+
+    renditions = generate_renditions(category.image.name, category.image.storage)
+    updated = Category.objects.filter(pk=category.pk, image=category.image.name).update(image_renditions=renditions)
+    if updated:
+        # Queryset updates skip the signals; the catalog tree embeds the srcset
+        bump_cache_version(CATALOG_CACHE_NAMESPACE)
+
+
+def _run_task(key, task, *args):
+    try:
+        task(*args)
+    finally:
+        with _in_flight_lock:
+            _in_flight.discard(key)
+        close_old_connections()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'IMAGE_RENDITION_WORKERS', 2),
+                thread_name_prefix='image-renditions'
+            )
+        return _executor
+
+
+def schedule_renditions(task, *args, source=None):
+    """
+    Run a rendition task once the current transaction commits.
+    Tasks run on a local worker pool unless IMAGE_RENDITIONS_ASYNC is False.
+    A task already queued or running for the same arguments and `source`
+    (the stored name of the upload) isn't submitted again, so re-saving an
+    image while its renditions are being generated doesn't repeat the work.
+    """
+    def submit():
+        if not getattr(settings, 'IMAGE_RENDITIONS_ASYNC', True):
+            task(*args)
+            return
+        key = (task, args, source)
+        with _in_flight_lock:
+            if key in _in_flight:
+                return
+            _in_flight.add(key)
+        get_executor().submit(_run_task, key, task, *args)
+    transaction.on_commit(submit)
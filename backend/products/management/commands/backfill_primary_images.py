@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from products.models import Product
+
+
+class Command(BaseCommand):
+    help = 'Backfills the denormalized primary image path and thumbnails on products.'
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.NOTICE('Backfilling product primary images...'))
+
+        updated = 0
+        for product in Product.objects.only('id', 'primary_image', 'primary_image_thumbnails').iterator(chunk_size=500):
+            previous = (product.primary_image.name, product.primary_image_thumbnails)
+            product.sync_primary_image()
+            if (product.primary_image.name, product.primary_image_thumbnails) != previous:
+                updated += 1
+
+        self.stdout.write(self.style.SUCCESS(f'✓ Updated {updated} products'))
@@ -0,0 +1,61 @@
+import random
+import time
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from products.models import Product
+from products.suggest import get_suggestion_index
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks the suggestion trie against the icontains SearchFilter query path.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--queries', type=int, default=500, help='Number of sample queries.')
+        parser.add_argument('--limit', type=int, default=8, help='Suggestions per query.')
+
+    def handle(self, *args, **options):
+        names = list(Product.objects.values_list('name', flat=True)[:5000])
+        if not names:
+            self.stdout.write(self.style.WARNING('No products to benchmark against.'))
+            return
+
+        # Keystroke-style prefixes, a third of them with a dropped character (typo)
+        rng = random.Random(42)
+        queries = []
+        for _ in range(options['queries']):
+            name = rng.choice(names).lower()
+            prefix = name[:rng.randint(2, max(2, min(len(name), 10)))]
+            if len(prefix) > 3 and rng.random() < 0.33:
+                position = rng.randrange(1, len(prefix))
+                prefix = prefix[:position] + prefix[position + 1:]
+            queries.append(prefix)
+
+        index = get_suggestion_index()
+        started = time.perf_counter()
+        index.rebuild()
+        self.stdout.write(f'Index built in {(time.perf_counter() - started) * 1000:.1f} ms')
+
+        trie_samples = []
+        for query in queries:
+            started = time.perf_counter()
+            index.suggest(query, limit=options['limit'])
+            trie_samples.append((time.perf_counter() - started) * 1000)
+
+        db_samples = []
+        for query in queries:
+            started = time.perf_counter()
+            list(Product.objects.filter(
+                Q(name__icontains=query) | Q(description__icontains=query) | Q(brand__icontains=query)
+            ).values_list('name', flat=True)[:options['limit']])
+            db_samples.append((time.perf_counter() - started) * 1000)
+
+        for label, samples in (('trie', trie_samples), ('SearchFilter', db_samples)):
+            self.stdout.write(
+                f'{label:>12}: p50 {percentile(samples, 0.50):.3f} ms, '
+                f'p99 {percentile(samples, 0.99):.3f} ms, max {max(samples):.3f} ms'
+            )
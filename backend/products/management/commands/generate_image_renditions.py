@@ -0,0 +1,59 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+from products.images import generate_renditions, renditions_match
+from products.models import Category, Product, ProductImage
+
+
+class Command(BaseCommand):
+    help = 'Back-fills responsive renditions for existing product and category images.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Number of worker processes (1 renders in-process).'
+        )
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Regenerate renditions even for images that already have them.'
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.NOTICE('Collecting images...'))
+
+        jobs = []
+        for image in ProductImage.objects.only('id', 'image', 'renditions').iterator(chunk_size=500):
+            if options['all'] or not renditions_match(image.image.name, image.renditions):
+                jobs.append((ProductImage, image.pk, image.image.name))
+        for category in Category.objects.exclude(image='').exclude(image__isnull=True).only('id', 'image', 'image_renditions'):
+            if options['all'] or not renditions_match(category.image.name, category.image_renditions):
+                jobs.append((Category, category.pk, category.image.name))
+
+        self.stdout.write(f"Rendering {len(jobs)} images with {options['workers']} worker(s)...")
+        names = [name for _, _, name in jobs]
+        if options['workers'] > 1 and len(jobs) > 1:
+            # Workers only touch storage; results are written back from this process
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=options['workers'], initializer=django.setup) as executor:
+                results = list(executor.map(generate_renditions, names, chunksize=8))
+        else:
+            results = [generate_renditions(name) for name in names]
+
+        failed = 0
+        for (model, pk, name), renditions in zip(jobs, results):
+            if not renditions:
+                failed += 1
+                self.stdout.write(self.style.WARNING(f'→ Could not read {name}'))
+                continue
+            if model is ProductImage:
+                ProductImage.objects.filter(pk=pk, image=name).update(renditions=renditions)
+                Product.objects.filter(primary_image=name).update(primary_image_thumbnails=renditions)
+            else:
+                Category.objects.filter(pk=pk, image=name).update(image_renditions=renditions)
+
+        self.stdout.write(self.style.SUCCESS(f'✓ Rendered {len(jobs) - failed} images ({failed} failed)'))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from products.attributes import build_attributes
+from products.models import Product, ProductAttribute
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the product attribute index from Product.specifications.'
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.NOTICE('Rebuilding product attributes...'))
+
+        total = 0
+        with transaction.atomic():
+            ProductAttribute.objects.all().delete()
+            batch = []
+            products = Product.objects.only('id', 'subcategory_id', 'specifications')
+            for product in products.iterator(chunk_size=1000):
+                batch.extend(build_attributes(product))
+                if len(batch) >= 1000:
+                    ProductAttribute.objects.bulk_create(batch)
+                    total += len(batch)
+                    batch = []
+            ProductAttribute.objects.bulk_create(batch)
+            total += len(batch)
+
+        self.stdout.write(self.style.SUCCESS(f'✓ Indexed {total} attributes'))
@@ -0,0 +1,23 @@
+# Generated by Django 5.0.1 on 2026-10-18 10:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='primary_image',
+            field=models.ImageField(blank=True, editable=False, max_length=255, upload_to='products/', verbose_name='primary image'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='primary_image_thumbnails',
+            field=models.JSONField(blank=True, default=dict, editable=False, verbose_name='primary image thumbnails'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+from django.db import migrations
+
+
+def create_fulltext_index(apps, schema_editor):
+    # FULLTEXT is MySQL-only; other backends use the in-process index
+    if schema_editor.connection.vendor == 'mysql':
+        schema_editor.execute(
+            'CREATE FULLTEXT INDEX products_fulltext ON products (name, description, brand)'
+        )
+
+
+def drop_fulltext_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'mysql':
+        schema_editor.execute('DROP INDEX products_fulltext ON products')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0003_image_renditions'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fulltext_index, drop_fulltext_index),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.0.1 on 2026-10-18 10:11
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0004_product_fulltext_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductAttribute',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=100, verbose_name='key')),
+                ('value', models.CharField(max_length=255, verbose_name='value')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attributes', to='products.product', verbose_name='product')),
+                ('subcategory', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='product_attributes', to='products.subcategory', verbose_name='subcategory')),
+            ],
+            options={
+                'verbose_name': 'product attribute',
+                'verbose_name_plural': 'product attributes',
+                'db_table': 'product_attributes',
+                'indexes': [models.Index(fields=['key', 'value'], name='product_att_key_898c42_idx'), models.Index(fields=['subcategory', 'key', 'value'], name='product_att_subcate_1764be_idx')],
+                'unique_together': {('product', 'key', 'value')},
+            },
+        ),
+    ]
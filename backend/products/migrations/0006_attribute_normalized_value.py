@@ -0,0 +1,49 @@
+# Generated by Django 5.0.1 on 2026-10-18 11:08
+
+from django.db import migrations, models
+
+
+def fill_normalized_values(apps, schema_editor):
+    # Same as products.attributes.normalize_value, done in Python so that
+    # non-ASCII values lower-case the same way on every backend
+    ProductAttribute = apps.get_model('products', 'ProductAttribute')
+    batch = []
+    for attribute in ProductAttribute.objects.only('id', 'value').iterator(chunk_size=1000):
+        attribute.normalized_value = attribute.value.strip().lower()[:255]
+        batch.append(attribute)
+        if len(batch) >= 1000:
+            ProductAttribute.objects.bulk_update(batch, ['normalized_value'])
+            batch = []
+    ProductAttribute.objects.bulk_update(batch, ['normalized_value'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0005_productattribute'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='productattribute',
+            name='product_att_key_898c42_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='productattribute',
+            name='product_att_subcate_1764be_idx',
+        ),
+        migrations.AddField(
+            model_name='productattribute',
+            name='normalized_value',
+            field=models.CharField(default='', max_length=255, verbose_name='normalized value'),
+        ),
+        migrations.RunPython(fill_normalized_values, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='productattribute',
+            index=models.Index(fields=['key', 'normalized_value'], name='product_att_key_4c5dba_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='productattribute',
+            index=models.Index(fields=['subcategory', 'key', 'normalized_value'], name='product_att_subcate_3df5ce_idx'),
+        ),
+    ]
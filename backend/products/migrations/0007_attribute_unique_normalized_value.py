@@ -0,0 +1,32 @@
+# Generated by Django 5.0.1 on 2026-10-18 11:20
+
+from django.db import migrations
+
+
+def drop_duplicate_values(apps, schema_editor):
+    # Keep the first row of each (product, key, normalized_value)
+    ProductAttribute = apps.get_model('products', 'ProductAttribute')
+    seen, duplicates = set(), []
+    rows = ProductAttribute.objects.order_by('pk').values_list('pk', 'product_id', 'key', 'normalized_value')
+    for pk, *identity in rows.iterator(chunk_size=1000):
+        if tuple(identity) in seen:
+            duplicates.append(pk)
+        else:
+            seen.add(tuple(identity))
+    for start in range(0, len(duplicates), 1000):
+        ProductAttribute.objects.filter(pk__in=duplicates[start:start + 1000]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0006_attribute_normalized_value'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_duplicate_values, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='productattribute',
+            unique_together={('product', 'key', 'normalized_value')},
+        ),
+    ]
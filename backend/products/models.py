@@ -1,8 +1,9 @@
-from django.db import models
+from django.db import models, transaction
 from django.utils.translation import gettext_lazy as _
 from django.utils.text import slugify
 from django.core.validators import MinValueValidator, MaxValueValidator
 from accounts.models import User
+from .images import renditions_match, schedule_renditions, render_product_image, render_category_image
 
 
 class Category(models.Model):
@@ -13,6 +14,7 @@ class Category(models.Model):
     slug = models.SlugField(_('slug'), max_length=120, unique=True, blank=True)
     description = models.TextField(_('description'), blank=True)
     image = models.ImageField(_('image'), upload_to='categories/', blank=True, null=True)
+    image_renditions = models.JSONField(_('image renditions'), default=dict, blank=True, editable=False)
     is_active = models.BooleanField(_('active'), default=True)
     created_at = models.DateTimeField(_('created at'), auto_now_add=True)
     updated_at = models.DateTimeField(_('updated at'), auto_now=True)
@@ -30,7 +32,12 @@ class Category(models.Model):
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.name)
+        regenerate = bool(self.image) and not renditions_match(self.image.name, self.image_renditions)
+        if regenerate or not self.image:
+            self.image_renditions = {}
         super().save(*args, **kwargs)
+        if regenerate:
+            schedule_renditions(render_category_image, self.pk, source=self.image.name)
     
     def __str__(self):
         return self.name
@@ -146,6 +153,21 @@ class Product(models.Model):
     )
     total_reviews = models.PositiveIntegerField(_('total reviews'), default=0)
     
+    # Denormalized primary image, maintained by ProductImage.save/delete
+    primary_image = models.ImageField(
+        _('primary image'),
+        upload_to='products/',
+        max_length=255,
+        blank=True,
+        editable=False
+    )
+    primary_image_thumbnails = models.JSONField(
+        _('primary image thumbnails'),
+        default=dict,
+        blank=True,
+        editable=False
+    )
+    
     # Timestamps
     created_at = models.DateTimeField(_('created at'), auto_now_add=True)
     updated_at = models.DateTimeField(_('updated at'), auto_now=True)
@@ -198,6 +220,22 @@ class Product(models.Model):
     @property
     def is_low_stock(self):
         return 0 < self.stock <= 10
+    
+    def sync_primary_image(self):
+        """Copy the current primary ProductImage path and renditions onto the product"""
+        primary = self.images.filter(is_primary=True).first()
+        name = primary.image.name if primary else ''
+        thumbnails = primary.renditions if primary else {}
+        
+        if name == (self.primary_image.name or '') and thumbnails == self.primary_image_thumbnails:
+            return
+        
+        self.primary_image = name
+        self.primary_image_thumbnails = thumbnails
+        Product.objects.filter(pk=self.pk).update(
+            primary_image=self.primary_image.name,
+            primary_image_thumbnails=self.primary_image_thumbnails
+        )
 
 
 class ProductImage(models.Model):
@@ -214,6 +252,7 @@ class ProductImage(models.Model):
     alt_text = models.CharField(_('alt text'), max_length=255, blank=True)
     is_primary = models.BooleanField(_('primary image'), default=False)
     display_order = models.PositiveIntegerField(_('display order'), default=0)
+    renditions = models.JSONField(_('renditions'), default=dict, blank=True, editable=False)
     created_at = models.DateTimeField(_('created at'), auto_now_add=True)
     
     class Meta:
@@ -226,15 +265,67 @@ class ProductImage(models.Model):
         ]
     
     def save(self, *args, **kwargs):
-        # Ensure only one primary image per product
-        if self.is_primary:
-            ProductImage.objects.filter(product=self.product, is_primary=True).update(is_primary=False)
-        super().save(*args, **kwargs)
+        # Renditions of a replaced upload are dropped until the worker regenerates them
+        regenerate = not renditions_match(self.image.name, self.renditions)
+        if regenerate:
+            self.renditions = {}
+        with transaction.atomic():
+            # Ensure only one primary image per product
+            if self.is_primary:
+                ProductImage.objects.filter(product=self.product, is_primary=True).exclude(pk=self.pk).update(is_primary=False)
+            super().save(*args, **kwargs)
+            self.product.sync_primary_image()
+            if regenerate:
+                schedule_renditions(render_product_image, self.pk, source=self.image.name)
+    
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            if self.is_primary:
+                self.product.sync_primary_image()
+        return result
     
     def __str__(self):
         return f"{self.product.name} - Image {self.display_order}"
 
 
+class ProductAttribute(models.Model):
+    """
+    Product Attribute Model - indexed copy of Product.specifications for filtering
+    """
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name='attributes',
+        verbose_name=_('product')
+    )
+    subcategory = models.ForeignKey(
+        SubCategory,
+        on_delete=models.CASCADE,
+        related_name='product_attributes',
+        verbose_name=_('subcategory'),
+        blank=True,
+        null=True
+    )
+    key = models.CharField(_('key'), max_length=100)
+    value = models.CharField(_('value'), max_length=255)
+    # Lower-cased value that spec filters match on; value keeps its case for facets
+    normalized_value = models.CharField(_('normalized value'), max_length=255, default='')
+    
+    class Meta:
+        db_table = 'product_attributes'
+        verbose_name = _('product attribute')
+        verbose_name_plural = _('product attributes')
+        unique_together = [['product', 'key', 'normalized_value']]
+        indexes = [
+            models.Index(fields=['key', 'normalized_value']),
+            models.Index(fields=['subcategory', 'key', 'normalized_value']),
+        ]
+    
+    def __str__(self):
+        return f"{self.product_id}: {self.key} = {self.value}"
+
+
 class Review(models.Model):
     """
     Product Review Model
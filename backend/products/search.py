@@ -0,0 +1,236 @@
+import re
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+from django.conf import settings
+from django.db import connection
+from django.db.models import Case, FloatField, Q, Value, When
+from django.db.models.expressions import RawSQL
+from rest_framework import filters
+
+
+# Relative weight of a term hit in each indexed field
+FIELD_WEIGHTS = {
+    'name': 3.0,
+    'brand': 2.0,
+    'description': 1.0,
+}
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+# innodb_ft_min_token_size of the MySQL server; shorter words aren't in the FULLTEXT index
+FULLTEXT_MIN_TOKEN_SIZE = getattr(settings, 'FULLTEXT_MIN_TOKEN_SIZE', 3)
+
+# InnoDB's default stopword list (INFORMATION_SCHEMA.INNODB_FT_DEFAULT_STOPWORD)
+FULLTEXT_STOPWORDS = frozenset([
+    'a', 'about', 'an', 'are', 'as', 'at', 'be', 'by', 'com', 'de', 'en', 'for', 'from', 'how', 'i',
+    'in', 'is', 'it', 'la', 'of', 'on', 'or', 'that', 'the', 'this', 'to', 'was', 'what', 'when',
+    'where', 'who', 'will', 'with', 'und', 'www',
+])
+
+
+def tokenize(text):
+    return TOKEN_RE.findall((text or '').lower())
+
+
+def build_boolean_query(terms, min_token_size=None):
+    """
+    Split search terms for a FULLTEXT BOOLEAN MODE search.
+    Returns (query, short tokens): every indexable token becomes a required
+    prefix term of the query (None if there are none), stopwords are dropped,
+    and tokens shorter than the index's minimum, which MATCH can never find,
+    are returned to be matched another way.
+    'case for iphone' -> ('+case* +iphone*', []), '4k tv' -> (None, ['4k', 'tv'])
+    """
+    min_token_size = min_token_size or FULLTEXT_MIN_TOKEN_SIZE
+    required, short = [], []
+    for token in dict.fromkeys(token for term in terms for token in tokenize(term)):
+        if token in FULLTEXT_STOPWORDS:
+            continue
+        (required if len(token) >= min_token_size else short).append(token)
+    return ' '.join(f'+{token}*' for token in required) or None, short
+
+
+class BaseSearchBackend:
+    """
+    Product search backend interface.
+    `search` filters a queryset to matching products and annotates `relevance`.
+    """
+    def search(self, queryset, terms):
+        raise NotImplementedError
+
+    def index_product(self, product):
+        pass
+
+    def remove_product(self, product_id):
+        pass
+
+    def rebuild(self):
+        pass
+
+
+class MySQLFullTextBackend(BaseSearchBackend):
+    """
+    Ranked search over the products FULLTEXT index (name, description, brand).
+    MySQL maintains the index itself, so only rebuild has work to do.
+    """
+    match_sql = 'MATCH (products.name, products.description, products.brand) AGAINST (%s IN BOOLEAN MODE)'
+
+    def search(self, queryset, terms):
+        # Every indexable term is required and matched as a prefix; short
+        # words the index skips ('tv', '4k', '5g') fall back to icontains
+        if not any(tokenize(term) for term in terms):
+            return queryset
+        query, short = build_boolean_query(terms)
+        if query is None and not short:
+            # Only stopwords, which no product is indexed under
+            return queryset.none()
+        for token in short:
+            queryset = queryset.filter(
+                Q(name__icontains=token) | Q(description__icontains=token) | Q(brand__icontains=token)
+            )
+        if query is None:
+            return queryset.annotate(relevance=Value(0.0, output_field=FloatField()))
+        return queryset.annotate(
+            relevance=RawSQL(self.match_sql, (query,), output_field=FloatField())
+        ).filter(relevance__gt=0)
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute('OPTIMIZE TABLE products')
+
+
+class InvertedIndexBackend(BaseSearchBackend):
+    """
+    In-process inverted index used where FULLTEXT isn't available (SQLite test runs).
+    Built lazily on first search and kept current by the product signals.
+    """
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.postings = defaultdict(dict)   # token -> {product_id: weight}
+        self.documents = {}                 # product_id -> tokens, for removal
+        self.vocabulary = []                # sorted tokens, for prefix lookup
+        self.built = False
+
+    def _add(self, product):
+        weights = defaultdict(float)
+        for field, weight in FIELD_WEIGHTS.items():
+            for token in tokenize(getattr(product, field)):
+                weights[token] += weight
+        for token, weight in weights.items():
+            self.postings[token][product.pk] = weight
+        self.documents[product.pk] = set(weights)
+
+    def _remove(self, product_id):
+        for token in self.documents.pop(product_id, ()):
+            postings = self.postings[token]
+            postings.pop(product_id, None)
+            if not postings:
+                del self.postings[token]
+
+    def _ensure_built(self):
+        if not self.built:
+            self.rebuild()
+
+    def rebuild(self):
+        from .models import Product
+        with self.lock:
+            self.postings.clear()
+            self.documents.clear()
+            for product in Product.objects.only(*FIELD_WEIGHTS).iterator(chunk_size=1000):
+                self._add(product)
+            self.vocabulary = sorted(self.postings)
+            self.built = True
+
+    def index_product(self, product):
+        with self.lock:
+            if not self.built:
+                return
+            self._remove(product.pk)
+            self._add(product)
+            self.vocabulary = sorted(self.postings)
+
+    def remove_product(self, product_id):
+        with self.lock:
+            if not self.built:
+                return
+            self._remove(product_id)
+            self.vocabulary = sorted(self.postings)
+
+    def _prefix_matches(self, prefix):
+        position = bisect_left(self.vocabulary, prefix)
+        while position < len(self.vocabulary) and self.vocabulary[position].startswith(prefix):
+            yield self.vocabulary[position]
+            position += 1
+
+    def score(self, terms):
+        """Return {product_id: relevance} for products matching every term"""
+        tokens = [token for term in terms for token in tokenize(term)]
+        if not tokens:
+            return None
+        with self.lock:
+            self._ensure_built()
+            scores = None
+            for token in tokens:
+                term_scores = defaultdict(float)
+                for match in self._prefix_matches(token):
+                    # Exact hits outrank prefix hits
+                    boost = 1.0 if match == token else 0.5
+                    for product_id, weight in self.postings[match].items():
+                        term_scores[product_id] += weight * boost
+                if scores is None:
+                    scores = dict(term_scores)
+                else:
+                    scores = {
+                        product_id: score + term_scores[product_id]
+                        for product_id, score in scores.items()
+                        if product_id in term_scores
+                    }
+                if not scores:
+                    break
+            return scores
+
+    def search(self, queryset, terms):
+        scores = self.score(terms)
+        if scores is None:
+            return queryset
+        if not scores:
+            return queryset.none()
+        return queryset.filter(pk__in=scores).annotate(
+            relevance=Case(
+                *[When(pk=product_id, then=Value(score)) for product_id, score in scores.items()],
+                default=Value(0.0),
+                output_field=FloatField()
+            )
+        )
+
+
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def get_search_backend():
+    """Return the per-process search backend for the default database"""
+    vendor = connection.vendor
+    with _backends_lock:
+        if vendor not in _backends:
+            _backends[vendor] = MySQLFullTextBackend() if vendor == 'mysql' else InvertedIndexBackend()
+        return _backends[vendor]
+
+
+class ProductSearchFilter(filters.SearchFilter):
+    """SearchFilter that delegates to the product search backend"""
+    def filter_queryset(self, request, queryset, view):
+        terms = self.get_search_terms(request)
+        if not terms:
+            return queryset
+        return get_search_backend().search(queryset, terms)
+
+
+class ProductOrderingFilter(filters.OrderingFilter):
+    """OrderingFilter that only allows `relevance` when a search annotated it"""
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        if 'relevance' in queryset.query.annotations:
+            return ordering
+        return [field for field in ordering if field.lstrip('-') != 'relevance'] or self.get_default_ordering(view)
@@ -1,12 +1,21 @@
 from rest_framework import serializers
 from .models import Category, SubCategory, Product, ProductImage, Review
+from .images import build_srcset
 
 
 class CategorySerializer(serializers.ModelSerializer):
+    image_srcset = serializers.SerializerMethodField()
+    
     class Meta:
         model = Category
-        fields = '__all__'
+        # Rendition storage paths are only exposed as image_srcset
+        exclude = ('image_renditions',)
         read_only_fields = ('created_at', 'updated_at')
+    
+    def get_image_srcset(self, obj):
+        if not obj.image:
+            return {}
+        return build_srcset(obj.image_renditions, obj.image.storage, self.context.get('request'))
 
 
 class SubCategorySerializer(serializers.ModelSerializer):
@@ -19,10 +28,16 @@ class SubCategorySerializer(serializers.ModelSerializer):
 
 
 class ProductImageSerializer(serializers.ModelSerializer):
+    srcset = serializers.SerializerMethodField()
+    
     class Meta:
         model = ProductImage
-        fields = '__all__'
+        # Rendition storage paths are only exposed as srcset
+        exclude = ('renditions',)
         read_only_fields = ('created_at',)
+    
+    def get_srcset(self, obj):
+        return build_srcset(obj.renditions, obj.image.storage, self.context.get('request'))
 
 
 class ReviewSerializer(serializers.ModelSerializer):
@@ -40,21 +55,30 @@ class ProductListSerializer(serializers.ModelSerializer):
     category_name = serializers.CharField(source='category.name', read_only=True)
     subcategory_name = serializers.CharField(source='subcategory.name', read_only=True)
     primary_image = serializers.SerializerMethodField()
+    primary_image_thumbnails = serializers.SerializerMethodField()
     discounted_price = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
     
     class Meta:
         model = Product
         fields = ('id', 'name', 'slug', 'category', 'category_name', 'subcategory', 
                   'subcategory_name', 'price', 'discount_percentage', 'discounted_price',
-                  'primary_image', 'average_rating', 'total_reviews', 'stock', 'status')
+                  'primary_image', 'primary_image_thumbnails', 'average_rating',
+                  'total_reviews', 'stock', 'status')
+    
+    def build_url(self, url):
+        request = self.context.get('request')
+        if request:
+            return request.build_absolute_uri(url)
+        return None
     
     def get_primary_image(self, obj):
-        primary = obj.images.filter(is_primary=True).first()
-        if primary:
-            request = self.context.get('request')
-            if request:
-                return request.build_absolute_uri(primary.image.url)
+        # Read the denormalized column, never the product_images table
+        if obj.primary_image:
+            return self.build_url(obj.primary_image.url)
         return None
+    
+    def get_primary_image_thumbnails(self, obj):
+        return build_srcset(obj.primary_image_thumbnails, obj.primary_image.storage, self.context.get('request'))
 
 
 class ProductDetailSerializer(serializers.ModelSerializer):
@@ -65,15 +89,19 @@ class ProductDetailSerializer(serializers.ModelSerializer):
     reviews = ReviewSerializer(many=True, read_only=True)
     discounted_price = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
     is_in_stock = serializers.BooleanField(read_only=True)
+    primary_image_thumbnails = serializers.SerializerMethodField()
     
     class Meta:
         model = Product
         fields = '__all__'
+    
+    def get_primary_image_thumbnails(self, obj):
+        return build_srcset(obj.primary_image_thumbnails, obj.primary_image.storage, self.context.get('request'))
 
 
 class ProductCreateUpdateSerializer(serializers.ModelSerializer):
     """Serializer for creating/updating products"""
     class Meta:
         model = Product
-        exclude = ('average_rating', 'total_reviews')
+        exclude = ('average_rating', 'total_reviews', 'primary_image_thumbnails')
         read_only_fields = ('created_at', 'updated_at')
@@ -0,0 +1,65 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import Category, SubCategory, Product
+from .attributes import sync_product_attributes
+from .catalog import CATALOG_CACHE_NAMESPACE, clear_local_catalog_tree
+from .facets import FACET_CACHE_NAMESPACE
+from .search import get_search_backend
+from .suggest import get_suggestion_index
+from utils.cache import bump_cache_version
+
+
+@receiver([post_save, post_delete], sender=Product)
+@receiver([post_save, post_delete], sender=Category)
+@receiver([post_save, post_delete], sender=SubCategory)
+def invalidate_facets(sender, **kwargs):
+    """Any catalog write invalidates cached facet counts"""
+    bump_cache_version(FACET_CACHE_NAMESPACE)
+
+
+@receiver([post_save, post_delete], sender=Category)
+@receiver([post_save, post_delete], sender=SubCategory)
+def invalidate_catalog_tree(sender, **kwargs):
+    """Category and subcategory writes invalidate the cached catalog tree"""
+    bump_cache_version(CATALOG_CACHE_NAMESPACE)
+    clear_local_catalog_tree()
+
+
+@receiver(post_save, sender=Product)
+def index_product(sender, instance, **kwargs):
+    """Keep the search and suggestion indexes current with product writes"""
+    get_search_backend().index_product(instance)
+    get_suggestion_index().update_product(instance)
+
+
+@receiver(post_save, sender=Product)
+def index_product_attributes(sender, instance, update_fields=None, **kwargs):
+    """Re-extract specification attributes when they may have changed"""
+    if update_fields is None or {'specifications', 'subcategory'} & set(update_fields):
+        sync_product_attributes(instance)
+
+
+@receiver(post_delete, sender=Product)
+def unindex_product(sender, instance, **kwargs):
+    get_search_backend().remove_product(instance.pk)
+    get_suggestion_index().remove('product', instance.pk)
+
+
+@receiver(post_save, sender=Category)
+def index_category(sender, instance, **kwargs):
+    get_suggestion_index().update_category(instance)
+
+
+@receiver(post_delete, sender=Category)
+def unindex_category(sender, instance, **kwargs):
+    get_suggestion_index().remove('category', instance.pk)
+
+
+@receiver(post_save, sender=SubCategory)
+def index_subcategory(sender, instance, **kwargs):
+    get_suggestion_index().update_subcategory(instance)
+
+
+@receiver(post_delete, sender=SubCategory)
+def unindex_subcategory(sender, instance, **kwargs):
+    get_suggestion_index().remove('subcategory', instance.pk)
@@ -0,0 +1,257 @@
+import re
+import threading
+from dataclasses import dataclass
+
+
+# Suggestions returned per node of the trie (also the maximum `limit`)
+MAX_SUGGESTIONS = 20
+
+# Typo tolerance only kicks in once the query is long enough to be meaningful
+MIN_FUZZY_LENGTH = 3
+
+# Base weights so categories outrank brands, which outrank single products
+KIND_WEIGHTS = {
+    'category': 3000,
+    'subcategory': 2000,
+    'brand': 1000,
+    'product': 0,
+}
+
+NORMALIZE_RE = re.compile(r'[^\w]+', re.UNICODE)
+
+
+def normalize(text):
+    return NORMALIZE_RE.sub(' ', (text or '').lower()).strip()
+
+
+@dataclass
+class Suggestion:
+    key: tuple
+    text: str
+    kind: str
+    object_id: int = None
+    weight: int = 0
+
+
+class _Node:
+    __slots__ = ('children', 'entries', 'top')
+
+    def __init__(self):
+        self.children = {}
+        self.entries = set()
+        self.top = None
+
+
+class SuggestionIndex:
+    """
+    Per-process trie of product names, brands, categories and subcategories.
+    Every entry is indexed at each word boundary, so "14 pro" finds "iPhone 14 Pro".
+    Each node caches its best entries, so lookups never walk whole subtrees.
+    """
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.root = _Node()
+        self.suggestions = {}       # key -> Suggestion
+        self.brand_products = {}    # normalized brand -> {product ids}
+        self.product_brands = {}    # product id -> normalized brand
+        self._brand_labels = {}     # normalized brand -> display label
+        self.built = False
+
+    # ---- trie maintenance ----
+
+    @staticmethod
+    def _index_keys(text):
+        words = normalize(text).split()
+        return {' '.join(words[i:]) for i in range(len(words))}
+
+    def _insert(self, suggestion):
+        self.suggestions[suggestion.key] = suggestion
+        for index_key in self._index_keys(suggestion.text):
+            node = self.root
+            node.top = None
+            for char in index_key:
+                node = node.children.setdefault(char, _Node())
+                node.top = None
+            node.entries.add(suggestion.key)
+
+    def _delete(self, key):
+        suggestion = self.suggestions.pop(key, None)
+        if suggestion is None:
+            return
+        for index_key in self._index_keys(suggestion.text):
+            path = [self.root]
+            for char in index_key:
+                node = path[-1].children.get(char)
+                if node is None:
+                    break
+                path.append(node)
+            else:
+                path[-1].entries.discard(key)
+            for node in path:
+                node.top = None
+
+    def _top(self, node):
+        if node.top is None:
+            candidates = {key: self.suggestions[key] for key in node.entries}
+            for child in node.children.values():
+                for suggestion in self._top(child):
+                    candidates[suggestion.key] = suggestion
+            node.top = sorted(candidates.values(), key=lambda s: (-s.weight, s.text))[:MAX_SUGGESTIONS]
+        return node.top
+
+    def _set_brand(self, product_id, brand):
+        previous = self.product_brands.pop(product_id, None)
+        if previous:
+            products = self.brand_products[previous]
+            products.discard(product_id)
+            self._delete(('brand', previous))
+            if products:
+                self._insert(Suggestion(('brand', previous), self._brand_labels[previous], 'brand',
+                                        weight=KIND_WEIGHTS['brand'] + len(products)))
+            else:
+                del self.brand_products[previous]
+        normalized = normalize(brand)
+        if normalized:
+            self.product_brands[product_id] = normalized
+            products = self.brand_products.setdefault(normalized, set())
+            products.add(product_id)
+            self._brand_labels.setdefault(normalized, brand.strip())
+            self._delete(('brand', normalized))
+            self._insert(Suggestion(('brand', normalized), self._brand_labels[normalized], 'brand',
+                                    weight=KIND_WEIGHTS['brand'] + len(products)))
+
+    # ---- public updates ----
+
+    def rebuild(self):
+        from .models import Category, SubCategory, Product
+        with self.lock:
+            self.root = _Node()
+            self.suggestions = {}
+            self.brand_products = {}
+            self.product_brands = {}
+            self._brand_labels = {}
+            for category in Category.objects.filter(is_active=True).only('id', 'name', 'is_active'):
+                self._add_category(category)
+            for subcategory in SubCategory.objects.filter(is_active=True).only('id', 'name', 'is_active'):
+                self._add_subcategory(subcategory)
+            products = Product.objects.exclude(status=Product.Status.INACTIVE).only(
+                'id', 'name', 'brand', 'status', 'total_reviews'
+            )
+            for product in products.iterator(chunk_size=1000):
+                self._add_product(product)
+            # Warm every node's cache so the first keystrokes aren't slow
+            self._top(self.root)
+            self.built = True
+
+    def _add_category(self, category):
+        self._delete(('category', category.pk))
+        if category.is_active:
+            self._insert(Suggestion(('category', category.pk), category.name, 'category', category.pk,
+                                    KIND_WEIGHTS['category']))
+
+    def _add_subcategory(self, subcategory):
+        self._delete(('subcategory', subcategory.pk))
+        if subcategory.is_active:
+            self._insert(Suggestion(('subcategory', subcategory.pk), subcategory.name, 'subcategory',
+                                    subcategory.pk, KIND_WEIGHTS['subcategory']))
+
+    def _add_product(self, product):
+        from .models import Product
+        self._delete(('product', product.pk))
+        if product.status == Product.Status.INACTIVE:
+            self._set_brand(product.pk, '')
+            return
+        self._insert(Suggestion(('product', product.pk), product.name, 'product', product.pk,
+                                KIND_WEIGHTS['product'] + product.total_reviews))
+        self._set_brand(product.pk, product.brand)
+
+    def update_category(self, category):
+        with self.lock:
+            if self.built:
+                self._add_category(category)
+
+    def update_subcategory(self, subcategory):
+        with self.lock:
+            if self.built:
+                self._add_subcategory(subcategory)
+
+    def update_product(self, product):
+        with self.lock:
+            if self.built:
+                self._add_product(product)
+
+    def remove(self, kind, object_id):
+        with self.lock:
+            if not self.built:
+                return
+            if kind == 'product':
+                self._set_brand(object_id, '')
+            self._delete((kind, object_id))
+
+    # ---- lookup ----
+
+    @staticmethod
+    def _next_row(row, char, query):
+        new_row = [row[0] + 1]
+        for column in range(1, len(query) + 1):
+            new_row.append(min(
+                new_row[column - 1] + 1,
+                row[column] + 1,
+                row[column - 1] + (query[column - 1] != char)
+            ))
+        return new_row
+
+    def _fuzzy_nodes(self, query):
+        """
+        Yield (node, distance) for trie prefixes within edit distance 1 of the query.
+        Like most autocompleters, the first character is assumed to be typed correctly,
+        which keeps the search inside a single subtree.
+        """
+        first = self.root.children.get(query[0])
+        if first is None:
+            return
+        stack = [(first, self._next_row(list(range(len(query) + 1)), query[0], query))]
+        while stack:
+            node, row = stack.pop()
+            for char, child in node.children.items():
+                new_row = self._next_row(row, char, query)
+                if new_row[-1] <= 1:
+                    # The whole subtree completes this prefix
+                    yield child, new_row[-1]
+                elif min(new_row) <= 1:
+                    stack.append((child, new_row))
+
+    def suggest(self, query, limit=10):
+        query = normalize(query)
+        limit = min(limit, MAX_SUGGESTIONS)
+        if not query:
+            return []
+        with self.lock:
+            if not self.built:
+                self.rebuild()
+
+            matches = {}
+            node = self.root
+            for char in query:
+                node = node.children.get(char)
+                if node is None:
+                    break
+            else:
+                for suggestion in self._top(node):
+                    matches[suggestion.key] = (0, suggestion)
+
+            if len(query) >= MIN_FUZZY_LENGTH and len(matches) < limit:
+                for fuzzy_node, distance in self._fuzzy_nodes(query):
+                    for suggestion in self._top(fuzzy_node):
+                        if suggestion.key not in matches:
+                            matches[suggestion.key] = (max(distance, 1), suggestion)
+
+            ranked = sorted(matches.values(), key=lambda match: (match[0], -match[1].weight, match[1].text))
+            return [suggestion for _, suggestion in ranked[:limit]]
+
+
+_index = SuggestionIndex()
+
+
+def get_suggestion_index():
+    return _index
@@ -1,8 +1,22 @@
-from django.test import TestCase
+import shutil
+import tempfile
+from unittest import mock
+from io import BytesIO, StringIO
+from PIL import Image
+from django.test import TestCase, override_settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.cache import cache
 from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.utils.text import slugify
 from rest_framework.test import APIClient
-from products.models import Category, SubCategory, Product
+from products import images
+from products.models import Category, SubCategory, Product, ProductImage, ProductAttribute
+from products.search import MySQLFullTextBackend, build_boolean_query, get_search_backend
+from products.suggest import get_suggestion_index
+from utils.cache import get_cache_version
+from utils.pagination import count_namespace
 
 
 class CategoryModelTest(TestCase):
@@ -393,3 +407,823 @@ class CategoryProductIntegrationTest(TestCase):
         # Should not be able to delete subcategory if it has products
         with self.assertRaises(Exception):
             self.subcategory.delete()
+
+
+class ProductListQueryTest(TestCase):
+    """
+    Test suite for the query cost of the product list endpoint.
+    """
+    
+    def setUp(self):
+        """Set up test fixtures."""
+        self.client = APIClient()
+        self.category = Category.objects.create(name='Electronics')
+        self.subcategory = SubCategory.objects.create(category=self.category, name='Mobiles')
+    
+    def create_products(self, count):
+        for i in range(count):
+            product = Product.objects.create(
+                name=f'Phone {Product.objects.count()}',
+                description='Android phone',
+                category=self.category,
+                subcategory=self.subcategory,
+                price=9999.00,
+                stock=10
+            )
+            ProductImage.objects.create(product=product, image=f'products/phone-{product.id}.jpg', is_primary=True)
+            ProductImage.objects.create(product=product, image=f'products/phone-{product.id}-back.jpg')
+    
+    def count_list_queries(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get('/api/products/products/')
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries), response
+    
+    def test_list_query_count_is_constant(self):
+        """Test that listing products costs the same number of queries for any page size."""
+        self.create_products(2)
+        small_page_queries, _ = self.count_list_queries()
+        
+        self.create_products(18)
+        full_page_queries, response = self.count_list_queries()
+        
+        self.assertEqual(len(response.data['results']), 20)
+        self.assertEqual(small_page_queries, full_page_queries)
+    
+    def test_list_returns_primary_image(self):
+        """Test that the primary image is resolved from the prefetch."""
+        self.create_products(1)
+        _, response = self.count_list_queries()
+        product = response.data['results'][0]
+        self.assertTrue(product['primary_image'].endswith(f"products/phone-{product['id']}.jpg"))
+
+
+def make_image_file(name='photo.jpg', size=(800, 600)):
+    """Build an in-memory JPEG upload."""
+    buffer = BytesIO()
+    Image.new('RGB', size, color=(200, 40, 40)).save(buffer, format='JPEG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/jpeg')
+
+
+class ProductPrimaryImageTest(TestCase):
+    """
+    Test suite for the denormalized primary image on Product.
+    """
+    
+    def setUp(self):
+        """Set up test fixtures."""
+        self.media_root = tempfile.mkdtemp()
+        settings_override = override_settings(MEDIA_ROOT=self.media_root, IMAGE_RENDITIONS_ASYNC=False)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        
+        self.category = Category.objects.create(name='Electronics')
+        self.product = Product.objects.create(
+            name='iPhone 14',
+            description='Latest iPhone',
+            category=self.category,
+            price=79999.00,
+            stock=100
+        )
+    
+    def create_image(self, name='photo.jpg', is_primary=True):
+        with self.captureOnCommitCallbacks(execute=True):
+            return ProductImage.objects.create(product=self.product, image=make_image_file(name), is_primary=is_primary)
+    
+    def test_primary_image_is_denormalized(self):
+        """Test that saving a primary image copies its path and thumbnails onto the product."""
+        image = self.create_image()
+        self.product.refresh_from_db()
+        
+        self.assertEqual(self.product.primary_image.name, image.image.name)
+        self.assertEqual(set(self.product.primary_image_thumbnails), {'320', '640', '1024'})
+        with self.product.primary_image.storage.open(self.product.primary_image_thumbnails['320']['jpeg']) as thumb:
+            self.assertEqual(Image.open(thumb).width, 320)
+    
+    def test_primary_image_follows_new_primary(self):
+        """Test that marking another image as primary updates the product."""
+        self.create_image('front.jpg')
+        back = self.create_image('back.jpg')
+        self.product.refresh_from_db()
+        
+        self.assertEqual(self.product.primary_image.name, back.image.name)
+        self.assertEqual(self.product.images.filter(is_primary=True).count(), 1)
+    
+    def test_deleting_primary_image_clears_product(self):
+        """Test that deleting the primary image clears the denormalized columns."""
+        image = self.create_image()
+        image.delete()
+        self.product.refresh_from_db()
+        
+        self.assertFalse(self.product.primary_image)
+        self.assertEqual(self.product.primary_image_thumbnails, {})
+    
+    def test_list_does_not_query_product_images(self):
+        """Test that the product list never reads the product_images table."""
+        self.create_image()
+        with CaptureQueriesContext(connection) as context:
+            response = APIClient().get('/api/products/products/')
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNotNone(response.data['results'][0]['primary_image'])
+        self.assertFalse(any('product_images' in query['sql'] for query in context.captured_queries))
+    
+    def test_backfill_command(self):
+        """Test that the backfill command restores missing denormalized columns."""
+        image = self.create_image()
+        Product.objects.filter(pk=self.product.pk).update(primary_image='', primary_image_thumbnails={})
+        
+        call_command('backfill_primary_images', stdout=StringIO())
+        self.product.refresh_from_db()
+        
+        self.assertEqual(self.product.primary_image.name, image.image.name)
+        self.assertEqual(set(self.product.primary_image_thumbnails), {'320', '640', '1024'})
+    
+    def test_image_srcset(self):
+        """Test that the image serializer exposes WebP and JPEG srcsets."""
+        image = self.create_image()
+        response = APIClient().get(f'/api/products/products/{self.product.id}/')
+        srcset = response.data['images'][0]['srcset']
+        
+        self.assertEqual(set(srcset), {'webp', 'jpeg'})
+        self.assertIn('320w', srcset['webp'])
+        self.assertIn('1024w', srcset['jpeg'])
+    
+    def test_rendition_paths_are_not_exposed(self):
+        """Test that the API returns srcsets, never the stored renditions map."""
+        self.create_image()
+        with self.captureOnCommitCallbacks(execute=True):
+            category = Category.objects.create(name='Fashion', image=make_image_file('fashion.jpg'))
+        client = APIClient()
+        
+        product = client.get(f'/api/products/products/{self.product.id}/').data
+        category_data = client.get(f'/api/products/categories/{category.id}/').data
+        
+        self.assertNotIn('renditions', product['images'][0])
+        self.assertEqual(set(product['primary_image_thumbnails']), {'webp', 'jpeg'})
+        self.assertIn('640w', product['primary_image_thumbnails']['jpeg'])
+        self.assertNotIn('image_renditions', category_data)
+        self.assertEqual(set(category_data['image_srcset']), {'webp', 'jpeg'})
+    
+    def test_resave_does_not_reschedule_renditions(self):
+        """Test that re-saving an image whose renditions are in progress doesn't queue them again."""
+        submitted = []
+        executor = mock.Mock(submit=lambda *args: submitted.append(args))
+        self.addCleanup(images._in_flight.clear)
+        
+        with override_settings(IMAGE_RENDITIONS_ASYNC=True), \
+                mock.patch('products.images.get_executor', return_value=executor):
+            image = self.create_image()
+            for _ in range(2):
+                with self.captureOnCommitCallbacks(execute=True):
+                    image.alt_text = 'Front'
+                    image.save()
+            self.assertEqual(len(submitted), 1)
+            
+            with self.captureOnCommitCallbacks(execute=True):
+                image.image = make_image_file('replacement.jpg')
+                image.save()
+        
+        self.assertEqual(len(submitted), 2)
+    
+    def test_small_original_is_not_upscaled(self):
+        """Test that renditions never exceed the original width."""
+        with self.captureOnCommitCallbacks(execute=True):
+            image = ProductImage.objects.create(
+                product=self.product, image=make_image_file(size=(400, 300)), is_primary=True
+            )
+        image.refresh_from_db()
+        with image.image.storage.open(image.renditions['1024']['webp']) as rendition:
+            self.assertEqual(Image.open(rendition).width, 400)
+    
+    def test_category_image_renditions(self):
+        """Test that category uploads get renditions too."""
+        with self.captureOnCommitCallbacks(execute=True):
+            category = Category.objects.create(name='Fashion', image=make_image_file('fashion.jpg'))
+        category.refresh_from_db()
+        self.assertEqual(set(category.image_renditions), {'320', '640', '1024'})
+    
+    def test_generate_image_renditions_command(self):
+        """Test that the rendition back-fill command regenerates missing renditions."""
+        image = self.create_image()
+        ProductImage.objects.filter(pk=image.pk).update(renditions={})
+        Product.objects.filter(pk=self.product.pk).update(primary_image_thumbnails={})
+        
+        call_command('generate_image_renditions', workers=1, stdout=StringIO())
+        image.refresh_from_db()
+        self.product.refresh_from_db()
+        
+        self.assertEqual(set(image.renditions), {'320', '640', '1024'})
+        self.assertEqual(self.product.primary_image_thumbnails, image.renditions)
+
+
+class ProductSearchTest(TestCase):
+    """
+    Test suite for product search through the search backend.
+    """
+    
+    def setUp(self):
+        """Set up test fixtures."""
+        self.client = APIClient()
+        self.category = Category.objects.create(name='Electronics')
+        self.iphone = Product.objects.create(
+            name='iPhone 14',
+            description='Latest smartphone from Apple',
+            brand='Apple',
+            category=self.category,
+            price=79999.00,
+            stock=100
+        )
+        self.case = Product.objects.create(
+            name='Silicone Case',
+            description='Protective case for iPhone 14',
+            brand='Spigen',
+            category=self.category,
+            price=999.00,
+            stock=100
+        )
+        self.galaxy = Product.objects.create(
+            name='Galaxy S23',
+            description='Android smartphone',
+            brand='Samsung',
+            category=self.category,
+            price=59999.00,
+            stock=100
+        )
+        get_search_backend().rebuild()
+    
+    def search(self, query, **params):
+        response = self.client.get('/api/products/products/', {'search': query, **params})
+        self.assertEqual(response.status_code, 200)
+        return [item['name'] for item in response.data['results']]
+    
+    def test_search_matches_all_fields(self):
+        """Test that search matches name, description and brand."""
+        self.assertEqual(set(self.search('iphone')), {'iPhone 14', 'Silicone Case'})
+        self.assertEqual(self.search('samsung'), ['Galaxy S23'])
+    
+    def test_search_requires_every_term(self):
+        """Test that multi-word queries only return products matching every term."""
+        self.assertEqual(set(self.search('smartphone apple')), {'iPhone 14'})
+    
+    def test_prefix_matching(self):
+        """Test that partial words match as prefixes."""
+        self.assertEqual(set(self.search('smart')), {'iPhone 14', 'Galaxy S23'})
+    
+    def test_relevance_ordering(self):
+        """Test that name matches outrank description matches."""
+        self.assertEqual(self.search('iphone', ordering='-relevance'), ['iPhone 14', 'Silicone Case'])
+    
+    def test_relevance_ordering_without_search(self):
+        """Test that relevance ordering is ignored when there is no search."""
+        response = self.client.get('/api/products/products/', {'ordering': '-relevance'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 3)
+    
+    def test_index_follows_product_updates(self):
+        """Test that renamed and deleted products are reindexed through signals."""
+        self.galaxy.name = 'Pixel 8'
+        self.galaxy.save()
+        self.assertEqual(self.search('pixel'), ['Pixel 8'])
+        self.assertEqual(self.search('galaxy'), [])
+        
+        self.case.delete()
+        self.assertEqual(self.search('spigen'), [])
+    
+    def test_rebuild_search_index_command(self):
+        """Test that the rebuild command picks up rows written without signals."""
+        Product.objects.filter(pk=self.galaxy.pk).update(name='Pixel 8')
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(self.search('pixel'), ['Pixel 8'])
+
+
+class FullTextQueryTest(TestCase):
+    """
+    Test suite for the MySQL FULLTEXT boolean query builder.
+    """
+    
+    def test_indexable_tokens_are_required_prefixes(self):
+        """Test that ordinary words become required prefix terms."""
+        self.assertEqual(build_boolean_query(['Galaxy', 'smartphone']), ('+galaxy* +smartphone*', []))
+        self.assertEqual(build_boolean_query(['iphone iphone']), ('+iphone*', []))
+    
+    def test_stopwords_are_dropped(self):
+        """Test that stopwords aren't required, since the index never contains them."""
+        self.assertEqual(build_boolean_query(['case for iphone']), ('+case* +iphone*', []))
+        self.assertEqual(build_boolean_query(['the']), (None, []))
+    
+    def test_short_tokens_are_returned_separately(self):
+        """Test that words below the minimum token size are left out of the query."""
+        self.assertEqual(build_boolean_query(['4k tv']), (None, ['4k', 'tv']))
+        self.assertEqual(build_boolean_query(['samsung 5g']), ('+samsung*', ['5g']))
+        self.assertEqual(build_boolean_query(['samsung 5g'], min_token_size=2), ('+samsung* +5g*', []))
+    
+    def test_stopword_only_search_matches_nothing(self):
+        """Test that a query of only stopwords returns no products, as the in-process backend does."""
+        Product.objects.create(
+            name='The Phone', description='The phone', category=Category.objects.create(name='Electronics'), price=1, stock=1
+        )
+        backend = MySQLFullTextBackend()
+        
+        self.assertFalse(backend.search(Product.objects.all(), ['the of']).exists())
+        self.assertEqual(backend.search(Product.objects.all(), ['!!']).count(), 1)
+    
+    def test_short_tokens_fall_back_to_icontains(self):
+        """Test that a search with only short words filters with icontains instead of MATCH."""
+        queryset = MySQLFullTextBackend().search(Product.objects.all(), ['tv'])
+        sql = str(queryset.query)
+        
+        self.assertNotIn('MATCH', sql)
+        self.assertIn('LIKE', sql)
+        self.assertIn('relevance', queryset.query.annotations)
+
+
+class ProductSuggestTest(TestCase):
+    """
+    Test suite for the autocomplete suggestion endpoint.
+    """
+    
+    def setUp(self):
+        """Set up test fixtures."""
+        self.client = APIClient()
+        self.category = Category.objects.create(name='Electronics')
+        self.mobiles = SubCategory.objects.create(category=self.category, name='Mobiles')
+        self.iphone = Product.objects.create(
+            name='iPhone 14 Pro',
+            description='Latest iPhone',
+            brand='Apple',
+            category=self.category,
+            subcategory=self.mobiles,
+            price=79999.00,
+            stock=100
+        )
+        self.galaxy = Product.objects.create(
+            name='Galaxy S23',
+            description='Android phone',
+            brand='Samsung',
+            category=self.category,
+            subcategory=self.mobiles,
+            price=59999.00,
+            stock=100
+        )
+        get_suggestion_index().rebuild()
+    
+    def suggest(self, query):
+        response = self.client.get('/api/products/suggest/', {'q': query})
+        self.assertEqual(response.status_code, 200)
+        return [(item['type'], item['text']) for item in response.data['suggestions']]
+    
+    def test_prefix_suggestions(self):
+        """Test that prefixes of product names, brands and categories are suggested."""
+        self.assertEqual(self.suggest('gal'), [('product', 'Galaxy S23')])
+        self.assertEqual(self.suggest('sams'), [('brand', 'Samsung')])
+        self.assertEqual(self.suggest('mob'), [('subcategory', 'Mobiles')])
+        self.assertEqual(self.suggest('elec'), [('category', 'Electronics')])
+    
+    def test_inner_word_prefix(self):
+        """Test that later words of a name are matched too."""
+        self.assertEqual(self.suggest('14 pro'), [('product', 'iPhone 14 Pro')])
+    
+    def test_typo_tolerance(self):
+        """Test that a single-character typo still finds the suggestion."""
+        self.assertEqual(self.suggest('ipone'), [('product', 'iPhone 14 Pro')])
+        self.assertEqual(self.suggest('galxy'), [('product', 'Galaxy S23')])
+        self.assertEqual(self.suggest('samsnug'), [])
+    
+    def test_exact_matches_rank_first(self):
+        """Test that exact prefix matches outrank fuzzy ones."""
+        Product.objects.create(
+            name='Galaxy Buds',
+            description='Earbuds',
+            category=self.category,
+            price=9999.00,
+            stock=10
+        )
+        Category.objects.create(name='Gallery')
+        suggestions = self.suggest('gala')
+        self.assertEqual(suggestions[-1], ('category', 'Gallery'))
+    
+    def test_index_follows_writes(self):
+        """Test that the index refreshes incrementally from model signals."""
+        self.galaxy.name = 'Pixel 8'
+        self.galaxy.brand = 'Google'
+        self.galaxy.save()
+        self.assertEqual(self.suggest('pix'), [('product', 'Pixel 8')])
+        self.assertEqual(self.suggest('goo'), [('brand', 'Google')])
+        self.assertEqual(self.suggest('sams'), [])
+        
+        self.mobiles.is_active = False
+        self.mobiles.save()
+        self.assertEqual(self.suggest('mob'), [])
+    
+    def test_inactive_products_are_not_suggested(self):
+        """Test that inactive products are hidden."""
+        self.galaxy.status = Product.Status.INACTIVE
+        self.galaxy.save()
+        self.assertEqual(self.suggest('gal'), [])
+    
+    def test_empty_query(self):
+        """Test that an empty query returns no suggestions."""
+        self.assertEqual(self.suggest(''), [])
+
+
+class ProductFacetTest(TestCase):
+    """
+    Test suite for facet counts on the product list.
+    """
+    
+    def setUp(self):
+        """Set up test fixtures."""
+        cache.clear()
+        self.client = APIClient()
+        self.electronics = Category.objects.create(name='Electronics')
+        self.fashion = Category.objects.create(name='Fashion')
+        self.mobiles = SubCategory.objects.create(category=self.electronics, name='Mobiles')
+        self.create_product('iPhone 14', self.electronics, self.mobiles, 'Apple', 79999, 4.5, 10)
+        self.create_product('Galaxy S23', self.electronics, self.mobiles, 'Samsung', 59999, 3.5, 0)
+        self.create_product('Galaxy Buds', self.electronics, None, 'Samsung', 4999, 4.0, 5)
+        self.create_product('T-Shirt', self.fashion, None, '', 499, 0, 50)
+    
+    def create_product(self, name, category, subcategory, brand, price, rating, stock):
+        return Product.objects.create(
+            name=name,
+            description=name,
+            category=category,
+            subcategory=subcategory,
+            brand=brand,
+            price=price,
+            average_rating=rating,
+            stock=stock
+        )
+    
+    def get_facets(self, **params):
+        response = self.client.get('/api/products/products/', {'facets': 'true', **params})
+        self.assertEqual(response.status_code, 200)
+        return response.data['facets']
+    
+    def test_facet_counts(self):
+        """Test that every facet is counted over the filtered products."""
+        facets = self.get_facets()
+        
+        self.assertEqual(
+            [(item['name'], item['count']) for item in facets['category']],
+            [('Electronics', 3), ('Fashion', 1)]
+        )
+        self.assertEqual([(item['name'], item['count']) for item in facets['subcategory']], [('Mobiles', 2)])
+        self.assertEqual([(item['name'], item['count']) for item in facets['brand']], [('Samsung', 2), ('Apple', 1)])
+        self.assertEqual([bucket['count'] for bucket in facets['price']], [1, 0, 1, 0, 0, 2])
+        self.assertEqual([bucket['count'] for bucket in facets['rating']], [2, 3, 3, 3])
+        self.assertEqual(facets['availability'], {'in_stock': 3, 'out_of_stock': 1})
+    
+    def test_facets_follow_filters(self):
+        """Test that facet counts are computed over the filtered result set."""
+        facets = self.get_facets(category=self.electronics.id, in_stock='true')
+        
+        self.assertEqual([(item['name'], item['count']) for item in facets['brand']], [('Apple', 1), ('Samsung', 1)])
+        self.assertEqual(facets['availability'], {'in_stock': 2, 'out_of_stock': 0})
+        
+        facets = self.get_facets(search='galaxy')
+        self.assertEqual([(item['name'], item['count']) for item in facets['brand']], [('Samsung', 2)])
+    
+    def test_facets_are_optional(self):
+        """Test that facets are only returned when requested."""
+        response = self.client.get('/api/products/products/')
+        self.assertNotIn('facets', response.data)
+    
+    def test_facets_are_cached(self):
+        """Test that a repeated filter signature is served from the cache."""
+        self.get_facets(ordering='price')
+        with CaptureQueriesContext(connection) as context:
+            self.get_facets(page=1)
+        self.assertFalse(any('GROUP BY' in query['sql'] for query in context.captured_queries))
+    
+    def test_product_write_invalidates_facets(self):
+        """Test that product writes invalidate cached facet counts."""
+        self.get_facets()
+        self.create_product('Pixel 8', self.electronics, self.mobiles, 'Google', 69999, 4.2, 3)
+        
+        facets = self.get_facets()
+        self.assertIn('Google', [item['name'] for item in facets['brand']])
+
+
+class ProductSpecificationFilterTest(TestCase):
+    """
+    Test suite for filtering and faceting on Product.specifications.
+    """
+    
+    def setUp(self):
+        """Set up test fixtures."""
+        cache.clear()
+        self.client = APIClient()
+        self.category = Category.objects.create(name='Electronics')
+        self.mobiles = SubCategory.objects.create(category=self.category, name='Mobiles')
+        self.create_product('Phone A', {'RAM': '8GB', 'Storage': '128GB', 'Colors': ['Black', 'Blue']})
+        self.create_product('Phone B', {'RAM': '8GB', 'Storage': '256GB', 'Colors': ['Black']})
+        self.create_product('Phone C', {'RAM': '12GB', 'Storage': '256GB', '5G': True})
+    
+    def create_product(self, name, specifications):
+        return Product.objects.create(
+            name=name,
+            description=name,
+            category=self.category,
+            subcategory=self.mobiles,
+            price=19999,
+            stock=10,
+            specifications=specifications
+        )
+    
+    def names(self, **params):
+        response = self.client.get('/api/products/products/', params)
+        self.assertEqual(response.status_code, 200)
+        return sorted(item['name'] for item in response.data['results'])
+    
+    def test_attributes_are_extracted(self):
+        """Test that specifications are flattened into normalized attribute rows."""
+        product = Product.objects.get(name='Phone A')
+        attributes = set(product.attributes.values_list('key', 'value'))
+        self.assertEqual(attributes, {
+            ('ram', '8GB'), ('storage', '128GB'), ('colors', 'Black'), ('colors', 'Blue')
+        })
+        self.assertTrue(all(attribute.subcategory == self.mobiles for attribute in product.attributes.all()))
+    
+    def test_filter_by_spec(self):
+        """Test filtering by one and by several specification keys."""
+        self.assertEqual(self.names(**{'spec.ram': '8GB'}), ['Phone A', 'Phone B'])
+        self.assertEqual(self.names(**{'spec.ram': '8GB', 'spec.storage': '256GB'}), ['Phone B'])
+        self.assertEqual(self.names(**{'spec.5g': 'true'}), ['Phone C'])
+    
+    def test_values_match_case_insensitively(self):
+        """Test that spec values match whatever their case."""
+        self.assertEqual(self.names(**{'spec.ram': '8gb'}), ['Phone A', 'Phone B'])
+        self.assertEqual(self.names(**{'spec.colors': ' BLUE '}), ['Phone A'])
+    
+    def test_values_differing_in_case_are_one_attribute(self):
+        """Test that list values differing only in case are indexed once."""
+        product = self.create_product('Phone D', {'Colors': ['Red', 'red', 'RED ']})
+        
+        self.assertEqual(list(product.attributes.values_list('key', 'normalized_value')), [('colors', 'red')])
+        self.assertEqual(self.names(**{'spec.colors': 'Red'}), ['Phone D'])
+    
+    def test_nested_keys_filter_as_faceted(self):
+        """Test that dotted keys from facets work as filters for nested specifications."""
+        self.create_product('Phone D', {'Display': {'Screen Size': '6.1in', 'Type': 'OLED'}})
+        self.create_product('Phone E', {'Display': {'Screen Size': '6.7in'}})
+        
+        response = self.client.get('/api/products/products/', {'facets': 'true'})
+        keys = set(response.data['facets']['specifications'])
+        
+        self.assertIn('display.screen_size', keys)
+        self.assertEqual(self.names(**{'spec.display.screen_size': '6.1in'}), ['Phone D'])
+        self.assertEqual(self.names(**{'spec.Display.Screen Size': '6.7IN'}), ['Phone E'])
+        self.assertEqual(self.names(**{'spec.display_screen_size': '6.1in'}), [])
+    
+    def test_repeated_values_are_or_ed(self):
+        """Test that repeated values for the same key match any of them."""
+        response = self.client.get('/api/products/products/?spec.storage=128GB&spec.storage=512GB&spec.colors=Blue')
+        self.assertEqual([item['name'] for item in response.data['results']], ['Phone A'])
+    
+    def test_spec_filter_uses_attribute_index(self):
+        """Test that spec filters query the attribute table, not the JSON column."""
+        with CaptureQueriesContext(connection) as context:
+            self.names(**{'spec.ram': '8GB'})
+        sql = ' '.join(query['sql'] for query in context.captured_queries)
+        self.assertIn('product_attributes', sql)
+    
+    def test_spec_facets(self):
+        """Test that facet counts include specification values."""
+        response = self.client.get('/api/products/products/', {'facets': 'true', 'spec.ram': '8GB'})
+        specifications = response.data['facets']['specifications']
+        
+        self.assertEqual(specifications['ram'], [{'value': '8GB', 'count': 2}])
+        self.assertEqual(specifications['colors'], [{'value': 'Black', 'count': 2}, {'value': 'Blue', 'count': 1}])
+    
+    def test_attributes_follow_updates(self):
+        """Test that editing specifications re-indexes the product."""
+        product = Product.objects.get(name='Phone C')
+        product.specifications = {'RAM': '8GB'}
+        product.save()
+        self.assertEqual(self.names(**{'spec.ram': '8GB'}), ['Phone A', 'Phone B', 'Phone C'])
+        self.assertEqual(self.names(**{'spec.5g': 'true'}), [])
+    
+    def test_rebuild_product_attributes_command(self):
+        """Test that the rebuild command restores the attribute index."""
+        ProductAttribute.objects.all().delete()
+        call_command('rebuild_product_attributes', stdout=StringIO())
+        self.assertEqual(self.names(**{'spec.storage': '256GB'}), ['Phone B', 'Phone C'])
+
+
+class ProductKeysetPaginationTest(TestCase):
+    """
+    Test suite for keyset (cursor) pagination of products and reviews.
+    """
+    
+    def setUp(self):
+        """Set up test fixtures."""
+        cache.clear()
+        self.client = APIClient()
+        self.category = Category.objects.create(name='Electronics')
+        # Repeated prices and ratings exercise the id tiebreak
+        Product.objects.bulk_create([
+            Product(
+                name=f'Product {i}',
+                slug=f'product-{i}',
+                description='Keyset',
+                category=self.category,
+                price=100 + (i % 4) * 50,
+                average_rating=(i % 3) + 2,
+                stock=5
+            )
+            for i in range(45)
+        ])
+    
+    def walk(self, url):
+        """Follow next links and return ids of every row, plus the responses."""
+        ids, responses = [], []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            responses.append(response)
+            ids.extend(item['id'] for item in response.data['results'])
+            url = response.data['next']
+        return ids, responses
+    
+    def test_cursor_pages_cover_every_ordering(self):
+        """Test that each ordering walks every product exactly once, in order."""
+        for ordering in ('price', '-price', 'average_rating', '-average_rating', 'created_at', '-created_at'):
+            ids, responses = self.walk(f'/api/products/products/?cursor=&ordering={ordering}')
+            
+            field = ordering.lstrip('-')
+            expected = list(
+                Product.objects.order_by(ordering, '-id' if ordering.startswith('-') else 'id').values_list('id', flat=True)
+            )
+            self.assertEqual(ids, expected, ordering)
+            self.assertEqual(len(responses), 3, field)
+    
+    def test_cursor_response_has_no_count(self):
+        """Test that keyset pages skip the COUNT(*) query."""
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get('/api/products/products/?cursor=')
+        
+        self.assertNotIn('count', response.data)
+        self.assertFalse(any('COUNT(' in query['sql'] for query in context.captured_queries))
+    
+    def test_previous_link_returns_previous_page(self):
+        """Test that the previous link of page two returns page one."""
+        first = self.client.get('/api/products/products/?cursor=&ordering=price')
+        second = self.client.get(first.data['next'])
+        previous = self.client.get(second.data['previous'])
+        
+        self.assertIsNone(first.data['previous'])
+        self.assertEqual(
+            [item['id'] for item in previous.data['results']],
+            [item['id'] for item in first.data['results']]
+        )
+    
+    def test_page_number_pagination_is_default(self):
+        """Test that requests without a cursor keep page-number pagination."""
+        response = self.client.get('/api/products/products/?page=2')
+        self.assertEqual(response.data['count'], 45)
+        self.assertEqual(len(response.data['results']), 20)
+    
+    def test_invalid_cursor(self):
+        """Test that a malformed cursor returns 404."""
+        response = self.client.get('/api/products/products/?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, 404)
+
+
+class PaginationCountCacheTest(TestCase):
+    """
+    Test suite for cached page counts on paginated list endpoints.
+    """
+    
+    def setUp(self):
+        """Set up test fixtures."""
+        cache.clear()
+        self.client = APIClient()
+        self.category = Category.objects.create(name='Electronics')
+        for i in range(3):
+            Product.objects.create(
+                name=f'Phone {i}',
+                slug=f'phone-{i}',
+                description='Phone',
+                category=self.category,
+                price=100 + i,
+                stock=5
+            )
+    
+    def count_queries(self, url):
+        """Fetch a listing and return the response and its number of COUNT queries."""
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response, sum('COUNT(' in query['sql'] for query in context.captured_queries)
+    
+    def test_repeated_listing_reuses_count(self):
+        """Test that the second request for the same listing skips COUNT(*)."""
+        first, first_counts = self.count_queries('/api/products/products/')
+        second, second_counts = self.count_queries('/api/products/products/')
+        
+        self.assertEqual(first.data['count'], 3)
+        self.assertTrue(first.data['count_exact'])
+        self.assertEqual(first_counts, 1)
+        self.assertEqual(second.data['count'], 3)
+        self.assertEqual(second_counts, 0)
+    
+    def test_filters_are_counted_separately(self):
+        """Test that each filter combination caches its own count."""
+        self.count_queries('/api/products/products/')
+        filtered, counts = self.count_queries('/api/products/products/?min_price=101')
+        
+        self.assertEqual(filtered.data['count'], 2)
+        self.assertEqual(counts, 1)
+    
+    def test_write_invalidates_count(self):
+        """Test that creating a product invalidates the cached count."""
+        self.count_queries('/api/products/products/')
+        Product.objects.create(
+            name='Phone 3',
+            slug='phone-3',
+            description='Phone',
+            category=self.category,
+            price=200,
+            stock=5
+        )
+        response, counts = self.count_queries('/api/products/products/')
+        
+        self.assertEqual(response.data['count'], 4)
+        self.assertEqual(counts, 1)
+    
+    def test_only_listed_models_invalidate_counts(self):
+        """Test that writes to models without paginated listings leave count caches alone."""
+        product = Product.objects.first()
+        product_version = get_cache_version(count_namespace(Product))
+        attribute_version = get_cache_version(count_namespace(ProductAttribute))
+        
+        ProductAttribute.objects.create(product=product, key='ram', value='8GB', normalized_value='8gb')
+        
+        self.assertEqual(get_cache_version(count_namespace(ProductAttribute)), attribute_version)
+        product.save()
+        self.assertNotEqual(get_cache_version(count_namespace(Product)), product_version)
+
+
+class CatalogTreeTest(TestCase):
+    """
+    Test suite for the cached catalog tree endpoint.
+    """
+    
+    def setUp(self):
+        """Set up test fixtures."""
+        cache.clear()
+        self.client = APIClient()
+        self.electronics = Category.objects.create(name='Electronics')
+        self.books = Category.objects.create(name='Books')
+        SubCategory.objects.create(category=self.electronics, name='Phones')
+        SubCategory.objects.create(category=self.electronics, name='Laptops')
+        SubCategory.objects.create(category=self.books, name='Fiction', is_active=False)
+    
+    def test_tree_is_nested(self):
+        """Test that active subcategories are nested under their categories."""
+        response = self.client.get('/api/products/catalog-tree/')
+        
+        self.assertEqual(response.status_code, 200)
+        categories = response.data['categories']
+        self.assertEqual([category['name'] for category in categories], ['Books', 'Electronics'])
+        self.assertEqual(categories[0]['subcategories'], [])
+        self.assertEqual([sub['name'] for sub in categories[1]['subcategories']], ['Laptops', 'Phones'])
+    
+    def test_tree_is_served_from_cache(self):
+        """Test that repeated requests don't query the database."""
+        self.client.get('/api/products/catalog-tree/')
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/products/catalog-tree/')
+        self.assertEqual(len(response.data['categories']), 2)
+    
+    def test_etag_revalidation(self):
+        """Test that a matching If-None-Match returns 304 without a body."""
+        first = self.client.get('/api/products/catalog-tree/')
+        second = self.client.get('/api/products/catalog-tree/', HTTP_IF_NONE_MATCH=first['ETag'])
+        
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(second['ETag'], first['ETag'])
+        self.assertFalse(second.content)
+    
+    def test_write_invalidates_tree(self):
+        """Test that a subcategory write changes the tree and its ETag."""
+        first = self.client.get('/api/products/catalog-tree/')
+        SubCategory.objects.create(category=self.books, name='Poetry')
+        second = self.client.get('/api/products/catalog-tree/', HTTP_IF_NONE_MATCH=first['ETag'])
+        
+        self.assertEqual(second.status_code, 200)
+        self.assertNotEqual(second['ETag'], first['ETag'])
+        self.assertEqual([sub['name'] for sub in second.data['categories'][0]['subcategories']], ['Poetry'])
+    
+    def test_subcategory_list_query_count(self):
+        """Test that the subcategory list doesn't query categories per row."""
+        for i in range(5):
+            SubCategory.objects.create(category=self.books, name=f'Genre {i}')
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get('/api/products/subcategories/')
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertLessEqual(len(context.captured_queries), 2)
@@ -1,6 +1,9 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import CategoryViewSet, SubCategoryViewSet, ProductViewSet, ProductImageViewSet, ReviewViewSet
+from .views import (
+    CategoryViewSet, SubCategoryViewSet, ProductViewSet, ProductImageViewSet, ReviewViewSet,
+    ProductSuggestView, CatalogTreeView
+)
 
 router = DefaultRouter()
 router.register(r'categories', CategoryViewSet, basename='category')
@@ -12,5 +15,7 @@ router.register(r'reviews', ReviewViewSet, basename='review')
 app_name = 'products'
 
 urlpatterns = [
+    path('suggest/', ProductSuggestView.as_view(), name='product-suggest'),
+    path('catalog-tree/', CatalogTreeView.as_view(), name='catalog-tree'),
     path('', include(router.urls)),
 ]
@@ -1,6 +1,9 @@
 from rest_framework import viewsets, filters, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.views import APIView
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags
 from django_filters.rest_framework import DjangoFilterBackend
 from .models import Category, SubCategory, Product, ProductImage, Review
 from .serializers import (
@@ -12,7 +15,13 @@ from .serializers import (
     ProductImageSerializer,
     ReviewSerializer
 )
+from .search import ProductSearchFilter, ProductOrderingFilter
+from .suggest import get_suggestion_index, MAX_SUGGESTIONS
+from .catalog import get_catalog_tree, CATALOG_MAX_AGE
+from .facets import get_facets
+from .attributes import filter_by_specs
 from accounts.permissions import IsAdmin
+from utils.pagination import CursorOrPageNumberPagination
 
 
 class CategoryViewSet(viewsets.ModelViewSet):
@@ -29,7 +38,7 @@ class CategoryViewSet(viewsets.ModelViewSet):
 
 class SubCategoryViewSet(viewsets.ModelViewSet):
     """SubCategory CRUD operations"""
-    queryset = SubCategory.objects.filter(is_active=True)
+    queryset = SubCategory.objects.filter(is_active=True).select_related('category')
     serializer_class = SubCategorySerializer
     # lookup_field = 'slug'  # Temporarily disabled for testing
     filter_backends = [DjangoFilterBackend]
@@ -43,13 +52,14 @@ class SubCategoryViewSet(viewsets.ModelViewSet):
 
 class ProductViewSet(viewsets.ModelViewSet):
     """Product CRUD and filtering"""
-    queryset = Product.objects.select_related('category', 'subcategory').prefetch_related('images', 'reviews')
+    queryset = Product.objects.select_related('category', 'subcategory')
     # lookup_field = 'slug'  # Temporarily disabled for testing
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, ProductSearchFilter, ProductOrderingFilter]
     filterset_fields = ['category', 'subcategory', 'status']
     search_fields = ['name', 'description', 'brand']
-    ordering_fields = ['price', 'average_rating', 'created_at']
+    ordering_fields = ['price', 'average_rating', 'created_at', 'relevance']
     ordering = ['-created_at']
+    pagination_class = CursorOrPageNumberPagination
     
     def get_serializer_class(self):
         if self.action == 'list':
@@ -66,6 +76,10 @@ class ProductViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         queryset = super().get_queryset()
         
+        # List reads the denormalized primary image and never serializes reviews
+        if self.action != 'list':
+            queryset = queryset.prefetch_related('images', 'reviews__user')
+        
         # Filter by price range
         min_price = self.request.query_params.get('min_price')
         max_price = self.request.query_params.get('max_price')
@@ -84,8 +98,21 @@ class ProductViewSet(viewsets.ModelViewSet):
         if in_stock == 'true':
             queryset = queryset.filter(stock__gt=0)
         
+        # Filter by specification attributes (?spec.ram=8GB)
+        queryset = filter_by_specs(queryset, self.request.query_params)
+        
         return queryset
     
+    def list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
+        
+        # Optional facet counts over the whole filtered result set
+        if request.query_params.get('facets') == 'true':
+            queryset = self.filter_queryset(self.get_queryset())
+            response.data['facets'] = get_facets(queryset, request.query_params)
+        
+        return response
+    
     @action(detail=True, methods=['post'], permission_classes=[permissions.IsAuthenticated])
     def add_review(self, request, slug=None):
         """Add review to product"""
@@ -105,6 +132,45 @@ class ProductViewSet(viewsets.ModelViewSet):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+class ProductSuggestView(APIView):
+    """Autocomplete suggestions for the product search box"""
+    permission_classes = [permissions.AllowAny]
+    
+    def get(self, request):
+        query = request.query_params.get('q', '')
+        try:
+            limit = max(1, min(int(request.query_params.get('limit', 8)), MAX_SUGGESTIONS))
+        except ValueError:
+            return Response({'error': 'limit must be an integer.'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        suggestions = get_suggestion_index().suggest(query, limit=limit)
+        return Response({
+            'query': query,
+            'suggestions': [
+                {'text': suggestion.text, 'type': suggestion.kind, 'id': suggestion.object_id}
+                for suggestion in suggestions
+            ]
+        })
+
+
+class CatalogTreeView(APIView):
+    """Nested category/subcategory tree for navigation, with ETag revalidation"""
+    permission_classes = [permissions.AllowAny]
+    
+    def get(self, request):
+        tree = get_catalog_tree()
+        etag = tree['etag']
+        
+        if_none_match = request.headers.get('If-None-Match', '')
+        if etag in parse_etags(if_none_match) or if_none_match.strip() == '*':
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = Response({'categories': tree['categories']})
+        response['ETag'] = etag
+        patch_cache_control(response, public=True, max_age=CATALOG_MAX_AGE)
+        return response
+
+
 class ProductImageViewSet(viewsets.ModelViewSet):
     """Product Image management"""
     queryset = ProductImage.objects.all()
@@ -122,6 +188,7 @@ class ReviewViewSet(viewsets.ModelViewSet):
     filterset_fields = ['product', 'rating']
     ordering_fields = ['created_at', 'helpful_count']
     ordering = ['-created_at']
+    pagination_class = CursorOrPageNumberPagination
     
     def get_permissions(self):
         if self.action in ['create', 'update', 'partial_update', 'destroy']:
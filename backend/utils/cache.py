@@ -0,0 +1,39 @@
+import hashlib
+from django.core.cache import cache
+
+
+def _version_key(namespace):
+    return f'cache-version:{namespace}'
+
+
+def get_cache_version(namespace):
+    """Current version of a cache namespace (starts at 1)"""
+    version = cache.get(_version_key(namespace))
+    if version is None:
+        cache.add(_version_key(namespace), 1, timeout=None)
+        version = cache.get(_version_key(namespace), 1)
+    return version
+
+
+def bump_cache_version(namespace):
+    """Invalidate every key of a namespace by moving it to a new version"""
+    try:
+        return cache.incr(_version_key(namespace))
+    except ValueError:
+        cache.set(_version_key(namespace), 2, timeout=None)
+        return 2
+
+
+def versioned_key(namespace, *parts):
+    """Cache key tied to the namespace's current version"""
+    digest = hashlib.md5(repr(parts).encode('utf-8')).hexdigest()
+    return f'{namespace}:{get_cache_version(namespace)}:{digest}'
+
+
+def filter_signature(query_params, ignore=()):
+    """Normalized, order-independent signature of request query parameters"""
+    return tuple(sorted(
+        (key, tuple(sorted(values)))
+        for key, values in query_params.lists()
+        if key not in ignore
+    ))
@@ -1,29 +1,68 @@
-from django.core.mail import send_mail
-from django.template.loader import render_to_string
+import logging
 from django.conf import settings
-from django.utils.html import strip_tags
+
+
+logger = logging.getLogger(__name__)
 
 
 def send_email(subject, template_name, context, recipient_list):
     """
-    Send email using template
+    Render an email template and queue it in the outbox, one message per
+    recipient. Delivery happens in `manage.py dispatch_emails`, so callers
+    never wait on SMTP, and messages queued inside a transaction are only
+    sent if it commits.
     """
+    from notifications.outbox import enqueue
+    from notifications.rendering import renderer
     try:
-        html_message = render_to_string(f'emails/{template_name}.html', context)
-        plain_message = strip_tags(html_message)
-        
-        send_mail(
-            subject=subject,
-            message=plain_message,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=recipient_list,
-            html_message=html_message,
-            fail_silently=False,
-        )
+        html_message, plain_message = renderer.render(template_name, context)
+    except Exception:
+        logger.exception('Rendering email template %s failed', template_name)
+        return False
+    
+    # Database errors propagate, so they roll back the caller's transaction
+    enqueue([
+        {
+            'to': recipient,
+            'subject': subject,
+            'template_name': template_name,
+            'html_body': html_message,
+            'text_body': plain_message,
+        }
+        for recipient in recipient_list
+    ])
+    return True
+
+
+def send_bulk_email(template_name, messages, base_context=None):
+    """
+    Render one template for many recipients and queue the results in a single
+    insert. `messages` is a list of dicts with `to`, `subject` and `context`;
+    values common to every message go in `base_context`.
+    """
+    from notifications.outbox import enqueue
+    from notifications.rendering import renderer
+    if not messages:
         return True
-    except Exception as e:
-        print(f"Email sending failed: {str(e)}")
+    try:
+        rendered = renderer.render_batch(
+            template_name, [message['context'] for message in messages], base_context
+        )
+    except Exception:
+        logger.exception('Rendering email template %s for %d messages failed', template_name, len(messages))
         return False
+    
+    enqueue([
+        {
+            'to': message['to'],
+            'subject': message['subject'],
+            'template_name': template_name,
+            'html_body': html_message,
+            'text_body': plain_message,
+        }
+        for message, (html_message, plain_message) in zip(messages, rendered)
+    ])
+    return True
 
 
 def send_welcome_email(user):
@@ -0,0 +1,262 @@
+import base64
+import datetime
+import json
+from decimal import Decimal
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet, FieldDoesNotExist, ValidationError as DjangoValidationError
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.db.models.signals import post_save, post_delete
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+from .cache import bump_cache_version, versioned_key
+
+
+# How long a page count may be reused before it's recomputed
+COUNT_CACHE_TIMEOUT = getattr(settings, 'PAGINATION_COUNT_CACHE_TIMEOUT', 30)
+
+# Unfiltered tables at least this large report the statistics estimate instead
+COUNT_ESTIMATE_THRESHOLD = getattr(settings, 'PAGINATION_COUNT_ESTIMATE_THRESHOLD', 100000)
+
+
+def count_namespace(model):
+    return f'page-count:{model._meta.label_lower}'
+
+
+def invalidate_page_counts(sender, **kwargs):
+    """Invalidate the cached counts of the saved or deleted model's listings."""
+    bump_cache_version(count_namespace(sender))
+
+
+def track_page_counts(*models):
+    """
+    Invalidate cached listing counts on every save or delete of `models`.
+    Apps register the models their paginated endpoints list, so writes to
+    other models (sessions, order items, outbox rows) don't bump the cache.
+    """
+    for model in models:
+        dispatch_uid = f'utils.pagination.invalidate_page_counts:{model._meta.label_lower}'
+        post_save.connect(invalidate_page_counts, sender=model, dispatch_uid=dispatch_uid)
+        post_delete.connect(invalidate_page_counts, sender=model, dispatch_uid=dispatch_uid)
+
+
+def estimate_table_rows(queryset):
+    """
+    Row estimate from table statistics for an unfiltered queryset, or None.
+    Only MySQL exposes a cheap estimate (information_schema.TABLES.TABLE_ROWS).
+    """
+    query = queryset.query
+    if query.where or query.distinct or query.combinator or query.low_mark or query.high_mark is not None:
+        return None
+    connection = connections[queryset.db]
+    if connection.vendor != 'mysql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT TABLE_ROWS FROM information_schema.TABLES '
+            'WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s',
+            [queryset.model._meta.db_table]
+        )
+        row = cursor.fetchone()
+    return row[0] if row and row[0] is not None else None
+
+
+class CachedCountPaginator(Paginator):
+    """
+    Paginator whose COUNT(*) is cached per normalized query (the compiled SQL
+    and its parameters, so filters and per-user scoping are part of the key).
+    Large unfiltered tables fall back to the table-statistics estimate.
+    """
+    count_exact = True
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not hasattr(queryset, 'query'):
+            return super().count
+        try:
+            sql, params = queryset.query.sql_with_params()
+        except EmptyResultSet:
+            return 0
+
+        key = versioned_key(count_namespace(queryset.model), sql, params)
+        cached = cache.get(key)
+        if cached is not None:
+            self.count_exact, count = cached
+            return count
+
+        estimate = estimate_table_rows(queryset)
+        if estimate is not None and estimate >= COUNT_ESTIMATE_THRESHOLD:
+            self.count_exact, count = False, estimate
+        else:
+            self.count_exact, count = True, queryset.count()
+        cache.set(key, (self.count_exact, count), COUNT_CACHE_TIMEOUT)
+        return count
+
+
+class CachedCountPagination(PageNumberPagination):
+    """Page-number pagination with cached counts; reports whether the count is exact"""
+    django_paginator_class = CachedCountPaginator
+
+    def get_paginated_response(self, data):
+        return Response({
+            'count': self.page.paginator.count,
+            'count_exact': self.page.paginator.count_exact,
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset (seek) pagination over the queryset's current ordering.
+    The primary key is appended as a tiebreak, and the cursor encodes the
+    ordering values of the last row, so every page is an indexed range scan
+    with no COUNT(*) and no OFFSET.
+    """
+    cursor_query_param = 'cursor'
+    page_size = api_settings.PAGE_SIZE
+    invalid_cursor_message = 'Invalid cursor'
+
+    def get_ordering(self, queryset, view):
+        ordering = list(queryset.query.order_by) or list(getattr(view, 'ordering', None) or []) \
+            or list(queryset.model._meta.ordering)
+        fields = []
+        for field in ordering:
+            if not isinstance(field, str) or '__' in field or field == '?':
+                raise NotFound('Cursor pagination is not supported for this ordering.')
+            descending = field.startswith('-')
+            name = field.lstrip('-')
+            if name == 'pk':
+                name = queryset.model._meta.pk.name
+            fields.append((name, descending))
+        # Primary key tiebreak, in the direction of the leading field
+        pk_name = queryset.model._meta.pk.name
+        if pk_name not in [name for name, _ in fields]:
+            fields.append((pk_name, fields[0][1] if fields else False))
+        return fields
+
+    def encode_cursor(self, position, reverse):
+        payload = {'p': [self._dump(value) for value in position], 'r': int(reverse)}
+        data = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+        return base64.urlsafe_b64encode(data).decode('ascii').rstrip('=')
+
+    def decode_cursor(self, request, queryset):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            padded = encoded + '=' * (-len(encoded) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+            raw = payload['p']
+            if len(raw) != len(self.ordering):
+                raise ValueError
+            position = [self._load(queryset, name, value) for (name, _), value in zip(self.ordering, raw)]
+            return position, bool(payload.get('r'))
+        except (TypeError, ValueError, KeyError, DjangoValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    @staticmethod
+    def _dump(value):
+        if isinstance(value, (datetime.datetime, datetime.date)):
+            return value.isoformat()
+        if isinstance(value, Decimal):
+            return str(value)
+        return value
+
+    @staticmethod
+    def _load(queryset, name, value):
+        try:
+            field = queryset.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            # Annotations such as search relevance are numeric
+            return float(value)
+        return field.to_python(value)
+
+    def _seek_filter(self, position, reverse):
+        """Rows strictly after `position` in the (possibly reversed) ordering"""
+        condition = Q()
+        for index, (name, descending) in enumerate(self.ordering):
+            lookup = 'lt' if descending != reverse else 'gt'
+            clause = Q(**{f'{name}__{lookup}': position[index]})
+            for (equal_name, _), value in zip(self.ordering[:index], position):
+                clause &= Q(**{equal_name: value})
+            condition |= clause
+        return condition
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(queryset, view)
+        position, reverse = self.decode_cursor(request, queryset)
+
+        order_by = [('-' if descending != reverse else '') + name for name, descending in self.ordering]
+        queryset = queryset.order_by(*order_by)
+        if position is not None:
+            queryset = queryset.filter(self._seek_filter(position, reverse))
+
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+
+        self.page = rows
+        if reverse:
+            self.has_next = position is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = position is not None
+        return rows
+
+    def _position(self, row):
+        return [getattr(row, name) for name, _ in self.ordering]
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return replace_query_param(
+            self.base_url, self.cursor_query_param, self.encode_cursor(self._position(self.page[-1]), False)
+        )
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return replace_query_param(
+            self.base_url, self.cursor_query_param, self.encode_cursor(self._position(self.page[0]), True)
+        )
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+
+class CursorOrPageNumberPagination(CachedCountPagination):
+    """
+    Page-number pagination by default; keyset pagination when the request
+    carries a `cursor` parameter (an empty `?cursor=` requests the first page).
+    """
+    keyset_class = KeysetPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.keyset_class.cursor_query_param in request.query_params:
+            self.keyset = self.keyset_class()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        self.keyset = None
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
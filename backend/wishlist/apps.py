@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class WishlistConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'wishlist'
+
+    def ready(self):
+        from utils.pagination import track_page_counts
+        # Models behind paginated listings
+        track_page_counts(*(self.get_model(name) for name in ('Wishlist',)))
@@ -3,7 +3,7 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from .models import Wishlist, WishlistItem
 from .serializers import WishlistSerializer, WishlistItemSerializer
-from orders.models import Cart, CartItem
+from orders.cart_store import add_to_user_cart
 
 
 class WishlistViewSet(viewsets.ModelViewSet):
@@ -46,22 +46,13 @@ class WishlistViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['post'])
     def move_to_cart(self, request):
         wishlist = Wishlist.objects.get(user=request.user)
-        cart, _ = Cart.objects.get_or_create(user=request.user)
         item_id = request.data.get('item_id')
         
         try:
             wishlist_item = WishlistItem.objects.get(id=item_id, wishlist=wishlist)
             
-            # Add to cart
-            cart_item, created = CartItem.objects.get_or_create(
-                cart=cart,
-                product=wishlist_item.product,
-                defaults={'quantity': 1}
-            )
-            
-            if not created:
-                cart_item.quantity += 1
-                cart_item.save()
+            # Add to cart (the hot cart when a cart store is configured)
+            add_to_user_cart(request.user, wishlist_item.product_id)
             
             # Remove from wishlist
             wishlist_item.delete()